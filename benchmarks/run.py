@@ -0,0 +1,370 @@
+"""Benchmarks for the FirebaseData/LiveData event pipeline.
+
+Usage:
+    python benchmarks/run.py                      # run and print JSON results
+    python benchmarks/run.py -o results.json      # write results to a file
+    python benchmarks/run.py --compare            # compare with benchmarks/baseline.json
+    python benchmarks/run.py --save-baseline      # overwrite benchmarks/baseline.json
+
+When comparing, the exit status is non-zero if any benchmark is slower (or larger)
+than the baseline by more than the allowed threshold.
+"""
+import argparse
+import datetime
+import gc
+import io
+import json
+import os.path
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+from unittest import mock
+
+base_dir = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(base_dir, '..'))
+
+from firebasedata import binary, data, live, watcher  # noqa: E402
+
+BASELINE_PATH = os.path.join(base_dir, 'baseline.json')
+DEFAULT_THRESHOLD = 0.5
+
+_benchmarks = []
+
+
+def benchmark(func):
+    _benchmarks.append(func)
+    return func
+
+
+def timeit(func, number, repeat=5):
+    """Return the best per-call time of `func`, in microseconds."""
+    for _ in range(max(1, number // 10)):
+        func()
+
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+    return min(timings) * 1e6
+
+
+def result(name, value, unit, **params):
+    return {
+        'name': name,
+        'params': params,
+        'unit': unit,
+        'value': round(value, 3),
+    }
+
+
+def make_path(depth, index=0):
+    return '/'.join('k{}'.format(index if i == depth - 1 else i) for i in range(depth))
+
+
+def make_tree(width, depth):
+    if depth == 0:
+        return 'value'
+    return {'k{}'.format(i): make_tree(width, depth - 1) for i in range(width)}
+
+
+def make_live_data():
+    live_data = live.LiveData(mock.Mock(), '/')
+    live_data._cache = data.FirebaseData({})
+    return live_data
+
+
+@benchmark
+def firebase_data_set():
+    for depth in (1, 5, 10):
+        for width in (10, 1000):
+            fb = data.FirebaseData({})
+            paths = [make_path(depth, i) for i in range(width)]
+            counter = iter(range(10 ** 9))
+
+            def run():
+                fb.set(paths[next(counter) % width], 'value')
+
+            yield result(
+                'FirebaseData.set', timeit(run, 2000), 'us',
+                depth=depth, width=width
+            )
+
+
+@benchmark
+def firebase_data_get():
+    for depth in (1, 5, 10):
+        for width in (10, 1000):
+            fb = data.FirebaseData({})
+            paths = [make_path(depth, i) for i in range(width)]
+            for path in paths:
+                fb.set(path, 'value')
+            counter = iter(range(10 ** 9))
+
+            def run():
+                fb.get(paths[next(counter) % width])
+
+            yield result(
+                'FirebaseData.get', timeit(run, 5000), 'us',
+                depth=depth, width=width
+            )
+
+
+def _connect_subscribers(live_data, path, count):
+    receivers = []
+    for i in range(count):
+        def receiver(sender, **kwargs):
+            pass
+        receivers.append(receiver)
+        live_data.signal(path).connect(receiver)
+    # Keep strong references, since blinker only holds weak ones.
+    return receivers
+
+
+@benchmark
+def put_handler():
+    for subscribers in (0, 1, 100):
+        live_data = make_live_data()
+        receivers = _connect_subscribers(live_data, 'foo/bar', subscribers)
+
+        def run():
+            live_data._put_handler('/foo/bar/baz', 'value')
+
+        yield result(
+            'LiveData._put_handler', timeit(run, 1000), 'us',
+            subscribers=subscribers
+        )
+        del receivers
+
+
+@benchmark
+def patch_handler():
+    values = {'k{}/leaf'.format(i): i for i in range(10)}
+    for subscribers in (0, 1, 100):
+        live_data = make_live_data()
+        receivers = _connect_subscribers(live_data, 'foo', subscribers)
+
+        def run():
+            live_data._patch_handler('/foo', values)
+
+        yield result(
+            'LiveData._patch_handler', timeit(run, 200), 'us',
+            subscribers=subscribers, keys=len(values)
+        )
+        del receivers
+
+
+@benchmark
+def reconnect_root_put():
+    # 10 * 10 * 10 * 10 = 10,000 leaves
+    tree = make_tree(10, 4)
+    live_data = make_live_data()
+
+    def run():
+        live_data._put_handler('/', tree)
+
+    yield result(
+        'LiveData._put_handler(root)', timeit(run, 100), 'us',
+        leaves=10 ** 4
+    )
+
+
+@benchmark
+def memory_per_million_leaves():
+    leaves = 10 ** 6
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fb = data.FirebaseData({})
+        for i in range(leaves // 100):
+            fb.set('items/i{}'.format(i), {'f{}'.format(j): j for j in range(100)})
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del fb
+
+    yield result('FirebaseData.memory', current / 2 ** 20, 'MiB', leaves=leaves)
+
+
+def make_records(count):
+    return {
+        'r{}'.format(i): {
+            'name': 'device {}'.format(i),
+            'battery': i % 100,
+            'voltage': i / 7,
+            'enabled': bool(i % 2),
+            'tags': {'room': 'kitchen', 'floor': i % 3},
+        }
+        for i in range(count)
+    }
+
+
+@benchmark
+def binary_snapshot():
+    records = make_records(10 ** 4)
+    fb = data.FirebaseData(records)
+    encoded_json = json.dumps(records).encode('utf-8')
+    encoded_binary = binary.dumps(fb)
+
+    yield result('snapshot.size', len(encoded_json), 'bytes', format='json')
+    yield result('snapshot.size', len(encoded_binary), 'bytes', format='binary')
+    yield result(
+        'snapshot.encode', timeit(lambda: json.dumps(fb.get()), 5) / 1000, 'ms',
+        format='json'
+    )
+    yield result(
+        'snapshot.encode', timeit(lambda: binary.dumps(fb), 5) / 1000, 'ms',
+        format='binary'
+    )
+    yield result(
+        'snapshot.decode', timeit(lambda: json.loads(encoded_json), 5) / 1000, 'ms',
+        format='json'
+    )
+    yield result(
+        'snapshot.decode', timeit(lambda: binary.loads(encoded_binary), 5) / 1000, 'ms',
+        format='binary'
+    )
+    yield result(
+        'snapshot.get', timeit(
+            lambda: binary.Decoder(io.BytesIO(encoded_binary)).get('r9999/name'), 5
+        ) / 1000, 'ms',
+        format='binary'
+    )
+
+
+@benchmark
+def get_json():
+    fb = data.FirebaseData({'records': make_records(10 ** 4)})
+    counter = iter(range(10 ** 9))
+
+    def run_json():
+        json.dumps(fb.get('records'))
+
+    def run_cached():
+        # Change one record between requests
+        fb.set('records/r{}/battery'.format(next(counter) % 10 ** 4), 1)
+        fb.get_json('records')
+
+    yield result('get_json', timeit(run_json, 20) / 1000, 'ms', cache=False)
+    yield result('get_json', timeit(run_cached, 20) / 1000, 'ms', cache=True)
+
+
+@benchmark
+def watcher_overhead():
+    # Start the scheduler threads first, so the first count doesn't include them
+    watcher.watch(('bench', 'warmup'), lambda: False, lambda: None)
+    watcher.cancel_all()
+
+    for count in (10, 100, 500):
+        watcher.cancel_all()
+        threads_before = threading.active_count()
+        interval = datetime.timedelta(hours=1)
+
+        start = time.perf_counter()
+        for i in range(count):
+            watcher.watch(('bench', i), lambda: False, lambda: None, interval)
+        elapsed = time.perf_counter() - start
+        threads = threading.active_count() - threads_before
+        watcher.cancel_all()
+
+        yield result(
+            'watcher.watch', elapsed / count * 1e6, 'us', watchers=count
+        )
+        yield result(
+            'watcher.threads', threads, 'threads', watchers=count
+        )
+
+
+def run_all(selected=None):
+    results = []
+    for func in _benchmarks:
+        if selected and not any(s in func.__name__ for s in selected):
+            continue
+        results.extend(func())
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+
+
+def result_key(item):
+    params = ','.join('{}={}'.format(k, v) for k, v in sorted(item['params'].items()))
+    return '{}[{}]'.format(item['name'], params)
+
+
+def compare(current, baseline, threshold):
+    """Compare two result sets, returning a list of regression descriptions."""
+    baseline_values = {result_key(r): r['value'] for r in baseline['results']}
+    regressions = []
+
+    for item in current['results']:
+        key = result_key(item)
+        old = baseline_values.get(key)
+        if old is None:
+            print('{:<70} {:>12} (new)'.format(key, item['value']))
+            continue
+
+        if old:
+            change = (item['value'] - old) / old
+        else:
+            # Any increase over a zero baseline, such as a new thread, is a regression
+            change = float('inf') if item['value'] > 0 else 0.0
+        print('{:<70} {:>12} {:>+8.1%}'.format(key, item['value'], change))
+        if change > threshold:
+            regressions.append(
+                '{}: {} -> {} {}'.format(key, old, item['value'], item['unit'])
+            )
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('benchmarks', nargs='*', help='Only run matching benchmarks')
+    parser.add_argument('-o', '--output', help='Write JSON results to this file')
+    parser.add_argument(
+        '--compare', nargs='?', const=BASELINE_PATH,
+        help='Compare results with a baseline file (default: %(const)s)'
+    )
+    parser.add_argument(
+        '--threshold', type=float, default=DEFAULT_THRESHOLD,
+        help='Allowed relative slowdown before failing (default: %(default)s)'
+    )
+    parser.add_argument(
+        '--save-baseline', action='store_true', help='Write results to the baseline file'
+    )
+    args = parser.parse_args(argv)
+
+    results = run_all(args.benchmarks)
+    output = json.dumps(results, indent=2)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    elif not args.compare:
+        print(output)
+
+    if args.save_baseline:
+        with open(BASELINE_PATH, 'w') as f:
+            f.write(output + '\n')
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print('\nRegressions (> {:.0%}):'.format(args.threshold))
+            for line in regressions:
+                print('  ' + line)
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
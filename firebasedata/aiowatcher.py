@@ -0,0 +1,206 @@
+"""An asyncio implementation of the `watcher` API.
+
+Checks are scheduled on the event loop with `loop.call_later`, instead of on the
+watcher threads. Coroutine functions are awaited on the loop, while regular (blocking)
+callables are run in an executor, so they never block the loop.
+"""
+import asyncio
+import inspect
+import logging
+import threading
+import weakref
+
+from .watcher import DEFAULT_INTERVAL, WatcherStats, describe, get_delay
+
+logger = logging.getLogger(__name__)
+_engines = weakref.WeakKeyDictionary()
+
+
+class AsyncWatcher:
+    def __init__(self, engine, should_update, update_func, interval=None, backoff=None):
+        self._engine = engine
+        self._should_update = should_update
+        self._update_func = update_func
+        self._interval = DEFAULT_INTERVAL if interval is None else interval
+        self._backoff = backoff
+        self._should_cancel = False
+        self._handle = None
+        self._task = None
+        # Seconds that the current check was scheduled with
+        self.delay = None
+        self.stats = WatcherStats()
+
+    @property
+    def next_due(self):
+        """Loop time of the next check, or None."""
+        if self._handle is None:
+            return None
+        return self._handle.when()
+
+    def start(self):
+        if self._should_cancel:
+            logger.warning('Cannot start cancelled watcher: %s', id(self))
+            return
+
+        self.delay = get_delay(self._interval, self._backoff).total_seconds()
+        self._handle = self._engine.loop.call_later(self.delay, self._action)
+
+    def _action(self):
+        loop = self._engine.loop
+        self.stats.start_run(loop.time() - self._handle.when(), self.delay)
+        self._handle = None
+        self._task = loop.create_task(self._check())
+
+    async def _timed_call(self, func, duration_stats):
+        started_at = self._engine.loop.time()
+        try:
+            return await self._engine.call(func)
+        finally:
+            duration_stats.add(self._engine.loop.time() - started_at)
+
+    async def _check(self):
+        try:
+            logger.debug(
+                'Watcher (%s) checking if update is requested: %s',
+                id(self),
+                self._should_update
+            )
+
+            if await self._timed_call(self._should_update, self.stats.check):
+                logger.debug(
+                    'Update requested. Watcher (%s) updating: %s',
+                    id(self),
+                    self._update_func
+                )
+                self.stats.triggers += 1
+                await self._timed_call(self._update_func, self.stats.update)
+            elif self._backoff is not None:
+                self._backoff.reset()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.stats.errors += 1
+            logger.exception('Error in watcher: %s', id(self))
+        finally:
+            self._task = None
+
+        self.start()
+
+    def cancel(self):
+        self._should_cancel = True
+
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+        if self._task is not None:
+            self._task.cancel()
+
+
+class Engine:
+    """Watchers that run on an asyncio event loop.
+
+    Has the same `watch`, `cancel` and `cancel_all` functions as the `watcher` module.
+    They may be called from any thread.
+    """
+
+    def __init__(self, loop, executor=None):
+        self.loop = loop
+        self._executor = executor
+        self._watchers = {}
+        # Names of watchers, including ones that are queued to start on the loop
+        self._names = set()
+        self._lock = threading.Lock()
+
+    async def call(self, func):
+        """Call {func} without blocking the loop, and return its result."""
+        if inspect.iscoroutinefunction(func):
+            result = await func()
+        else:
+            result = await self.loop.run_in_executor(self._executor, func)
+
+        if inspect.isawaitable(result):
+            result = await result
+
+        return result
+
+    def _in_loop(self):
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
+
+    def _run_in_loop(self, func, *args):
+        if self._in_loop():
+            func(*args)
+        else:
+            self.loop.call_soon_threadsafe(func, *args)
+
+    def watch(self, name, should_update, update_func, interval=None, backoff=None):
+        """Watch something and call a function when it should be updated.
+
+        See `watcher.watch`. {should_update} and {update_func} may also be coroutine
+        functions.
+        """
+        with self._lock:
+            if name in self._names:
+                logger.warning('Cannot start watcher. Watcher already running: %s', name)
+                return
+            self._names.add(name)
+
+        self._run_in_loop(
+            self._watch, name, should_update, update_func, interval, backoff
+        )
+
+    def _watch(self, name, should_update, update_func, interval, backoff):
+        watcher = AsyncWatcher(self, should_update, update_func, interval, backoff)
+        logger.debug('New async watcher started %s: %s', name, id(watcher))
+        self._watchers[name] = watcher
+        watcher.start()
+
+    def get_watcher(self, name):
+        """Return the watcher named {name}, or None."""
+        return self._watchers.get(name)
+
+    def list_watchers(self):
+        """Return a dictionary describing every watcher, and its statistics, by name.
+
+        `next_due` is given in loop time.
+        """
+        return {
+            name: describe(watcher, watcher.next_due)
+            for name, watcher in list(self._watchers.items())
+        }
+
+    def cancel(self, name):
+        with self._lock:
+            if name not in self._names:
+                return None
+            self._names.discard(name)
+
+        # Queued after the watcher's start, if that has not run yet
+        self._run_in_loop(self._cancel, name)
+        return True
+
+    def _cancel(self, name):
+        watcher = self._watchers.pop(name, None)
+        if watcher:
+            logger.debug('Cancelling watcher %s: %s', name, id(watcher))
+            watcher.cancel()
+
+    def cancel_all(self):
+        logger.debug('Stopping all async watchers')
+        for name in list(self._names):
+            self.cancel(name)
+
+
+def get_engine(loop=None):
+    """Return the watcher engine for {loop}, or for the running loop."""
+    if loop is None:
+        loop = asyncio.get_running_loop()
+
+    try:
+        return _engines[loop]
+    except KeyError:
+        engine = _engines[loop] = Engine(loop)
+        return engine
@@ -0,0 +1,441 @@
+"""A compact binary format for FirebaseData trees.
+
+A snapshot starts with the 4 byte magic `FBD1`, followed by records. Each record is a
+one byte tag and, except for the end record, a 4 byte little-endian length:
+
+    K: Key definitions. A varint count, then each key as a varint length and UTF-8.
+    E: A child of the root. A varint key index, then the child's value.
+    V: The root value, when it is not a dictionary.
+    Z: End of the snapshot.
+
+Keys are interned: each one is defined once, in a key record that precedes its first
+use, and then referred to by index. Key records are only written between other records,
+so any record, or any dictionary or list value, can be skipped without decoding it.
+
+Values are a one byte type, followed by:
+
+    N, T, F: Nothing (None, True and False).
+    i: A signed 8 byte integer.
+    b: A larger integer, as a varint length and decimal digits.
+    f: An 8 byte float.
+    s: A varint length and UTF-8.
+    D: A 4 byte length, a varint count, then a varint key index and value per item.
+    L: A 4 byte length, a varint count, then each value.
+
+Snapshots are written one child of the root at a time, so encoding never holds more
+than one child's encoded data in memory.
+"""
+from collections.abc import Mapping
+import io
+import struct
+
+from . import data
+
+MAGIC = b'FBD1'
+
+_U32 = struct.Struct('<I')
+_I64 = struct.Struct('<q')
+_F64 = struct.Struct('<d')
+_INT64_MIN = -2 ** 63
+_INT64_MAX = 2 ** 63 - 1
+# Marks a path that is excluded from decoding
+_EXCLUDED = object()
+
+
+def _write_varint(buf, number):
+    while number >= 0x80:
+        buf.append((number & 0x7f) | 0x80)
+        number >>= 7
+    buf.append(number)
+
+
+def _read_varint(buf, pos):
+    result = 0
+    shift = 0
+
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+class Encoder:
+    """Write a snapshot to the binary file object {fp}, one record at a time."""
+
+    def __init__(self, fp):
+        self._fp = fp
+        self._keys = {}
+        self._new_keys = []
+        fp.write(MAGIC)
+
+    def _key_index(self, key):
+        index = self._keys.get(key)
+        if index is None:
+            # First use of this key
+            index = self._keys[key] = len(self._keys)
+            self._new_keys.append(key)
+        return index
+
+    def _encode(self, buf, value):
+        # Most common types first
+        if isinstance(value, str):
+            encoded = value.encode('utf-8')
+            buf += b's'
+            _write_varint(buf, len(encoded))
+            buf += encoded
+        elif isinstance(value, dict):
+            self._encode_dict(buf, value)
+        elif value is None:
+            buf += b'N'
+        elif value is True:
+            buf += b'T'
+        elif value is False:
+            buf += b'F'
+        elif isinstance(value, int):
+            if _INT64_MIN <= value <= _INT64_MAX:
+                buf += b'i'
+                buf += _I64.pack(value)
+            else:
+                digits = str(value).encode('ascii')
+                buf += b'b'
+                _write_varint(buf, len(digits))
+                buf += digits
+        elif isinstance(value, float):
+            buf += b'f'
+            buf += _F64.pack(value)
+        elif isinstance(value, (list, tuple)):
+            buf += b'L'
+            start = len(buf)
+            buf += b'\0\0\0\0'
+            _write_varint(buf, len(value))
+            for child in value:
+                self._encode(buf, child)
+            _U32.pack_into(buf, start, len(buf) - start - _U32.size)
+        elif isinstance(value, Mapping):
+            # Schema records
+            self._encode_dict(buf, value)
+        else:
+            raise TypeError('Cannot encode value of type {}'.format(type(value).__name__))
+
+    def _encode_dict(self, buf, value):
+        buf += b'D'
+        start = len(buf)
+        buf += b'\0\0\0\0'
+        _write_varint(buf, len(value))
+        key_index = self._key_index
+        encode = self._encode
+        for key, child in value.items():
+            _write_varint(buf, key_index(str(key)))
+            encode(buf, child)
+        _U32.pack_into(buf, start, len(buf) - start - _U32.size)
+
+    def _write_record(self, tag, payload):
+        self._fp.write(tag + _U32.pack(len(payload)))
+        self._fp.write(payload)
+
+    def _write_keys(self):
+        if not self._new_keys:
+            return
+
+        buf = bytearray()
+        _write_varint(buf, len(self._new_keys))
+        for key in self._new_keys:
+            encoded = key.encode('utf-8')
+            _write_varint(buf, len(encoded))
+            buf += encoded
+
+        self._new_keys = []
+        self._write_record(b'K', buf)
+
+    def write_item(self, key, value):
+        """Write a child of the root."""
+        buf = bytearray()
+        _write_varint(buf, self._key_index(str(key)))
+        self._encode(buf, value)
+        self._write_keys()
+        self._write_record(b'E', buf)
+
+    def write_value(self, value):
+        """Write a root value that is not a dictionary."""
+        buf = bytearray()
+        self._encode(buf, value)
+        self._write_keys()
+        self._write_record(b'V', buf)
+
+    def close(self):
+        self._fp.write(b'Z')
+
+
+def dump(value, fp):
+    """Write {value}, a FirebaseData or plain value, to the binary file object {fp}.
+
+    The tree must not change while it is written. For a cache that is being updated,
+    retry on RuntimeError.
+    """
+    if isinstance(value, data.FirebaseData):
+        value = value.get()
+
+    encoder = Encoder(fp)
+    if isinstance(value, Mapping):
+        for key, child in value.items():
+            encoder.write_item(key, child)
+    else:
+        encoder.write_value(value)
+    encoder.close()
+
+
+def dumps(value):
+    fp = io.BytesIO()
+    dump(value, fp)
+    return fp.getvalue()
+
+
+def _skip(buf, pos):
+    """Return the position after the value at {pos}."""
+    kind = buf[pos]
+    pos += 1
+
+    if kind in b'DL':
+        size, = _U32.unpack_from(buf, pos)
+        return pos + _U32.size + size
+    if kind in b'if':
+        return pos + 8
+    if kind in b'sb':
+        size, pos = _read_varint(buf, pos)
+        return pos + size
+    return pos
+
+
+class Decoder:
+    """Read a snapshot from the binary file object {fp}.
+
+    Children of the root that are not needed are skipped, with `seek` if {fp} supports
+    it, so they are neither decoded nor held in memory.
+    """
+
+    def __init__(self, fp):
+        self._fp = fp
+        self._keys = []
+        self._seekable = fp.seekable() if hasattr(fp, 'seekable') else False
+
+        if self._read(len(MAGIC)) != MAGIC:
+            raise ValueError('Not a binary FirebaseData snapshot')
+
+    def _read(self, size):
+        result = self._fp.read(size)
+        if len(result) != size:
+            raise ValueError('Truncated snapshot')
+        return result
+
+    def _skip_record(self, size):
+        if self._seekable:
+            self._fp.seek(size, io.SEEK_CUR)
+        else:
+            self._read(size)
+
+    def _read_keys(self, buf):
+        count, pos = _read_varint(buf, 0)
+        for _ in range(count):
+            size, pos = _read_varint(buf, pos)
+            self._keys.append(buf[pos:pos + size].decode('utf-8'))
+            pos += size
+
+    def _decode(self, buf, pos, exclude=None):
+        """Decode the value at {pos}. Returns the value and the position after it.
+
+        {exclude} is an optional tree of dictionaries, by key, in which _EXCLUDED marks
+        values to leave out.
+        """
+        kind = buf[pos]
+        pos += 1
+
+        if kind == 0x73:  # s
+            size = buf[pos]
+            if size < 0x80:
+                pos += 1
+            else:
+                size, pos = _read_varint(buf, pos)
+            return buf[pos:pos + size].decode('utf-8'), pos + size
+        if kind == 0x44:  # D
+            count, pos = _read_varint(buf, pos + _U32.size)
+            keys = self._keys
+            result = {}
+            for _ in range(count):
+                index = buf[pos]
+                if index < 0x80:
+                    pos += 1
+                else:
+                    index, pos = _read_varint(buf, pos)
+                key = keys[index]
+
+                child_exclude = None if exclude is None else exclude.get(key)
+                if child_exclude is _EXCLUDED:
+                    pos = _skip(buf, pos)
+                    continue
+
+                result[key], pos = self._decode(buf, pos, child_exclude)
+            return result, pos
+        if kind == 0x69:  # i
+            return _I64.unpack_from(buf, pos)[0], pos + 8
+        if kind == 0x66:  # f
+            return _F64.unpack_from(buf, pos)[0], pos + 8
+        if kind == 0x4e:  # N
+            return None, pos
+        if kind == 0x54:  # T
+            return True, pos
+        if kind == 0x46:  # F
+            return False, pos
+        if kind == 0x4c:  # L
+            count, pos = _read_varint(buf, pos + _U32.size)
+            result = []
+            for _ in range(count):
+                value, pos = self._decode(buf, pos)
+                result.append(value)
+            return result, pos
+        if kind == 0x62:  # b
+            size, pos = _read_varint(buf, pos)
+            return int(buf[pos:pos + size].decode('ascii')), pos + size
+
+        raise ValueError('Invalid value type: {!r}'.format(chr(kind)))
+
+    def _find(self, buf, pos, path_list):
+        """Decode only the value at {path_list}, below the value at {pos}."""
+        for part in path_list:
+            kind = buf[pos]
+            if kind != 0x44:  # D
+                return None
+
+            count, pos = _read_varint(buf, pos + 1 + _U32.size)
+            for _ in range(count):
+                index, pos = _read_varint(buf, pos)
+                if self._keys[index] == part:
+                    break
+                pos = _skip(buf, pos)
+            else:
+                return None
+
+        return self._decode(buf, pos)[0]
+
+    def records(self):
+        """Yield `(tag, size)` for each record, after reading key definitions.
+
+        The caller must read or skip the record's payload before continuing.
+        """
+        while True:
+            tag = self._read(1)
+            if tag == b'Z':
+                return
+
+            size, = _U32.unpack(self._read(_U32.size))
+            if tag == b'K':
+                self._read_keys(self._read(size))
+            elif tag in (b'E', b'V'):
+                yield tag, size
+            else:
+                raise ValueError('Invalid record type: {!r}'.format(tag))
+
+    def _read_item(self, size):
+        buf = self._read(size)
+        index, pos = _read_varint(buf, 0)
+        return self._keys[index], buf, pos
+
+    def items(self, exclude=None):
+        """Yield `(key, value)` for each child of the root, as it is read.
+
+        Arguments:
+            exclude: Optional list of paths to leave out, without decoding them.
+        """
+        exclude = _exclude_tree(exclude)
+
+        for tag, size in self.records():
+            if tag == b'V':
+                raise ValueError('Snapshot root is not a dictionary')
+
+            if exclude is not None:
+                # Peek at the key, to skip the whole record if it is excluded
+                buf = self._read(min(size, 10))
+                index, pos = _read_varint(buf, 0)
+                child_exclude = exclude.get(self._keys[index])
+                if child_exclude is _EXCLUDED:
+                    self._skip_record(size - len(buf))
+                    continue
+                buf = buf + self._read(size - len(buf))
+                yield self._keys[index], self._decode(buf, pos, child_exclude)[0]
+            else:
+                key, buf, pos = self._read_item(size)
+                yield key, self._decode(buf, pos)[0]
+
+    def value(self, exclude=None):
+        """Return the whole root value."""
+        exclude = _exclude_tree(exclude)
+        result = {}
+
+        for tag, size in self.records():
+            if tag == b'V':
+                return self._decode(self._read(size), 0)[0]
+
+            key, buf, pos = self._read_item(size)
+            child_exclude = None if exclude is None else exclude.get(key)
+            if child_exclude is not _EXCLUDED:
+                result[key] = self._decode(buf, pos, child_exclude)[0]
+
+        return result
+
+    def get(self, path):
+        """Return only the value at {path}, or None. Other subtrees are skipped."""
+        path_list = data.get_path_list(path)
+        if not path_list:
+            return self.value()
+
+        for tag, size in self.records():
+            if tag == b'V':
+                return None
+
+            buf = self._read(min(size, 10))
+            index, pos = _read_varint(buf, 0)
+            if self._keys[index] != path_list[0]:
+                self._skip_record(size - len(buf))
+                continue
+
+            buf = buf + self._read(size - len(buf))
+            return self._find(buf, pos, path_list[1:])
+
+        return None
+
+
+def _exclude_tree(paths):
+    if not paths:
+        return None
+
+    tree = {}
+    for path in paths:
+        path_list = data.get_path_list(path)
+        if not path_list:
+            raise ValueError('Cannot exclude the root')
+
+        node = tree
+        for part in path_list[:-1]:
+            child = node.setdefault(part, {})
+            if child is _EXCLUDED:
+                break
+            node = child
+        else:
+            node[path_list[-1]] = _EXCLUDED
+
+    return tree
+
+
+def load(fp, exclude=None):
+    """Read a FirebaseData from the binary file object {fp}.
+
+    Arguments:
+        exclude: Optional list of paths to leave out, without decoding them.
+    """
+    return data.FirebaseData(Decoder(fp).value(exclude))
+
+
+def loads(value, exclude=None):
+    return load(io.BytesIO(value), exclude)
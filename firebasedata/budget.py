@@ -0,0 +1,274 @@
+"""A FirebaseData tree that keeps its approximate size under a memory budget.
+
+The tree is divided into units: the subtrees at a fixed depth below the root. When the
+resident units exceed the budget, the least recently read ones are evicted, and replaced
+with `Evicted` placeholders. Reading a path in an evicted unit fetches the unit again.
+
+Changes below an evicted unit are not applied, since fetching the unit again returns
+its latest data.
+
+Values read at paths above the units are read-only `LoadingTree` mappings, which never
+contain placeholders. Evicted units are only fetched when they are read from them, and
+are not kept.
+"""
+import collections
+from collections.abc import Mapping
+import logging
+import sys
+import threading
+
+from . import data
+
+logger = logging.getLogger(__name__)
+EVICTION_DEPTH = 1
+MAX_REFETCH_ATTEMPTS = 3
+
+
+def estimate_size(value):
+    """Return the approximate memory used by {value}, in bytes."""
+    size = sys.getsizeof(value)
+
+    if isinstance(value, Mapping):
+        for key, child in value.items():
+            size += sys.getsizeof(key) + estimate_size(child)
+    elif isinstance(value, list):
+        for child in value:
+            size += estimate_size(child)
+
+    return size
+
+
+class Evicted:
+    """Placeholder for an evicted unit."""
+
+    __slots__ = ('size',)
+
+    def __init__(self, size):
+        self.size = size
+
+    def __repr__(self):
+        return '{}(size={})'.format(type(self).__name__, self.size)
+
+
+class LoadingTree(Mapping):
+    """Read-only value of a BoundedData path above the units.
+
+    Evicted units are fetched when they are read, and are not kept. Values at or below
+    the units are the cached data itself.
+    """
+
+    __slots__ = ('_cache', '_path_list', '_value')
+
+    def __init__(self, cache, path_list, value):
+        self._cache = cache
+        self._path_list = path_list
+        self._value = value
+
+    def __getitem__(self, key):
+        return self._cache._resolve(self._path_list + [key], self._value[key])
+
+    def __iter__(self):
+        # Units may be evicted meanwhile, which replaces values but never adds keys
+        return iter(list(self._value))
+
+    def __len__(self):
+        return len(self._value)
+
+    def __contains__(self, key):
+        return key in self._value
+
+    def __repr__(self):
+        return '{}({})'.format(type(self).__name__, '/'.join(self._path_list))
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.dropped_updates = 0
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+class BoundedData(data.FirebaseData):
+    """FirebaseData that evicts cold units past a memory budget.
+
+    Arguments:
+        value: Initial data.
+        budget: Approximate number of bytes that resident units may use.
+        loader: Callable, given the path of an evicted unit, that returns its data.
+        depth: Depth of the units below the root.
+    """
+
+    def __init__(self, value, budget, loader, depth=EVICTION_DEPTH):
+        if depth < 1:
+            raise ValueError('Units must be below the root')
+
+        super().__init__(value)
+        self._budget = budget
+        self._loader = loader
+        self._depth = depth
+        # Sizes of resident units, least recently read first
+        self._units = collections.OrderedDict()
+        self._evicted = set()
+        # Number of changes dropped per evicted unit
+        self._missed = {}
+        self._lock = threading.RLock()
+        self._fetch_lock = threading.Lock()
+        self.size = 0
+        self.stats = CacheStats()
+
+        with self._lock:
+            self._track([], super().get())
+            self._enforce()
+
+    @property
+    def budget(self):
+        return self._budget
+
+    def _set_unit_size(self, unit, size):
+        self.size += size - self._units.pop(unit, 0)
+        self._units[unit] = size
+
+    def _remove_unit(self, unit):
+        self.size -= self._units.pop(unit, 0)
+        self._evicted.discard(unit)
+        self._missed.pop(unit, None)
+
+    def _track(self, path_list, value):
+        """Track the units in {value}, found at {path_list}."""
+        if len(path_list) == self._depth:
+            unit = tuple(path_list)
+            if isinstance(value, Evicted):
+                self._evicted.add(unit)
+            elif value is not None:
+                self._set_unit_size(unit, estimate_size(value))
+        elif isinstance(value, Mapping):
+            for key, child in value.items():
+                self._track(path_list + [key], child)
+
+    def _untrack(self, path_list):
+        """Forget the units at or below {path_list}."""
+        prefix = tuple(path_list)
+        for unit in list(self._units) + list(self._evicted):
+            if unit[:len(prefix)] == prefix:
+                self._remove_unit(unit)
+
+    def set(self, path, value):
+        path_list = data.get_path_list(path)
+
+        with self._lock:
+            if len(path_list) <= self._depth:
+                super().set(path, value)
+                if len(path_list) == self._depth:
+                    self._remove_unit(tuple(path_list))
+                else:
+                    self._untrack(path_list)
+                self._track(path_list, super().get(path))
+            else:
+                unit = tuple(path_list[:self._depth])
+                if unit in self._evicted:
+                    self._missed[unit] = self._missed.get(unit, 0) + 1
+                    self.stats.dropped_updates += 1
+                    if self._fragments is not None:
+                        # Encoded from a copy that included the unit
+                        self._fragments.invalidate(path_list)
+                    return
+
+                old_size = estimate_size(super().get(path))
+                super().set(path, value)
+                self._set_unit_size(
+                    unit,
+                    self._units.get(unit, 0) + estimate_size(value) - old_size
+                )
+
+            self._enforce()
+
+    def get(self, path='/'):
+        path_list = data.get_path_list(path)
+
+        if len(path_list) >= self._depth:
+            unit = tuple(path_list[:self._depth])
+
+            with self._lock:
+                evicted = unit in self._evicted
+                if evicted:
+                    self.stats.misses += 1
+                elif unit in self._units:
+                    self.stats.hits += 1
+                    self._units.move_to_end(unit)
+
+            if evicted:
+                self._refetch(unit)
+
+            return super().get(path)
+
+        value = super().get(path)
+        prefix = tuple(path_list)
+        with self._lock:
+            evicted = any(unit[:len(prefix)] == prefix for unit in self._evicted)
+        if not evicted:
+            return value
+        return self._resolve(path_list, value)
+
+    def _resolve(self, path_list, value):
+        """Return {value}, found at {path_list}, with evicted units loaded when read."""
+        if isinstance(value, Evicted):
+            path = '/'.join(path_list)
+            logger.debug('Loading evicted data: %s', path)
+            return self._loader(path)
+        if len(path_list) >= self._depth or not isinstance(value, Mapping):
+            return value
+        return LoadingTree(self, path_list, value)
+
+    def _refetch(self, unit):
+        path = '/'.join(unit)
+
+        with self._fetch_lock:
+            for _ in range(MAX_REFETCH_ATTEMPTS):
+                with self._lock:
+                    if unit not in self._evicted:
+                        # Fetched by another thread
+                        return
+                    missed = self._missed.get(unit, 0)
+
+                logger.debug('Fetching evicted data: %s', path)
+                value = self._loader(path)
+
+                with self._lock:
+                    if self._missed.get(unit, 0) != missed:
+                        # Changes were dropped during the fetch. It may be outdated.
+                        continue
+
+                    self._remove_unit(unit)
+                    super().set(path, value)
+                    self._track(list(unit), value)
+                    self._enforce(keep=unit)
+                    return
+
+            logger.warning('Evicted data kept changing while fetching: %s', path)
+
+    def _enforce(self, keep=None):
+        """Evict the least recently read units, until the budget is met."""
+        for unit in list(self._units):
+            if self.size <= self._budget:
+                return
+            if unit != keep:
+                self._evict(unit)
+
+    def _evict(self, unit):
+        size = self._units[unit]
+        node = self
+        for key in unit[:-1]:
+            node = node[key]
+        node[unit[-1]] = Evicted(size)
+
+        if self._fragments is not None:
+            self._fragments.invalidate(list(unit))
+
+        self._remove_unit(unit)
+        self._evicted.add(unit)
+        self.stats.evictions += 1
+        logger.debug('Evicted %s bytes: %s', size, '/'.join(unit))
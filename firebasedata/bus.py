@@ -0,0 +1,368 @@
+"""Re-broadcast LiveData changes to other local processes over a Unix domain socket.
+
+Every frame on the socket is a 4 byte, big-endian length, followed by a JSON object.
+Clients open with a subscription frame:
+
+    {"prefix": "some/path", "since": 42, "epoch": "..."}
+
+The server then replies with frames of these types:
+
+    {"type": "snapshot", "seq": 42, "epoch": "...", "path": "some/path", "value": ...}
+    {"type": "events", "events": [[43, "some/path/key", ...], ...]}
+
+Sequence numbers are only meaningful within an epoch, which is new for every publisher.
+A snapshot is sent when the client has no sequence number yet, when its epoch is not
+the publisher's, or when the events it missed are no longer in the server's history.
+"""
+import collections
+import itertools
+import json
+import logging
+import os
+import socket
+import struct
+import threading
+import time
+import uuid
+
+from . import data
+from . import live
+
+logger = logging.getLogger(__name__)
+
+FRAME_HEADER = struct.Struct('>I')
+HISTORY_SIZE = 10000
+BATCH_SIZE = 500
+RECONNECT_INTERVAL = 1.0
+
+
+def bus_path(path):
+    """Normalize {path}, using '/' for the root."""
+    norm_path = data.normalize_path(path)
+    return '/' if norm_path == '.' else norm_path
+
+
+def is_related_path(path, prefix):
+    """Return True if {path} is {prefix}, or one of its ancestors or descendants."""
+    if prefix == '/' or path == '/':
+        return True
+    return (
+        path == prefix
+        or path.startswith(prefix + '/')
+        or prefix.startswith(path + '/')
+    )
+
+
+def close_socket(sock):
+    # Shut down first, so threads blocked on the socket are woken up
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+    sock.close()
+
+
+def send_frame(sock, payload):
+    sock.sendall(FRAME_HEADER.pack(len(payload)) + payload)
+
+
+def _recv_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise ConnectionError('Socket closed')
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def recv_frame(sock):
+    size, = FRAME_HEADER.unpack(_recv_exactly(sock, FRAME_HEADER.size))
+    return json.loads(_recv_exactly(sock, size).decode('utf-8'))
+
+
+def _encode(value):
+    return json.dumps(
+        value, separators=(',', ':'), default=data.encode_default
+    ).encode('utf-8')
+
+
+class EventPublisher:
+    """Publish the changes applied to a LiveData instance on a Unix domain socket."""
+
+    def __init__(self, live_data, socket_path, history=HISTORY_SIZE,
+                 batch_size=BATCH_SIZE):
+        self._live_data = live_data
+        self._socket_path = socket_path
+        self._batch_size = batch_size
+        # Entries of (seq, path, encoded event)
+        self._history = collections.deque(maxlen=history)
+        self._cond = threading.Condition()
+        self._server = None
+        self._clients = set()
+        self._closed = False
+        self.seq = 0
+        self.epoch = uuid.uuid4().hex
+
+    def start(self):
+        if self._server is not None:
+            return
+
+        if os.path.exists(self._socket_path):
+            os.unlink(self._socket_path)
+
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self._socket_path)
+        self._server.listen()
+        self._live_data.signal('/').connect(self._on_change, weak=False)
+        threading.Thread(target=self._accept_worker, daemon=True).start()
+        logger.debug('Event publisher listening: %s', self._socket_path)
+
+    def close(self):
+        self._live_data.signal('/').disconnect(self._on_change)
+
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+        if self._server is not None:
+            close_socket(self._server)
+            self._server = None
+
+        for client in list(self._clients):
+            close_socket(client)
+
+        try:
+            os.unlink(self._socket_path)
+        except FileNotFoundError:
+            pass
+
+    def _on_change(self, sender, path=None, **kwargs):
+        norm_path = bus_path(path)
+
+        with self._cond:
+            seq = self.seq + 1
+            event = _encode([seq, norm_path, sender.get(norm_path)])
+            self._history.append((seq, norm_path, event))
+            self.seq = seq
+            self._cond.notify_all()
+
+    def _snapshot(self, prefix):
+        cache = self._live_data.get_data()
+
+        while True:
+            with self._cond:
+                seq = self.seq
+                try:
+                    value = cache.get(prefix)
+                    return seq, _encode({
+                        'type': 'snapshot',
+                        'seq': seq,
+                        'epoch': self.epoch,
+                        'path': prefix,
+                        'value': value,
+                    })
+                except RuntimeError:
+                    logger.debug('Data changed during snapshot. Retrying.')
+
+    def _next_batch(self, since):
+        """Return the next batch of history entries after {since}.
+
+        Returns None if entries after {since} have already been evicted.
+        """
+        with self._cond:
+            if since > self.seq:
+                # The client has seen a previous publisher's events
+                return None
+
+            while self.seq <= since and not self._closed:
+                self._cond.wait()
+
+            if self._closed:
+                raise ConnectionError('Publisher closed')
+
+            start = since + 1 - self._history[0][0]
+            if start < 0:
+                return None
+
+            return list(itertools.islice(
+                self._history, start, start + self._batch_size
+            ))
+
+    def _accept_worker(self):
+        while not self._closed:
+            try:
+                client, _ = self._server.accept()
+            except OSError:
+                return
+
+            threading.Thread(
+                target=self._client_worker,
+                args=(client,),
+                daemon=True
+            ).start()
+
+    def _client_worker(self, client):
+        self._clients.add(client)
+
+        try:
+            hello = recv_frame(client)
+            prefix = bus_path(hello.get('prefix') or '/')
+            since = hello.get('since')
+            if hello.get('epoch') != self.epoch:
+                # The client's sequence numbers are from another publisher
+                since = None
+            logger.debug('Bus client subscribed: prefix=%s since=%s', prefix, since)
+
+            while True:
+                batch = None if since is None else self._next_batch(since)
+
+                if batch is None:
+                    since, frame = self._snapshot(prefix)
+                    send_frame(client, frame)
+                    continue
+
+                events = [
+                    event for seq, path, event in batch
+                    if is_related_path(path, prefix)
+                ]
+                since = batch[-1][0]
+
+                if events:
+                    send_frame(
+                        client,
+                        b'{"type":"events","events":[' + b','.join(events) + b']}'
+                    )
+        except (ConnectionError, OSError) as e:
+            logger.debug('Bus client disconnected: %s', e)
+        except Exception:
+            logger.exception('Error serving bus client')
+        finally:
+            self._clients.discard(client)
+            client.close()
+
+
+class EventSubscriber(live.LiveData):
+    """LiveData-compatible mirror of the data published by an EventPublisher.
+
+    Changes received from the publisher are applied to a local FirebaseData, and fire
+    the same signals as they would on the publishing LiveData instance. Only data at,
+    above or below {prefix} is received.
+
+    Arguments:
+        socket_path: Path of the publisher's Unix domain socket.
+        prefix: Only receive changes related to this path.
+        since: Resume after this sequence number, instead of starting with a snapshot.
+        epoch: Epoch of the publisher that {since} came from. Required to resume.
+        reconnect_interval: Seconds to wait before reconnecting after an error.
+    """
+
+    def __init__(self, socket_path, prefix='/', since=None, epoch=None,
+                 reconnect_interval=RECONNECT_INTERVAL):
+        super().__init__(None, prefix)
+        self._socket_path = socket_path
+        self._prefix = bus_path(prefix)
+        self._reconnect_interval = reconnect_interval
+        self._sock = None
+        self._thread = None
+        self._closed = False
+        self._cache = data.FirebaseData({})
+        self.last_seq = since
+        self.epoch = epoch
+        self.connected = False
+
+    def get_data(self):
+        return self._cache
+
+    def set_data(self, path, value):
+        raise TypeError('EventSubscriber is read-only')
+
+    def set_data_async(self, path, value):
+        raise TypeError('EventSubscriber is read-only')
+
+    def set_data_diff(self, path, value):
+        raise TypeError('EventSubscriber is read-only')
+
+    def refresh(self, path):
+        raise TypeError('EventSubscriber receives its data from the publisher')
+
+    def set_subtree_ttl(self, path, ttl):
+        raise TypeError('EventSubscriber receives its data from the publisher')
+
+    def start_metawatcher(self):
+        raise TypeError('EventSubscriber receives its data from the publisher')
+
+    def listen(self):
+        if self._thread is not None:
+            return
+
+        self._closed = False
+        self._thread = threading.Thread(target=self._worker, daemon=True)
+        self._thread.start()
+
+    def hangup(self, block=True, timeout=None):
+        self._closed = True
+        sock = self._sock
+        if sock is not None:
+            close_socket(sock)
+
+        thread = self._thread
+        self._thread = None
+        if not block:
+            return None
+
+        if thread is not None:
+            thread.join(timeout)
+            if thread.is_alive():
+                return [sock]
+        return []
+
+    def restart(self):
+        self.hangup()
+        self.listen()
+
+    def _apply_frame(self, frame):
+        if frame.get('type') == 'snapshot':
+            logger.debug('Bus snapshot received: seq=%s', frame['seq'])
+            # Replace the subtree, since setting a dictionary merges it with the old one
+            self._cache.set(frame['path'], None)
+            self._set_path_value(frame['path'], frame['value'])
+            self.last_seq = frame['seq']
+            self.epoch = frame['epoch']
+        elif frame.get('type') == 'events':
+            for seq, path, value in frame['events']:
+                self._set_path_value(path, value)
+                self.last_seq = seq
+        else:
+            logger.warning('Invalid bus frame: %s', frame)
+
+    def _subscription(self):
+        return {
+            'prefix': self._prefix,
+            'since': self.last_seq,
+            'epoch': self.epoch,
+        }
+
+    def _connection_lost(self):
+        self.connected = False
+
+    def _worker(self):
+        while not self._closed:
+            try:
+                self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                self._sock.connect(self._socket_path)
+                send_frame(self._sock, _encode(self._subscription()))
+                self.connected = True
+
+                while not self._closed:
+                    self._apply_frame(recv_frame(self._sock))
+            except (ConnectionError, OSError) as e:
+                if not self._closed:
+                    logger.warning('Bus connection lost: %s', e)
+            finally:
+                self._sock.close()
+                self._connection_lost()
+
+            if not self._closed:
+                time.sleep(self._reconnect_interval)
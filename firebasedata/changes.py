@@ -0,0 +1,81 @@
+"""An ordered log of the changes applied to a LiveData instance.
+
+Every change gets a sequence number, so consumers can ask for the changes since the
+last one they saw, instead of comparing whole trees.
+"""
+import collections
+import copy
+import itertools
+import threading
+
+from . import data
+
+
+class Change(collections.namedtuple('Change', 'seq path value')):
+    __slots__ = ()
+
+    @property
+    def deleted(self):
+        """True if the change removed the data at its path."""
+        return self.value is None
+
+
+class HistoryEvicted(LookupError):
+    """The changes after a sequence number are no longer in the log."""
+
+    def __init__(self, seq, oldest):
+        super().__init__(
+            'Changes after sequence {} are not available. Oldest available: {}'.format(
+                seq, oldest
+            )
+        )
+        self.seq = seq
+        self.oldest = oldest
+
+
+class ChangeLog:
+    """Ring buffer of the latest {size} changes."""
+
+    def __init__(self, size):
+        self._entries = collections.deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.seq = 0
+
+    def append(self, path, value):
+        if isinstance(value, (dict, list)):
+            # The applied value is stored in the cache, and may be updated in place
+            value = copy.deepcopy(value)
+
+        with self._lock:
+            self.seq += 1
+            change = Change(self.seq, '/'.join(data.get_path_list(path)), value)
+            self._entries.append(change)
+
+        return change
+
+    def since(self, seq, prefix=None):
+        """Return the changes after {seq}, oldest first.
+
+        Arguments:
+            seq: Sequence number of the last change seen, or 0 for all changes.
+            prefix: Optional path. Only changes at, above or below it are returned.
+
+        Raises HistoryEvicted if some of the changes after {seq} were evicted, or if
+        {seq} is greater than the last sequence number.
+        """
+        with self._lock:
+            oldest = self._entries[0].seq if self._entries else self.seq + 1
+
+            if seq < oldest - 1 or seq > self.seq:
+                raise HistoryEvicted(seq, oldest)
+
+            entries = list(itertools.islice(self._entries, seq - oldest + 1, None))
+
+        if prefix is None:
+            return entries
+
+        prefix_list = data.get_path_list(prefix)
+        return [
+            change for change in entries
+            if data.is_related(data.get_path_list(change.path), prefix_list)
+        ]
@@ -0,0 +1,166 @@
+"""Close Firebase streams on a shared pool of worker threads.
+
+Closing a stream may hang, e.g. on a dead connection. Every close is given a timeout,
+after which it is abandoned: callers stop waiting for it, and another worker thread is
+started in place of the hung one.
+"""
+import logging
+import queue
+import threading
+import time
+
+DEFAULT_WORKERS = 4
+DEFAULT_TIMEOUT = 5.0
+
+logger = logging.getLogger(__name__)
+
+
+class CloseRequest:
+    def __init__(self, stream, timeout):
+        self.stream = stream
+        self.deadline = time.monotonic() + timeout
+        self.error = None
+        self.abandoned = False
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    @property
+    def closed(self):
+        return self.done and self.error is None
+
+    @property
+    def overdue(self):
+        return not self.done and time.monotonic() >= self.deadline
+
+    def wait(self, deadline=None):
+        """Wait until the stream is closed, or a deadline passes.
+
+        Arguments:
+            deadline: Optional time.monotonic() time to stop waiting at, if it is
+                earlier than the deadline of this request.
+
+        Returns True if the stream was closed.
+        """
+        if deadline is None or deadline > self.deadline:
+            deadline = self.deadline
+
+        self._done.wait(max(0, deadline - time.monotonic()))
+
+        if not self.done and not self.abandoned:
+            self.abandoned = True
+            logger.warning('Abandoned closing stream: %s', self.stream)
+
+        return self.closed
+
+
+class StreamCloser:
+    """Close streams on a small pool of worker threads.
+
+    Arguments:
+        workers: Number of streams that may be closed at the same time.
+        timeout: Seconds after which a queued close is abandoned.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, timeout=DEFAULT_TIMEOUT):
+        self._workers = workers
+        self._timeout = timeout
+        self._tasks = queue.Queue()
+        self._lock = threading.Lock()
+        # Worker threads, and the request each one is working on
+        self._threads = {}
+
+    def close(self, stream, timeout=None):
+        """Queue {stream} to be closed. Returns a CloseRequest."""
+        if timeout is None:
+            timeout = self._timeout
+
+        request = CloseRequest(stream, timeout)
+        self._tasks.put(request)
+        self._start_workers()
+        return request
+
+    def wait(self, requests, timeout=None):
+        """Wait until every request is done, or abandoned.
+
+        Arguments:
+            requests: CloseRequest instances returned by `close`.
+            timeout: Optional number of seconds to wait for all of them, in total.
+
+        Returns the streams that failed to close.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        failed = [
+            request.stream for request in requests
+            if not request.wait(deadline)
+        ]
+
+        if failed:
+            # Replace the workers that are stuck on abandoned streams
+            self._start_workers()
+
+        return failed
+
+    def _healthy_workers(self):
+        return sum(
+            1 for request in self._threads.values()
+            if request is None or not request.overdue
+        )
+
+    def _start_workers(self):
+        with self._lock:
+            for _ in range(self._workers - self._healthy_workers()):
+                thread = threading.Thread(target=self._work, daemon=True)
+                self._threads[thread] = None
+                thread.start()
+
+    def _work(self):
+        thread = threading.current_thread()
+
+        while True:
+            request = self._tasks.get()
+
+            with self._lock:
+                self._threads[thread] = request
+
+            self._close(request)
+
+            with self._lock:
+                self._threads[thread] = None
+
+                # A replacement was started while this worker was stuck
+                if self._healthy_workers() > self._workers:
+                    del self._threads[thread]
+                    return
+
+    def _close(self, request):
+        stream = request.stream
+        logger.debug('Closing stream: %s', stream)
+
+        try:
+            stream.close()
+        except Exception as e:
+            request.error = e
+            logger.warning('Error closing stream %s: %s', stream, e)
+        else:
+            if request.abandoned:
+                logger.info('Abandoned stream closed late: %s', stream)
+            else:
+                logger.debug('Stream closed: %s', stream)
+
+        request._done.set()
+
+
+_closer = StreamCloser()
+
+
+def close(stream, timeout=None):
+    """Queue {stream} to be closed on the shared closer. Returns a CloseRequest."""
+    return _closer.close(stream, timeout)
+
+
+def wait(requests, timeout=None):
+    """Wait for CloseRequests of the shared closer. Returns streams that failed."""
+    return _closer.wait(requests, timeout)
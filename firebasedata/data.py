@@ -1,10 +1,16 @@
 import collections
+import collections.abc
+from collections.abc import Mapping
+import copy
 import datetime
+import json
 import os.path
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 Node = collections.namedtuple('Node', 'value parent key')
+_fragments_lock = threading.Lock()
 
 
 def get_path_list(path):
@@ -16,6 +22,34 @@ def get_path_list(path):
     return path.split('/')
 
 
+def is_related(path_list, other_path_list):
+    """Return True if one path list is the other, or one of its ancestors."""
+    depth = min(len(path_list), len(other_path_list))
+    return path_list[:depth] == other_path_list[:depth]
+
+
+def diff(old, new, path_list=None):
+    """Yield `(path_list, value)` for each change that turns {old} into {new}.
+
+    Dictionaries are compared item by item, so unchanged items yield nothing. Removed
+    items yield a value of None. Booleans are never equal to numbers.
+    """
+    if path_list is None:
+        path_list = []
+
+    if not isinstance(old, Mapping) or not isinstance(new, Mapping):
+        if old != new or isinstance(old, bool) != isinstance(new, bool):
+            yield path_list, new
+        return
+
+    for key, old_child in old.items():
+        if key not in new:
+            yield path_list + [key], None
+
+    for key, new_child in new.items():
+        yield from diff(old.get(key), new_child, path_list + [key])
+
+
 def normalize_path(path):
     return os.path.normpath(
         '/'.join(
@@ -24,8 +58,199 @@ def normalize_path(path):
     )
 
 
+def view(value):
+    """Return a read-only view of {value}, if it is a dictionary or list."""
+    if isinstance(value, Mapping):
+        return MappingView(value)
+    if isinstance(value, list):
+        return SequenceView(value)
+    return value
+
+
+class MappingView(Mapping):
+    """Read-only view of a dictionary. Nested dictionaries and lists are viewed too.
+
+    Nothing is copied, so the view reflects later changes to the data.
+    """
+
+    __slots__ = ('_value',)
+
+    def __init__(self, value):
+        self._value = value
+
+    def __getitem__(self, key):
+        return view(self._value[key])
+
+    def __iter__(self):
+        return iter(self._value)
+
+    def __len__(self):
+        return len(self._value)
+
+    def __contains__(self, key):
+        return key in self._value
+
+    def materialize(self):
+        """Return a mutable, deep copy of the data."""
+        return copy.deepcopy(self._value)
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, self._value)
+
+
+class SequenceView(collections.abc.Sequence):
+    """Read-only view of a list. Nested dictionaries and lists are viewed too."""
+
+    __slots__ = ('_value',)
+
+    def __init__(self, value):
+        self._value = value
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return SequenceView(self._value[index])
+        return view(self._value[index])
+
+    def __len__(self):
+        return len(self._value)
+
+    def __eq__(self, other):
+        if isinstance(other, SequenceView):
+            other = other._value
+        if not isinstance(other, list):
+            return NotImplemented
+        return self._value == other
+
+    def materialize(self):
+        """Return a mutable, deep copy of the data."""
+        return copy.deepcopy(self._value)
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, self._value)
+
+
+def encode_default(value):
+    """Encode values that `json` does not support, such as schema records.
+
+    For the `default` argument of `json.dumps`.
+    """
+    if isinstance(value, Mapping):
+        return dict(value)
+    raise TypeError(
+        'Object of type {} is not JSON serializable'.format(type(value).__name__)
+    )
+
+
+def _encode_json(value):
+    return json.dumps(
+        value, separators=(',', ':'), default=encode_default
+    ).encode('utf-8')
+
+
+class Fragment:
+    __slots__ = ('json', 'parts', 'children')
+
+    def __init__(self):
+        # Encoding of the whole dictionary
+        self.json = None
+        # Encodings of its items, as `"key":value`, by key
+        self.parts = {}
+        self.children = {}
+
+
+class FragmentCache:
+    """Cached JSON encodings of the dictionaries in a FirebaseData tree, by path.
+
+    Encodings are stored in a tree of Fragments that mirrors the data. When an item
+    changes, its dictionary is rebuilt from the cached encodings of its other items.
+    Encodings that were computed while the data changed are discarded, by comparing
+    versions.
+    """
+
+    def __init__(self):
+        self.root = Fragment()
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self, path_list):
+        """Discard the encodings of {path_list}, its ancestors and its descendants."""
+        with self._lock:
+            self.version += 1
+            node = self.root
+
+            for key in path_list:
+                node.json = None
+                node.parts.pop(key, None)
+                parent = node
+                node = node.children.get(key)
+                if node is None:
+                    return
+
+            if path_list:
+                del parent.children[path_list[-1]]
+            else:
+                self.root = Fragment()
+
+    def find(self, path_list):
+        node = self.root
+        for key in path_list:
+            node = node.children.get(key)
+            if node is None:
+                return None
+        return node
+
+    def store(self, version, encodings):
+        """Store `(path_list, encoding, parts)`, unless data changed since {version}."""
+        with self._lock:
+            if version != self.version:
+                return
+
+            for path_list, encoding, parts in encodings:
+                node = self.root
+                for key in path_list:
+                    child = node.children.get(key)
+                    if child is None:
+                        child = node.children[key] = Fragment()
+                    node = child
+                node.json = encoding
+                node.parts = parts
+
+    def encode(self, value, path_list, node, encodings):
+        """Return the JSON encoding of {value}, reusing cached encodings under {node}.
+
+        New encodings of dictionaries are appended to {encodings}.
+        """
+        if not isinstance(value, Mapping):
+            return _encode_json(value)
+
+        if node is None:
+            node = Fragment()
+        elif node.json is not None:
+            return node.json
+
+        cached_parts = node.parts
+        children = node.children
+        parts = {}
+
+        for key, child in value.items():
+            part = cached_parts.get(key)
+            if part is None:
+                part = _encode_json(str(key)) + b':' + self.encode(
+                    child, path_list + [key], children.get(key), encodings
+                )
+            parts[key] = part
+
+        encoding = b'{' + b','.join(parts.values()) + b'}'
+        encodings.append((path_list, encoding, parts))
+        return encoding
+
+
 class FirebaseData(dict):
     last_updated_at = None
+    # Created by the first call to `get_json`
+    _fragments = None
+    # Schemas applied by `set`, see `register_schema`
+    _schemas = ()
 
     def __init__(self, *args, **kwargs):
         self._set_last_updated()
@@ -104,8 +329,25 @@ class FirebaseData(dict):
             else:
                 self._update(node.parent, {node.key: value})
 
+        if self._schemas:
+            path_list = get_path_list(path)
+            for schema in self._schemas:
+                schema.apply(self, path_list)
+
+        if self._fragments is not None:
+            self._fragments.invalidate(get_path_list(path))
+
         self._set_last_updated()
 
+    def register_schema(self, schema):
+        """Store the dictionaries that match {schema} in its compact form.
+
+        Dictionaries that already match are converted now. Ones that are set later are
+        converted by `set`. See `schema.Schema` and `series.SeriesSchema`.
+        """
+        self._schemas = self._schemas + (schema,)
+        schema.apply(self)
+
     def get(self, path='/'):
         parts = get_path_list(path)
         node = self
@@ -121,6 +363,45 @@ class FirebaseData(dict):
         except AttributeError:
             return node
 
+    def get_view(self, path='/'):
+        """Return the value at {path}, as a read-only view if it is a dictionary or list.
+
+        Views do not copy any data. Use their `materialize` method for a mutable copy.
+        """
+        return view(self.get(path))
+
+    def get_json(self, path='/'):
+        """Return the value at {path}, encoded as compact JSON bytes.
+
+        The encodings of dictionaries are cached, and reused until `set` changes them,
+        so unchanged subtrees are not encoded again. Data must only be changed with
+        `set` once this is used.
+        """
+        if self._fragments is None:
+            with _fragments_lock:
+                if self._fragments is None:
+                    self._fragments = FragmentCache()
+
+        fragments = self._fragments
+        path_list = get_path_list(path)
+
+        while True:
+            version = fragments.version
+            encodings = []
+            try:
+                encoding = fragments.encode(
+                    self.get(path),
+                    path_list,
+                    fragments.find(path_list),
+                    encodings
+                )
+            except RuntimeError:
+                logger.debug('Data changed during encoding. Retrying.')
+                continue
+
+            fragments.store(version, encodings)
+            return encoding
+
     def __repr__(self):
         tmpl = '{cls}(id={id}, last_updated_at={ts}, data={data})'
 
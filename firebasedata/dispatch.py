@@ -0,0 +1,260 @@
+"""Signals with receiver priorities and rate limits.
+
+Receivers connected with a higher priority are called first. A change is sent on the
+signals of the changed path and of each of its ancestors, and receivers are ordered
+across all of them, so a high priority receiver of a deep path runs before a low
+priority receiver of the root.
+
+A rate limited receiver is called from a worker thread, never from the thread that sends
+the signal. Sends that arrive faster than its rate are coalesced: the receiver is only
+called with the latest one.
+"""
+import inspect
+import logging
+import threading
+import time
+import weakref
+
+import blinker
+from blinker import ANY
+
+from . import watcher
+
+DEFAULT_WORKERS = 2
+
+logger = logging.getLogger(__name__)
+# Runs the calls of rate limited receivers
+_scheduler = watcher.Scheduler(workers=DEFAULT_WORKERS)
+
+
+class TokenBucket:
+    """Allows {rate} events per second on average, and bursts of up to {burst}.
+
+    Not thread safe.
+    """
+
+    def __init__(self, rate, burst=1):
+        if rate <= 0:
+            raise ValueError('Rate must be positive')
+        if burst < 1:
+            raise ValueError('Burst must be at least 1')
+
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+
+    def delay(self):
+        """Return the seconds until an event is allowed, or 0."""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+        if self._tokens >= 1:
+            return 0
+        return (1 - self._tokens) / self.rate
+
+    def take(self):
+        """Allow an event, if possible. Returns 0 if it was allowed, like `delay`."""
+        delay = self.delay()
+        if not delay:
+            self._tokens -= 1
+        return delay
+
+
+class Throttle:
+    """Call {receiver} at most {rate} times per second, with the latest send only.
+
+    Calls are made one at a time, from a worker thread.
+
+    Attributes:
+        delivered: Calls of {receiver}.
+        coalesced: Sends that were replaced by a later one, before they were delivered.
+    """
+
+    def __init__(self, receiver, rate, burst=1):
+        self.receiver = receiver
+        self._bucket = TokenBucket(rate, burst)
+        self._lock = threading.Lock()
+        # Latest `(sender, kwargs)` not yet delivered
+        self._pending = None
+        # True while a delivery is scheduled or running
+        self._active = False
+        self.delivered = 0
+        self.coalesced = 0
+
+    def __call__(self, sender, **kwargs):
+        with self._lock:
+            if self._pending is not None:
+                self.coalesced += 1
+            self._pending = (sender, kwargs)
+
+            if self._active:
+                return
+            self._active = True
+            delay = self._bucket.delay()
+
+        _scheduler.schedule(delay, self._deliver)
+
+    def _deliver(self):
+        with self._lock:
+            delay = self._bucket.take()
+            if not delay:
+                sender, kwargs = self._pending
+                self._pending = None
+                self.delivered += 1
+
+        if delay:
+            _scheduler.schedule(delay, self._deliver)
+            return
+
+        try:
+            self.receiver(sender, **kwargs)
+        except Exception:
+            logger.exception('Error in rate limited receiver: %s', self.receiver)
+
+        with self._lock:
+            if self._pending is None:
+                self._active = False
+                return
+            delay = self._bucket.delay()
+
+        _scheduler.schedule(delay, self._deliver)
+
+    def __repr__(self):
+        return '{}(receiver={!r}, rate={})'.format(
+            type(self).__name__,
+            self.receiver,
+            self._bucket.rate
+        )
+
+
+def _identity(receiver):
+    """Return a key that identifies {receiver}, as long as it exists.
+
+    Bound methods are identified by their instance and function, since each lookup
+    creates a new method object.
+    """
+    if inspect.ismethod(receiver):
+        return id(receiver.__self__), id(receiver.__func__)
+    return id(receiver)
+
+
+def _reference(receiver, weak):
+    """Return a function that returns what keeps {receiver} alive, or None once gone."""
+    target = receiver.__self__ if inspect.ismethod(receiver) else receiver
+    if weak:
+        return weakref.ref(target)
+    return lambda: target
+
+
+class PrioritySignal(blinker.NamedSignal):
+    """Signal that calls receivers in priority order, and can rate limit them.
+
+    Only uses the public API of `blinker.Signal`.
+    """
+
+    def __init__(self, name, doc=None):
+        super().__init__(name, doc)
+        # (reference, priority) of receivers that have a priority, by identity. Entries
+        # of weakly referenced receivers that are gone are removed when read.
+        self._priorities = {}
+        # Throttles of rate limited receivers, by the identity of the receiver they wrap
+        self._throttles = {}
+
+    @property
+    def prioritized(self):
+        self._remove_gone_priorities()
+        return bool(self._priorities)
+
+    def _remove_gone_priorities(self):
+        for key, (reference, priority) in list(self._priorities.items()):
+            if reference() is None:
+                del self._priorities[key]
+
+    def connect(self, receiver, sender=ANY, weak=True, priority=0, rate=None, burst=1):
+        """Connect {receiver}, like `blinker.Signal.connect`.
+
+        Arguments:
+            priority: Receivers with a higher priority are called first. Defaults to 0.
+            rate: Optional maximum number of calls per second. If given, {receiver} is
+                called from a worker thread, with the latest send only, and is not
+                weakly referenced.
+            burst: Number of calls that may be made at once, within {rate}.
+        """
+        target = receiver
+        if rate is not None:
+            target = Throttle(receiver, rate, burst)
+            self._throttles[_identity(receiver)] = target
+            weak = False
+
+        super().connect(target, sender, weak)
+        if priority:
+            self._priorities[_identity(target)] = (_reference(target, weak), priority)
+        return receiver
+
+    def disconnect(self, receiver, sender=ANY):
+        throttle = self._throttles.get(_identity(receiver))
+        if throttle is not None:
+            if sender is ANY:
+                del self._throttles[_identity(receiver)]
+            receiver = throttle
+        super().disconnect(receiver, sender)
+        if sender is ANY:
+            self._priorities.pop(_identity(receiver), None)
+
+    def throttle(self, receiver):
+        """Return the Throttle of {receiver}, if it is rate limited, or None."""
+        return self._throttles.get(_identity(receiver))
+
+    def priority_of(self, receiver):
+        entry = self._priorities.get(_identity(receiver))
+        # A receiver that is gone may have had the same identity
+        if entry is None or entry[0]() is None:
+            return 0
+        return entry[1]
+
+    def receivers_for(self, sender):
+        receivers = super().receivers_for(sender)
+        if not self.prioritized:
+            return receivers
+        # Stable, so receivers with the same priority keep their order
+        return iter(sorted(receivers, key=self.priority_of, reverse=True))
+
+
+class Namespace(blinker.Namespace):
+    """Mapping of signal names to PrioritySignals."""
+
+    def signal(self, name, doc=None):
+        try:
+            return self[name]
+        except KeyError:
+            return self.setdefault(name, PrioritySignal(name, doc))
+
+
+def send(sender, deliveries):
+    """Send each signal in {deliveries}, a list of `(signal, kwargs)`.
+
+    If any receiver has a priority, receivers are called in priority order across all
+    of the signals. Otherwise, each signal is sent in turn.
+    """
+    if not any(
+        isinstance(signal, PrioritySignal) and signal.prioritized
+        for signal, kwargs in deliveries
+    ):
+        for signal, kwargs in deliveries:
+            signal.send(sender, **kwargs)
+        return
+
+    calls = []
+    for signal, kwargs in deliveries:
+        for receiver in signal.receivers_for(sender):
+            priority = (
+                signal.priority_of(receiver) if isinstance(signal, PrioritySignal) else 0
+            )
+            calls.append((priority, receiver, kwargs))
+
+    # Stable, so receivers with the same priority keep the order of the signals
+    calls.sort(key=lambda call: call[0], reverse=True)
+    for priority, receiver, kwargs in calls:
+        receiver(sender, **kwargs)
@@ -1,47 +1,176 @@
+import asyncio
+from collections.abc import Mapping
+import concurrent.futures
 import datetime
 import logging
-import queue
 import threading
+import time
 
-from blinker.base import Namespace
-
+from . import aiowatcher
+from . import changes
+from . import closer
 from . import data
+from . import dispatch
 from . import watcher
 
 logger = logging.getLogger(__name__)
 RETRY_INTERVAL = datetime.timedelta(minutes=1)
+MAX_REFRESH_ATTEMPTS = 3
+# Seconds after which a write the stream has not echoed is no longer waited for
+PENDING_WRITE_TIMEOUT = 30
+
+
+class StreamHealth:
+    """Health of the stream that a LiveData instance is currently listening to."""
+
+    def __init__(self):
+        self.state = 'connecting'
+        self.connected_at = datetime.datetime.utcnow()
+        self.last_message_at = None
+        self.last_keep_alive_at = None
+        self.messages = 0
+        self.keep_alives = 0
+        self.error = None
+
+    def as_dict(self):
+        return dict(vars(self))
+
+    def __repr__(self):
+        return '{}(state={}, messages={}, keep_alives={})'.format(
+            type(self).__name__,
+            self.state,
+            self.messages,
+            self.keep_alives
+        )
 
 
 class LiveData(object):
-    def __init__(self, pyrebase_app, root_path, ttl=None, retry_interval=None):
+    def __init__(self, pyrebase_app, root_path, ttl=None, retry_interval=None,
+                 retry_backoff=None, write_client=None, history=None,
+                 memory_budget=None, eviction_depth=None, skip_unchanged=False):
         self._app = pyrebase_app
         self._root_path = root_path
         self._ttl = ttl
         self._retry_interval = (
             RETRY_INTERVAL if retry_interval is None else retry_interval
         )
-        self._db = self._app.database()
+        # Without a backoff, retry at a fixed interval (see `start_metawatcher`)
+        self._retry_backoff = retry_backoff
+        # Without a write client, writes are sent through Pyrebase
+        self._write_client = write_client
+        # Created by `set_data_async` when no write client was given
+        self._async_write_client = None
+        # Skip writes of values that equal the cached data
+        self._skip_unchanged = skip_unchanged
+        # Subclasses that receive data from elsewhere may not have an app
+        self._db = None if pyrebase_app is None else self._app.database()
         self._streams = {}
-        self._gc_streams = queue.Queue()
-        self._gc_thread = None
         self._cache = None
-        self.events = Namespace()
+        # time.monotonic() after which data is stale, unless more messages arrive
+        self._stale_deadline = None
+        self._recorder = None
+        self._health = None
+        # Approximate number of bytes of data to keep in memory, if limited
+        self._memory_budget = memory_budget
+        self._eviction_depth = eviction_depth
+        # Schemas of subtrees stored as records
+        self._schemas = []
+        # time.monotonic() deadlines of subtrees with their own ttl, by path
+        self._subtree_deadlines = {}
+        self._subtree_ttls = {}
+        # Serializes changes to the cache, between the stream and `refresh`
+        self._apply_lock = threading.RLock()
+        # [path list, number of changes related to it] of refreshes in progress
+        self._refresh_counters = {}
+        # (path list, value, deadline) of writes the stream has not echoed yet
+        self._pending_writes = {}
+        # Log of the latest {history} changes, if enabled
+        self._changes = None if history is None else changes.ChangeLog(history)
+        self._async_watcher = None
+        self.events = dispatch.Namespace()
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            # Schedule watchers on the running loop instead of in threads
+            self._async_watcher = aiowatcher.get_engine(loop)
 
         self._handlers = {
             'put': self._put_handler,
             'patch': self._patch_handler,
         }
+        # Events that carry no data changes. These only require an event type.
+        self._control_handlers = {
+            'keep-alive': self._keep_alive_handler,
+            'cancel': self._revoked_handler,
+            'auth_revoked': self._revoked_handler,
+        }
+
+    @property
+    def _watcher(self):
+        if self._async_watcher is not None:
+            return self._async_watcher
+        return watcher
 
     def get_data(self):
         if self._cache is None:
             # Fetch data now
             value = self._db.child(self._root_path).get().val()
-            self._cache = data.FirebaseData(value)
+            self._cache = self._make_cache(value)
+            self._touch()
             # Listen for updates
             self.listen()
 
         return self._cache
 
+    def _make_cache(self, value):
+        if self._memory_budget is None:
+            cache = data.FirebaseData(value)
+        else:
+            from . import budget
+            cache = budget.BoundedData(
+                value,
+                self._memory_budget,
+                self._fetch_path,
+                depth=self._eviction_depth or budget.EVICTION_DEPTH
+            )
+
+        for schema in self._schemas:
+            cache.register_schema(schema)
+        return cache
+
+    def register_schema(self, schema):
+        """Store the subtrees that match {schema} in its compact form.
+
+        See `schema.Schema` and `series.SeriesSchema`. Applies to the current data, and
+        to data fetched later.
+        """
+        self._schemas.append(schema)
+        if self._cache is not None:
+            self._cache.register_schema(schema)
+
+    def _child(self, path):
+        child = self._db.child(self._root_path)
+        for path_part in data.get_path_list(path):
+            child = child.child(path_part)
+        return child
+
+    def _fetch_path(self, path):
+        return self._child(path).get().val()
+
+    def cache_stats(self):
+        """Return cache hits, misses and evictions, if a memory budget is set."""
+        cache = self._cache
+        if self._memory_budget is None or cache is None:
+            return None
+
+        result = cache.stats.as_dict()
+        result['size'] = cache.size
+        result['budget'] = cache.budget
+        return result
+
     def get_data_silent(self):
         try:
             return self.get_data()
@@ -49,43 +178,268 @@ class LiveData(object):
             logger.exception('Error getting data')
 
     def set_data(self, path, value):
+        """Set {value} at {path}, and wait for the write to finish.
+
+        With `skip_unchanged`, the write is skipped if {value} equals the cached data at
+        {path}. Returns False if it was skipped, or True otherwise.
+        """
+        if self._is_unchanged(path, value):
+            return False
+
+        self._set(path, value, track=self._skip_unchanged)
+        return True
+
+    def _set(self, path, value, track=True):
+        tokens = [self._track_write(path, value)] if track else []
+        try:
+            if self._write_client is not None:
+                self._write_client.set(self._write_path(path), value)
+                return
+
+            self._child(path).set(value)
+        except Exception:
+            self._forget_writes(tokens)
+            raise
+
+    def set_data_async(self, path, value):
+        """Set {value} at {path} without waiting for the write to finish.
+
+        Returns a `concurrent.futures.Future`. If no write client was given, one is
+        created for the Pyrebase app, and only used by this method. With
+        `skip_unchanged`, a write of a value that equals the cached data is skipped, and
+        its future is already done.
+        """
+        if self._is_unchanged(path, value):
+            future = concurrent.futures.Future()
+            future.set_result(None)
+            return future
+
+        client = self._write_client
+        if client is None:
+            if self._async_write_client is None:
+                from . import writer
+                self._async_write_client = writer.WriteClient.from_app(self._app)
+            client = self._async_write_client
+
+        if not self._skip_unchanged:
+            return client.set_async(self._write_path(path), value)
+
+        token = self._track_write(path, value)
+        future = client.set_async(self._write_path(path), value)
+        future.add_done_callback(
+            lambda future: self._async_write_done(future, [token])
+        )
+        return future
+
+    def _async_write_done(self, future, tokens):
+        if future.cancelled() or future.exception() is not None:
+            self._forget_writes(tokens)
+
+    def set_data_diff(self, path, value):
+        """Set {value} at {path}, writing only the parts that differ from the cache.
+
+        The changed values are sent in one multi-path update. If the cache is not up to
+        date, or the value at {path} is not a dictionary before and after, all of
+        {value} is set instead.
+
+        Returns the update that was sent, as a dictionary of values by path, relative to
+        {path}, which is empty if nothing changed. Returns None if all of {value} was set.
+        """
+        cache = self._current_cache(path)
+        if cache is None:
+            self._set(path, value)
+            return None
+
+        updates = {}
+        for path_list, child in data.diff(cache.get(path), value):
+            if not path_list:
+                self._set(path, value)
+                return None
+            updates['/'.join(path_list)] = child
+
+        if updates:
+            self._update(path, updates)
+        else:
+            logger.debug('Skipping unchanged write: %s', path)
+        return updates
+
+    def _update(self, path, updates):
+        tokens = [
+            self._track_write('{}/{}'.format(path, rel_path), value)
+            for rel_path, value in updates.items()
+        ]
+        try:
+            if self._write_client is not None:
+                self._write_client.update(self._write_path(path), updates)
+                return
+
+            self._child(path).update(updates)
+        except Exception:
+            self._forget_writes(tokens)
+            raise
+
+    def _track_write(self, path, value):
+        """Wait for the stream to echo a write of {value} at {path}. Returns a token.
+
+        Only writes that may be compared with the cache later are tracked: those of
+        `set_data_diff`, and all writes with `skip_unchanged`.
+        """
         path_list = data.get_path_list(path)
-        child = self._db.child(self._root_path)
+        token = object()
 
-        for path_part in path_list:
-            child = child.child(path_part)
-        child.set(value)
+        with self._apply_lock:
+            now = time.monotonic()
+            for key, (pending_path, _, deadline) in list(self._pending_writes.items()):
+                if deadline <= now or pending_path[:len(path_list)] == path_list:
+                    # Expired, or replaced by this write
+                    del self._pending_writes[key]
+            self._pending_writes[token] = (path_list, value, now + PENDING_WRITE_TIMEOUT)
+
+        return token
+
+    def _forget_writes(self, tokens):
+        with self._apply_lock:
+            for token in tokens:
+                self._pending_writes.pop(token, None)
+
+    def _has_pending_write(self, path):
+        """Return True if a write at, above or below {path} has not been echoed."""
+        path_list = data.get_path_list(path)
+        now = time.monotonic()
+
+        with self._apply_lock:
+            return any(
+                deadline > now and data.is_related(path_list, pending_path)
+                for pending_path, _, deadline in self._pending_writes.values()
+            )
+
+    def _clear_echoed_writes(self, path_list, value):
+        """Stop waiting for the writes that a change of {value} at {path_list} echoes.
+
+        Only changes at or above a write can echo it. They are compared with the
+        written value directly, since reading the cache may fetch evicted data.
+        """
+        now = time.monotonic()
+        depth = len(path_list)
+
+        for token, (pending_path, pending_value, deadline) in list(
+            self._pending_writes.items()
+        ):
+            if deadline <= now:
+                del self._pending_writes[token]
+                continue
+            if pending_path[:depth] != path_list:
+                continue
+
+            echoed = value
+            for part in pending_path[depth:]:
+                echoed = echoed.get(part) if isinstance(echoed, Mapping) else None
+            if not any(data.diff(echoed, pending_value)):
+                del self._pending_writes[token]
+
+    def _current_cache(self, path):
+        """Return the cache, if its data at {path} is up to date.
+
+        It is if a stream that is not stale keeps it up to date, and the stream has
+        echoed every write at, above or below {path}.
+        """
+        cache = self._cache
+        if cache is None or not self._streams or self.is_stale():
+            return None
+        if self._has_pending_write(path):
+            logger.debug('Waiting for a write to be echoed: %s', path)
+            return None
+        return cache
+
+    def _is_unchanged(self, path, value):
+        if not self._skip_unchanged:
+            return False
+
+        cache = self._current_cache(path)
+        if cache is None or any(data.diff(cache.get(path), value)):
+            return False
+
+        logger.debug('Skipping unchanged write: %s', path)
+        return True
+
+    def _write_path(self, path):
+        return '/'.join(
+            data.get_path_list(self._root_path) + data.get_path_list(path)
+        )
+
+    def _touch(self):
+        if self._ttl is not None:
+            self._stale_deadline = time.monotonic() + self._ttl.total_seconds()
 
     def is_stale(self):
         if self._ttl is None:
             return False
 
-        data = self.get_data()
-        if data is None or data.last_updated_at is None:
-            logger.debug('Data is invalid: %s', data)
+        deadline = self._stale_deadline
+        if self._cache is None or deadline is None:
+            logger.debug('Data is invalid: %s', self._cache)
             return True
 
-        stale = datetime.datetime.utcnow() - data.last_updated_at > self._ttl
+        stale = time.monotonic() >= deadline
         if stale:
-            logger.debug('Data is stale: %s', data)
+            logger.debug('Data is stale: %s', self._cache)
         else:
-            logger.debug('Data is fresh: %s', data)
+            logger.debug('Data is fresh: %s', self._cache)
         return stale
 
+    def _time_until_stale(self):
+        deadline = self._stale_deadline
+        if deadline is None:
+            # Without a ttl, data never becomes stale
+            return self._ttl or watcher.DEFAULT_INTERVAL
+
+        return datetime.timedelta(seconds=max(0, deadline - time.monotonic()))
+
+    def view(self, source, filter_func=None, map_func=None):
+        """Return a `views.View` of the children under {source}.
+
+        The view is updated as changes arrive, until it is closed.
+        """
+        from . import views
+        return views.View(self, source, filter_func, map_func)
+
+    def selector(self, func, depends_on):
+        """Return a `views.Selector`, memoizing {func} until {depends_on} paths change.
+
+        {func} is called with the data of this instance. Call the selector to get the
+        result.
+        """
+        from . import views
+        return views.Selector(self, func, depends_on)
+
     def signal(self, path, doc=None):
         norm_path = data.normalize_path(path)
         return self.events.signal(norm_path, doc=doc)
 
+    def stream_health(self):
+        """Return the health of the current stream, as a dictionary, or None."""
+        health = self._health
+        if health is None:
+            return None
+
+        result = health.as_dict()
+        if result['state'] == 'live' and self.is_stale():
+            result['state'] = 'stale'
+        return result
+
     def listen(self):
+        self._health = StreamHealth()
         stream = self._db.child(self._root_path).stream(self._stream_handler)
         self._streams[id(stream)] = stream
-        self._start_stream_gc()
-        watcher.watch(
+        self._watcher.watch(
             id(self),
             self.is_stale,
             self.restart,
-            interval=self._ttl
+            # Check again when the data would become stale
+            interval=self._time_until_stale
         )
+        for path in self._subtree_ttls:
+            self._watch_subtree(path)
         # If the stream and stale watcher are established,
         # the metawatcher is no longer needed.
         self.cancel_metawatcher()
@@ -94,55 +448,272 @@ class LiveData(object):
         return 'meta_{}'.format(id(self))
 
     def start_metawatcher(self):
-        watcher.watch(
+        if self._retry_backoff is None:
+            self._retry_backoff = watcher.Backoff(self._retry_interval, multiplier=1)
+
+        self._watcher.watch(
             self.get_metawatcher_name(),
-            lambda: self._cache is None,
-            self.get_data_silent,
-            interval=self._retry_interval
+            lambda: self._cache is None or not self._streams,
+            self.connect_silent,
+            interval=self._retry_interval,
+            backoff=self._retry_backoff
         )
 
+    def connect_silent(self):
+        """Fetch the data if there is none, or else only open a new stream."""
+        try:
+            if self._cache is None:
+                self.get_data()
+            elif not self._streams:
+                self.listen()
+        except Exception:
+            logger.exception('Error connecting')
+
+    @property
+    def retry_attempts(self):
+        """Number of reconnection attempts scheduled since the last success."""
+        if self._retry_backoff is None:
+            return 0
+        return self._retry_backoff.attempts
+
+    @property
+    def next_retry_at(self):
+        """UTC datetime of the next reconnection attempt, or None."""
+        if self._retry_backoff is None:
+            return None
+        return self._retry_backoff.next_retry_at
+
     def cancel_metawatcher(self):
-        watcher.cancel(self.get_metawatcher_name())
+        self._watcher.cancel(self.get_metawatcher_name())
 
     def restart(self):
         self.reset()
         self.start_metawatcher()
         self.get_data_silent()
 
+    def reconnect(self):
+        """Close the streams, and let the metawatcher open a new one.
+
+        The cache is kept, and the new stream sends all of the data again. Attempts are
+        scheduled with the retry backoff, which is only reset once a stream sends data.
+        """
+        self.hangup(block=False)
+        self.start_metawatcher()
+
+    def refresh(self, path):
+        """Fetch the data at {path} again, and apply only the differences.
+
+        Signals are only sent for the paths that changed. Returns the list of changed
+        paths. If the stream changes the subtree during the fetch, the fetched data may
+        be outdated, so it is fetched again, up to MAX_REFRESH_ATTEMPTS times.
+        """
+        if self._cache is None:
+            self.get_data()
+            return []
+
+        path_list = data.get_path_list(path)
+        norm_path = '/'.join(path_list)
+        for _ in range(MAX_REFRESH_ATTEMPTS):
+            logger.debug('Refreshing subtree: %s', norm_path)
+            token = object()
+            with self._apply_lock:
+                self._refresh_counters[token] = [path_list, 0]
+            try:
+                new_value = self._fetch_path(norm_path)
+            finally:
+                with self._apply_lock:
+                    missed = self._refresh_counters.pop(token)[1]
+
+            with self._apply_lock:
+                if missed:
+                    # The stream changed the subtree during the fetch. It may be outdated.
+                    continue
+
+                cache = self.get_data()
+                # Compute all differences first, since applying them changes the cache
+                differences = list(data.diff(cache.get(norm_path), new_value, path_list))
+                changed = []
+                for change_path_list, value in differences:
+                    change_path = '/'.join(change_path_list)
+                    self._apply_change(change_path, value)
+                    changed.append(change_path)
+            break
+        else:
+            logger.warning('Subtree kept changing while refreshing: %s', norm_path)
+            self._defer_subtree(norm_path)
+            return []
+
+        for change_path in changed:
+            self._notify_change(change_path)
+        self._touch_subtree(norm_path)
+        logger.debug('Refreshed subtree %s: %s changes', norm_path, len(changed))
+        return changed
+
+    def _refresh_silent(self, path):
+        try:
+            return self.refresh(path)
+        except Exception:
+            logger.exception('Error refreshing subtree: %s', path)
+            self._defer_subtree('/'.join(data.get_path_list(path)))
+
+    def set_subtree_ttl(self, path, ttl):
+        """Refresh the subtree at {path} once it has not changed for {ttl}.
+
+        Arguments:
+            path: Path of the subtree.
+            ttl: datetime.timedelta, or None to stop refreshing the subtree.
+        """
+        norm_path = '/'.join(data.get_path_list(path))
+        self._watcher.cancel(self._get_subtree_watcher_name(norm_path))
+
+        if ttl is None:
+            self._subtree_ttls.pop(norm_path, None)
+            self._subtree_deadlines.pop(norm_path, None)
+            return
+
+        self._subtree_ttls[norm_path] = ttl
+        self._touch_subtree(norm_path)
+        if self._streams:
+            self._watch_subtree(norm_path)
+
+    def _get_subtree_watcher_name(self, path):
+        return 'subtree_{}_{}'.format(id(self), path)
+
+    def _watch_subtree(self, path):
+        self._watcher.watch(
+            self._get_subtree_watcher_name(path),
+            lambda: self._time_until_subtree_stale(path).total_seconds() <= 0,
+            lambda: self._refresh_silent(path),
+            interval=lambda: self._time_until_subtree_stale(path)
+        )
+
+    def _touch_subtree(self, path):
+        ttl = self._subtree_ttls.get(path)
+        if ttl is not None:
+            self._subtree_deadlines[path] = time.monotonic() + ttl.total_seconds()
+
+    def _defer_subtree(self, path):
+        """Retry a failed refresh of {path} after its ttl, or the retry interval."""
+        ttl = self._subtree_ttls.get(path)
+        if ttl is not None:
+            self._subtree_deadlines[path] = time.monotonic() + max(
+                ttl, self._retry_interval
+            ).total_seconds()
+
+    def _time_until_subtree_stale(self, path):
+        deadline = self._subtree_deadlines.get(path)
+        if deadline is None:
+            return watcher.DEFAULT_INTERVAL
+        return datetime.timedelta(seconds=max(0, deadline - time.monotonic()))
+
     def reset(self):
         logger.debug('Resetting all data')
         self.hangup(block=False)
         self._cache = None
 
-    def hangup(self, block=True):
+    def hangup(self, block=True, timeout=None):
+        """Close all streams.
+
+        Streams are closed on the shared `closer` worker pool. Each close is abandoned
+        if it takes longer than the closer's timeout.
+
+        Arguments:
+            block: If True, wait for the streams to close.
+            timeout: Optional number of seconds to wait in total, when blocking.
+
+        Returns a list of the streams that failed to close, or None if not blocking.
+        """
         logger.debug('Marking all streams for shut down')
 
-        watcher.cancel(id(self))
+        if self._health is not None:
+            self._health.state = 'closed'
+
+        self._watcher.cancel(id(self))
+        for path in self._subtree_ttls:
+            self._watcher.cancel(self._get_subtree_watcher_name(path))
+
+        requests = []
+        for stream_id in list(self._streams):
+            stream = self._streams.pop(stream_id, None)
+            if stream is not None:
+                requests.append(closer.close(stream))
 
-        for stream in self._streams.values():
-            self._gc_streams.put(stream)
+        if not block:
+            return None
 
-        if block:
-            self._gc_streams.join()
+        failed = closer.wait(requests, timeout)
+        if failed:
+            logger.warning('Failed to close %s streams: %s', len(failed), failed)
+        return failed
 
     def _set_path_value(self, path, value):
-        data = self.get_data()
-        data.set(path, value)
+        with self._apply_lock:
+            self._apply_change(path, value)
+        self._notify_change(path)
+
+    def _apply_change(self, path, value):
+        self.get_data().set(path, value)
+        if self._changes is not None:
+            self._changes.append(path, value)
+        if self._refresh_counters or self._pending_writes:
+            path_list = data.get_path_list(path)
+            for counter in self._refresh_counters.values():
+                if data.is_related(path_list, counter[0]):
+                    counter[1] += 1
+            self._clear_echoed_writes(path_list, value)
+
+    def _notify_change(self, path):
+        if self._subtree_ttls:
+            self._touch_related_subtrees(path)
         self._recurse_signal(path)
 
+    def _touch_related_subtrees(self, path):
+        path_list = data.get_path_list(path)
+        for subtree_path in list(self._subtree_ttls):
+            if data.is_related(path_list, data.get_path_list(subtree_path)):
+                self._touch_subtree(subtree_path)
+
+    @property
+    def seq(self):
+        """Sequence number of the last change applied, if history is enabled."""
+        if self._changes is None:
+            return None
+        return self._changes.seq
+
+    def changes_since(self, seq, prefix=None):
+        """Return the changes applied after sequence number {seq}, oldest first.
+
+        Requires the `history` argument. Each change is a `changes.Change` tuple of
+        `(seq, path, value)`, where a value of None means the path was removed. Raises
+        `changes.HistoryEvicted` if the changes after {seq} are no longer available.
+
+        Arguments:
+            seq: Sequence number of the last change seen, or 0 for all changes.
+            prefix: Optional path. Only changes at, above or below it are returned.
+        """
+        if self._changes is None:
+            raise ValueError('Change history is not enabled')
+        return self._changes.since(seq, prefix)
+
     def _recurse_signal(self, path):
         path_list = data.get_path_list(path)
         partial_path = ''
         value = self.get_data()
 
-        self.signal('/').send(value, value=value.get(), path=path)
+        deliveries = []
+        root_signal = self.signal('/')
+        # Only read values that are received, since reads may fetch evicted data
+        if root_signal.receivers:
+            deliveries.append((root_signal, {'value': value.get(), 'path': path}))
         for part in path_list:
             partial_path = '/'.join((partial_path, part))
-            self.signal(partial_path).send(
-                value,
-                value=value.get(partial_path),
-                path=path
-            )
+            signal = self.signal(partial_path)
+            if signal.receivers:
+                deliveries.append(
+                    (signal, {'value': value.get(partial_path), 'path': path})
+                )
+
+        dispatch.send(value, deliveries)
 
     def _put_handler(self, path, value):
         logger.debug('PUT: path=%s data=%s', path, value)
@@ -155,7 +726,28 @@ class LiveData(object):
             full_path = data.normalize_path('{}/{}'.format(path, rel_path))
             self._set_path_value(full_path, value)
 
+    def _keep_alive_handler(self, event, value):
+        logger.debug('KEEP-ALIVE received')
+        health = self._health
+        if health is not None:
+            health.last_keep_alive_at = datetime.datetime.utcnow()
+            health.keep_alives += 1
+        # The stream is quiet, but still connected
+        self._touch()
+
+    def _revoked_handler(self, event, value):
+        logger.warning('Stream closed by server (%s): %s', event, value)
+        health = self._health
+        # Reconnect, rather than waiting for the data to become stale
+        self.reconnect()
+        if health is not None:
+            health.state = event
+            health.error = value
+
     def _valid_message(self, message):
+        if message.get('event') in self._control_handlers:
+            return True
+
         required_keys = [
             'event',
             'path',
@@ -171,31 +763,42 @@ class LiveData(object):
 
         return True
 
+    def start_recording(self, recorder):
+        """Record every raw stream message to {recorder} (see `recorder.Recorder`)."""
+        self._recorder = recorder
+
+    def stop_recording(self):
+        recorder = self._recorder
+        self._recorder = None
+        return recorder
+
     def _stream_handler(self, message):
         logger.debug('STREAM received: %s', message)
+        recorder = self._recorder
+        if recorder is not None:
+            try:
+                recorder.record(message)
+            except Exception:
+                logger.exception('Error recording message')
+
         if not self._valid_message(message):
             logger.warn('Invalid message: %s', message)
             return
 
-        handler = self._handlers[message['event']]
-        handler(message['path'], message['data'])
+        event = message['event']
+        if event in self._control_handlers:
+            self._control_handlers[event](event, message.get('data'))
+            return
 
-    def _gc_stream_worker(self):
-        while True:
-            stream = self._gc_streams.get()
-            logger.debug('Closing stream: %s', stream)
+        handler = self._handlers[event]
+        handler(message['path'], message['data'])
 
-            try:
-                stream.close()
-                del self._streams[id(stream)]
-            except Exception as e:
-                logger.warning('Error closing stream %s: %s', stream, e)
-            else:
-                logger.debug('Stream closed: %s', stream)
-
-            self._gc_streams.task_done()
-
-    def _start_stream_gc(self):
-        if self._gc_thread is None:
-            self._gc_thread = threading.Thread(target=self._gc_stream_worker, daemon=True)
-            self._gc_thread.start()
+        health = self._health
+        if health is not None:
+            health.state = 'live'
+            health.last_message_at = datetime.datetime.utcnow()
+            health.messages += 1
+            if health.messages == 1 and self._retry_backoff is not None:
+                # Connected
+                self._retry_backoff.reset()
+        self._touch()
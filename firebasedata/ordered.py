@@ -0,0 +1,166 @@
+"""Children kept in key order, for collections keyed by push IDs.
+
+Firebase push IDs start with the time they were created, encoded so that they sort by
+it. A `SortedChildren` container keeps its keys sorted as children are added and
+removed, so the first, last, or a range of children are found by bisecting the keys
+instead of sorting all of them.
+"""
+import bisect
+import collections.abc
+import datetime
+
+from . import schema
+
+PUSH_CHARS = '-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz'
+PUSH_ID_LENGTH = 20
+# Number of characters that encode the time
+_TIME_LENGTH = 8
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def push_id_time(push_id):
+    """Return the time {push_id} was created, as an aware datetime in UTC.
+
+    Raises ValueError if it is not a push ID.
+    """
+    if len(push_id) != PUSH_ID_LENGTH:
+        raise ValueError('Invalid push ID: {!r}'.format(push_id))
+
+    timestamp = 0
+    for char in push_id[:_TIME_LENGTH]:
+        index = PUSH_CHARS.find(char)
+        if index < 0:
+            raise ValueError('Invalid push ID: {!r}'.format(push_id))
+        timestamp = timestamp * 64 + index
+
+    return _EPOCH + datetime.timedelta(milliseconds=timestamp)
+
+
+def push_id_bound(time, last=False):
+    """Return the first push ID that could be created at {time}, an aware datetime.
+
+    If {last} is True, returns the last one instead.
+    """
+    timestamp = (time - _EPOCH) // datetime.timedelta(milliseconds=1)
+    chars = []
+    for _ in range(_TIME_LENGTH):
+        chars.append(PUSH_CHARS[timestamp % 64])
+        timestamp //= 64
+
+    fill = PUSH_CHARS[-1] if last else PUSH_CHARS[0]
+    return ''.join(reversed(chars)) + fill * (PUSH_ID_LENGTH - _TIME_LENGTH)
+
+
+class SortedChildren(collections.abc.MutableMapping):
+    """Mapping of children, stored in key order."""
+
+    __slots__ = ('_keys', '_values')
+
+    def __init__(self, value=()):
+        items = sorted(dict(value).items(), key=lambda item: item[0])
+        self._keys = [key for key, child in items]
+        self._values = [child for key, child in items]
+
+    def _index(self, key):
+        keys = self._keys
+        index = bisect.bisect_left(keys, key)
+        if index < len(keys) and keys[index] == key:
+            return index
+        return None
+
+    def __getitem__(self, key):
+        index = self._index(key)
+        if index is None:
+            raise KeyError(key)
+        return self._values[index]
+
+    def __setitem__(self, key, value):
+        keys = self._keys
+        if not keys or key > keys[-1]:
+            # Latest key. The common case for pushes.
+            keys.append(key)
+            self._values.append(value)
+            return
+
+        index = bisect.bisect_left(keys, key)
+        if index < len(keys) and keys[index] == key:
+            self._values[index] = value
+        else:
+            keys.insert(index, key)
+            self._values.insert(index, value)
+
+    def __delitem__(self, key):
+        index = self._index(key)
+        if index is None:
+            raise KeyError(key)
+        del self._keys[index]
+        del self._values[index]
+
+    def __iter__(self):
+        return iter(self._keys[:])
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return self._index(key) is not None
+
+    def items(self):
+        """Return a list of `(key, value)` for each child, in key order."""
+        return list(zip(self._keys, self._values))
+
+    def _items(self, low, high):
+        return list(zip(self._keys[low:high], self._values[low:high]))
+
+    def first(self, n=1):
+        """Return `(key, value)` for the first {n} children."""
+        return self._items(0, n)
+
+    def last(self, n=1):
+        """Return `(key, value)` for the last {n} children."""
+        return self._items(max(len(self._keys) - n, 0), None)
+
+    def range(self, start=None, end=None):
+        """Return `(key, value)` for the children with keys from {start} to {end}.
+
+        Both bounds are inclusive, and optional.
+        """
+        keys = self._keys
+        low = 0 if start is None else bisect.bisect_left(keys, start)
+        high = len(keys) if end is None else bisect.bisect_right(keys, end)
+        return self._items(low, high)
+
+    def after(self, key, n=None):
+        """Return `(key, value)` for the first {n} children after {key}, or all."""
+        low = bisect.bisect_right(self._keys, key)
+        return self._items(low, None if n is None else low + n)
+
+    def time_range(self, start=None, end=None):
+        """Return `(key, value)` for the children pushed from {start} to {end}.
+
+        Arguments:
+            start: Optional aware datetime.
+            end: Optional aware datetime. Children pushed within its millisecond are
+                included.
+        """
+        return self.range(
+            None if start is None else push_id_bound(start),
+            None if end is None else push_id_bound(end, last=True)
+        )
+
+    def __repr__(self):
+        return '{}(size={})'.format(type(self).__name__, len(self))
+
+
+class SortedSchema(schema.Pattern):
+    """Keep the children of the dictionaries at paths that match {pattern} sorted.
+
+    Arguments:
+        pattern: Path of the collections, where a `*` part matches any key.
+    """
+
+    def compile(self, value):
+        return SortedChildren(value)
+
+    def __repr__(self):
+        return '{}(pattern={!r})'.format(type(self).__name__, '/'.join(self.pattern))
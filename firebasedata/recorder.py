@@ -0,0 +1,205 @@
+import collections
+import json
+import logging
+import threading
+import time
+
+from . import data
+
+logger = logging.getLogger(__name__)
+STAGES = ('lag', 'apply', 'signal')
+
+
+class Recorder:
+    """Append raw stream messages, with timestamps, to a log file.
+
+    Each line of the log is a compact JSON array: `[timestamp, event, path, data]`.
+    """
+
+    def __init__(self, path):
+        self._path = path
+        self._file = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, message, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
+
+        line = json.dumps(
+            [
+                timestamp,
+                message.get('event'),
+                message.get('path'),
+                message.get('data'),
+            ],
+            separators=(',', ':'),
+            default=str,
+        )
+
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+            self.count += 1
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        return '{}(path={!r}, count={})'.format(
+            type(self).__name__, self._path, self.count
+        )
+
+
+def read_log(path):
+    """Yield `(timestamp, message)` tuples from a log written by `Recorder`."""
+    with open(path, encoding='utf-8') as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+
+            try:
+                timestamp, event, msg_path, msg_data = json.loads(line)
+            except ValueError:
+                logger.warning('Skipping malformed log line %s: %s', lineno, line)
+                continue
+
+            yield timestamp, {
+                'event': event,
+                'path': msg_path,
+                'data': msg_data,
+            }
+
+
+class LatencyStats:
+    """Latency samples, in seconds. Only the latest {size} samples are kept, if given."""
+
+    def __init__(self, size=None):
+        self._samples = collections.deque(maxlen=size)
+
+    def add(self, seconds):
+        self._samples.append(seconds)
+
+    def summary(self):
+        """Return count, mean, p50, p99 and max latency (in milliseconds)."""
+        samples = sorted(self._samples)
+        count = len(samples)
+        if not count:
+            return {'count': 0}
+
+        def percentile(p):
+            return samples[min(count - 1, int(p * count))] * 1000
+
+        return {
+            'count': count,
+            'mean': sum(samples) / count * 1000,
+            'p50': percentile(.5),
+            'p99': percentile(.99),
+            'max': samples[-1] * 1000,
+        }
+
+
+class ReplayStats:
+    def __init__(self):
+        self.messages = 0
+        self.elapsed = 0.0
+        self.stages = {stage: LatencyStats() for stage in STAGES}
+
+    @property
+    def throughput(self):
+        """Messages applied per second."""
+        if not self.elapsed:
+            return 0.0
+        return self.messages / self.elapsed
+
+    def summary(self):
+        return {
+            'messages': self.messages,
+            'elapsed': self.elapsed,
+            'throughput': self.throughput,
+            'stages': {
+                stage: stats.summary() for stage, stats in self.stages.items()
+            },
+        }
+
+
+def replay(live_data, log_path, speed=1.0):
+    """Push a recorded log through a LiveData instance.
+
+    Arguments:
+        live_data: The LiveData instance to replay messages into. If it has no data
+            yet, it is seeded with an empty tree, so Firebase is never contacted.
+            Recorded `cancel` and `auth_revoked` events do not reconnect either.
+        log_path: Path to a log written by `Recorder`.
+        speed: Replay speed relative to the original recording. 1.0 replays at the
+            original speed, 10.0 at ten times the original speed, and None (or 0)
+            as fast as possible.
+
+    Returns a ReplayStats instance. Stages are measured per message:
+        lag: How late the message was dispatched, compared to its schedule.
+        apply: Time spent applying the message to the cache.
+        signal: Time spent dispatching signals to receivers.
+    """
+    if live_data._cache is None:
+        live_data._cache = data.FirebaseData({})
+
+    stats = ReplayStats()
+    patched = {
+        name: vars(live_data).get(name) for name in ('_recurse_signal', 'reconnect')
+    }
+    recurse_signal = live_data._recurse_signal
+    signal_time = [0.0]
+
+    def timed_recurse_signal(path):
+        start = time.perf_counter()
+        try:
+            recurse_signal(path)
+        finally:
+            signal_time[0] += time.perf_counter() - start
+
+    live_data._recurse_signal = timed_recurse_signal
+    # Recorded `cancel` and `auth_revoked` events must not contact Firebase
+    live_data.reconnect = lambda: logger.debug('Skipping reconnect during replay')
+    started_at = time.perf_counter()
+    first_timestamp = None
+
+    try:
+        for timestamp, message in read_log(log_path):
+            if first_timestamp is None:
+                first_timestamp = timestamp
+
+            lag = 0.0
+            if speed:
+                due = started_at + (timestamp - first_timestamp) / speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                lag = max(0.0, time.perf_counter() - due)
+
+            signal_time[0] = 0.0
+            start = time.perf_counter()
+            live_data._stream_handler(message)
+            handled = time.perf_counter() - start
+
+            stats.messages += 1
+            stats.stages['lag'].add(lag)
+            stats.stages['apply'].add(handled - signal_time[0])
+            stats.stages['signal'].add(signal_time[0])
+    finally:
+        for name, value in patched.items():
+            if value is None:
+                delattr(live_data, name)
+            else:
+                setattr(live_data, name, value)
+
+    stats.elapsed = time.perf_counter() - started_at
+    logger.debug('Replayed %s messages in %.3fs', stats.messages, stats.elapsed)
+    return stats
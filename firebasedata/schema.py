@@ -0,0 +1,206 @@
+"""Compact records for subtrees that share a fixed shape.
+
+A schema gives the fields of the subtrees at paths that match a pattern, such as
+`devices/*`. Once it is registered with a FirebaseData, or a LiveData, matching
+dictionaries are stored as records: mappings that keep their fields in `__slots__`
+instead of a hash table, and that also allow attribute access to them.
+
+Records are updated in place by changes at field paths. Keys that are not fields of the
+schema are kept in a dictionary of extra items.
+"""
+import collections.abc
+import keyword
+
+from . import data
+
+WILDCARD = '*'
+# Default value of unset slots
+_UNSET = object()
+
+
+class Record(collections.abc.MutableMapping):
+    """Base class of records. Subclasses are created by `Schema`."""
+
+    __slots__ = ('_extra',)
+    _fields = ()
+    _field_set = frozenset()
+
+    def __init__(self, value=()):
+        self._extra = None
+        for key, child in dict(value).items():
+            self[key] = child
+
+    def __getitem__(self, key):
+        if key in self._field_set:
+            result = getattr(self, key, _UNSET)
+            if result is not _UNSET:
+                return result
+        elif self._extra is not None:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in self._field_set:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in self._field_set:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        else:
+            if self._extra is None:
+                raise KeyError(key)
+            del self._extra[key]
+            if not self._extra:
+                self._extra = None
+
+    def __iter__(self):
+        for field in self._fields:
+            if getattr(self, field, _UNSET) is not _UNSET:
+                yield field
+        if self._extra is not None:
+            yield from list(self._extra)
+
+    def __len__(self):
+        result = sum(
+            1 for field in self._fields if getattr(self, field, _UNSET) is not _UNSET
+        )
+        if self._extra is not None:
+            result += len(self._extra)
+        return result
+
+    def __contains__(self, key):
+        if key in self._field_set:
+            return getattr(self, key, _UNSET) is not _UNSET
+        return self._extra is not None and key in self._extra
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, dict(self))
+
+
+def _check_field(field):
+    if (
+        not field.isidentifier() or keyword.iskeyword(field) or
+        field.startswith('_') or hasattr(Record, field)
+    ):
+        raise ValueError('Invalid field name: {!r}'.format(field))
+
+
+class Pattern:
+    """Base class of schemas, for the dictionaries at paths that match {pattern}.
+
+    A `*` part of the pattern matches any key. Subclasses implement `compile`.
+    """
+
+    def __init__(self, pattern):
+        self.pattern = data.get_path_list(pattern)
+        if not self.pattern:
+            raise ValueError('A schema cannot apply to the root')
+
+    def compile(self, value):
+        """Return the dictionary {value}, converted."""
+        raise NotImplementedError
+
+    def matches(self, path_list):
+        """Return True if {path_list} matches the pattern."""
+        return len(path_list) == len(self.pattern) and all(
+            part == WILDCARD or part == key
+            for part, key in zip(self.pattern, path_list)
+        )
+
+    def apply(self, tree, path_list=None):
+        """Convert the matching dictionaries in {tree}.
+
+        Arguments:
+            tree: Root of the data.
+            path_list: Optional path list of a change. Only dictionaries that match at,
+                above or below it are converted.
+        """
+        if path_list is None:
+            path_list = []
+
+        depth = min(len(path_list), len(self.pattern))
+        if not all(
+            part == WILDCARD or part == key
+            for part, key in zip(self.pattern[:depth], path_list)
+        ):
+            return
+
+        self._convert(tree, 0, path_list)
+
+    def _convert(self, node, depth, path_list):
+        part = self.pattern[depth]
+
+        if depth < len(path_list):
+            keys = [path_list[depth]]
+        elif part == WILDCARD:
+            keys = list(node)
+        else:
+            keys = [part]
+
+        last = depth + 1 == len(self.pattern)
+        for key in keys:
+            try:
+                child = node[key]
+            except (KeyError, TypeError):
+                continue
+
+            if last:
+                if isinstance(child, dict):
+                    node[key] = self.compile(child)
+            elif isinstance(child, collections.abc.Mapping):
+                self._convert(child, depth + 1, path_list)
+
+
+class Schema(Pattern):
+    """Fields of the subtrees at paths that match {pattern}.
+
+    Arguments:
+        pattern: Path of the subtrees, where a `*` part matches any key.
+        fields: Names of the fields. They must be valid attribute names, that do not
+            start with an underscore, or clash with the methods of a mapping.
+        name: Optional name of the record class. Defaults to a name based on the
+            pattern.
+
+    Attributes:
+        record_class: The `Record` subclass used for matching subtrees.
+    """
+
+    def __init__(self, pattern, fields, name=None):
+        super().__init__(pattern)
+
+        fields = tuple(fields)
+        for field in fields:
+            _check_field(field)
+        if len(set(fields)) != len(fields):
+            raise ValueError('Duplicate field names')
+
+        if name is None:
+            name = ''.join(
+                part.title() for part in self.pattern if part != WILDCARD
+            ) + 'Record'
+        self.record_class = type(name, (Record,), {
+            '__slots__': fields,
+            '_fields': fields,
+            '_field_set': frozenset(fields),
+        })
+
+    @property
+    def fields(self):
+        return self.record_class._fields
+
+    def compile(self, value):
+        return self.record_class(value)
+
+    def __repr__(self):
+        return '{}(pattern={!r}, fields={})'.format(
+            type(self).__name__,
+            '/'.join(self.pattern),
+            self.fields
+        )
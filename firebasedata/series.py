@@ -0,0 +1,210 @@
+"""Columnar storage for numeric series, such as readings keyed by push IDs.
+
+A series keeps its keys in a sorted list, and its values in an `array`, instead of a
+dictionary with a number object per value. Push IDs sort by creation time, so new pushes
+are appended. Range queries slice the array, and aggregate it without a Python loop.
+
+Values that cannot be stored in the array, such as dictionaries, are kept in a
+dictionary of other items, and left out of range queries. The array type is chosen by
+the caller, since it converts values: a float array stores integers as floats, while an
+integer array keeps floats as other items.
+"""
+import array
+import bisect
+import collections.abc
+import math
+
+from . import schema
+
+INTEGER_TYPECODES = frozenset('bBhHiIlLqQ')
+
+
+class Series(collections.abc.MutableMapping):
+    """Mapping of keys to numbers, stored in key order.
+
+    Arguments:
+        typecode: `array` type code of the values. Integers in a float array are read
+            back as floats.
+        value: Optional initial items.
+    """
+
+    __slots__ = ('_keys', '_values', '_other', '_integer')
+
+    def __init__(self, typecode, value=()):
+        self._keys = []
+        self._values = array.array(typecode)
+        self._other = None
+        self._integer = typecode in INTEGER_TYPECODES
+
+        # Sorted, so the values are appended
+        for key, child in sorted(dict(value).items()):
+            self[key] = child
+
+    @property
+    def typecode(self):
+        return self._values.typecode
+
+    def _fits(self, value):
+        if isinstance(value, bool):
+            return False
+        if self._integer:
+            return isinstance(value, int)
+        return isinstance(value, (int, float))
+
+    def _index(self, key):
+        keys = self._keys
+        index = bisect.bisect_left(keys, key)
+        if index < len(keys) and keys[index] == key:
+            return index
+        return None
+
+    def _set_other(self, key, value):
+        index = self._index(key)
+        if index is not None:
+            del self._keys[index]
+            del self._values[index]
+
+        if self._other is None:
+            self._other = {}
+        self._other[key] = value
+
+    def __getitem__(self, key):
+        index = self._index(key)
+        if index is not None:
+            return self._values[index]
+        if self._other is not None:
+            return self._other[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if not self._fits(value):
+            self._set_other(key, value)
+            return
+
+        keys = self._keys
+        try:
+            if not keys or key > keys[-1]:
+                # Latest key. The common case for pushes.
+                self._values.append(value)
+                keys.append(key)
+            else:
+                index = bisect.bisect_left(keys, key)
+                if index < len(keys) and keys[index] == key:
+                    self._values[index] = value
+                else:
+                    self._values.insert(index, value)
+                    keys.insert(index, key)
+        except OverflowError:
+            self._set_other(key, value)
+            return
+
+        if self._other is not None and key in self._other:
+            del self._other[key]
+            if not self._other:
+                self._other = None
+
+    def __delitem__(self, key):
+        index = self._index(key)
+        if index is not None:
+            del self._keys[index]
+            del self._values[index]
+        elif self._other is not None:
+            del self._other[key]
+            if not self._other:
+                self._other = None
+        else:
+            raise KeyError(key)
+
+    def __iter__(self):
+        yield from self._keys[:]
+        if self._other is not None:
+            yield from list(self._other)
+
+    def __len__(self):
+        result = len(self._keys)
+        if self._other is not None:
+            result += len(self._other)
+        return result
+
+    def __contains__(self, key):
+        return self._index(key) is not None or (
+            self._other is not None and key in self._other
+        )
+
+    def items(self):
+        """Return a list of `(key, value)` for each item, in key order."""
+        result = list(zip(self._keys, self._values))
+        if self._other is not None:
+            result.extend(self._other.items())
+        return result
+
+    def _bounds(self, start, end):
+        keys = self._keys
+        low = 0 if start is None else bisect.bisect_left(keys, start)
+        high = len(keys) if end is None else bisect.bisect_right(keys, end)
+        return low, high
+
+    def slice(self, start=None, end=None):
+        """Return a Series of the numeric items with keys from {start} to {end}.
+
+        Both bounds are inclusive, and optional.
+        """
+        low, high = self._bounds(start, end)
+        result = type(self)(self.typecode)
+        result._keys = self._keys[low:high]
+        result._values = self._values[low:high]
+        return result
+
+    def to_array(self, start=None, end=None):
+        """Return an `array` of the numeric values with keys from {start} to {end}."""
+        low, high = self._bounds(start, end)
+        return self._values[low:high]
+
+    def sum(self, start=None, end=None):
+        values = self.to_array(start, end)
+        if self._integer:
+            return sum(values)
+        return math.fsum(values)
+
+    def min(self, start=None, end=None):
+        """Return the smallest value with a key from {start} to {end}, or None."""
+        values = self.to_array(start, end)
+        return min(values) if values else None
+
+    def max(self, start=None, end=None):
+        """Return the largest value with a key from {start} to {end}, or None."""
+        values = self.to_array(start, end)
+        return max(values) if values else None
+
+    def __repr__(self):
+        return '{}(typecode={!r}, size={})'.format(
+            type(self).__name__,
+            self.typecode,
+            len(self)
+        )
+
+
+class SeriesSchema(schema.Pattern):
+    """Store the dictionaries at paths that match {pattern} as a Series.
+
+    Arguments:
+        pattern: Path of the series, where a `*` part matches any key.
+        typecode: `array` type code of the values, such as 'd' for floats or 'q' for
+            integers. See `Series`.
+    """
+
+    def __init__(self, pattern, typecode):
+        super().__init__(pattern)
+        # Raises ValueError for invalid type codes
+        array.array(typecode)
+        self.typecode = typecode
+
+    def compile(self, value):
+        return Series(self.typecode, value)
+
+    def __repr__(self):
+        return '{}(pattern={!r}, typecode={!r})'.format(
+            type(self).__name__,
+            '/'.join(self.pattern),
+            self.typecode
+        )
@@ -0,0 +1,504 @@
+"""Share one LiveData cache between the processes on a host.
+
+One process (the owner) holds the Firebase stream. It broadcasts each change with a
+`bus.EventPublisher`, and regularly writes a checkpoint of all of its data to a file,
+in the `binary` format, which is replaced atomically.
+
+The other processes memory-map the latest checkpoint, and only decode the parts of it
+that are read. They keep the changes received from the owner since that checkpoint, so
+no network connection is needed outside the owner, and each process only holds a copy
+of what changed recently.
+
+Ownership is held with a file lock. When the owner exits, a reader that was given a way
+to start the stream takes the lock over and becomes the new owner.
+"""
+import copy
+from collections.abc import Mapping
+import fcntl
+import io
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+
+from . import binary
+from . import bus
+from . import data
+from . import live
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'FBS2'
+# Magic, sequence number of the last change included, time published and epoch
+HEADER = struct.Struct('<4sQd32s')
+CHECKPOINT_INTERVAL = 10
+POLL_INTERVAL = 1
+
+
+def socket_path(path):
+    """Return the path of the event socket of the shared cache at {path}."""
+    return '{}.sock'.format(path)
+
+
+def acquire_owner(lock_path):
+    """Try to become the owner of a shared cache.
+
+    Returns an open lock file if this process is now the owner (keep a reference to it
+    for as long as the process should remain the owner), or None otherwise.
+    """
+    lock_file = open(lock_path, 'a+')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+def write_snapshot(path, value, seq, epoch):
+    """Write a checkpoint of {value}, which includes changes up to {seq} of {epoch}."""
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, seq, time.time(), epoch.encode('ascii')))
+        binary.dump(value, f)
+
+    os.replace(tmp_path, path)
+
+
+class _BufferReader:
+    """Binary file object that reads {buf} from {offset}, with its own position."""
+
+    def __init__(self, buf, offset=0):
+        self._buf = buf
+        self._pos = offset
+
+    def read(self, size):
+        result = self._buf[self._pos:self._pos + size]
+        self._pos += len(result)
+        return result
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        self._pos = offset
+        return offset
+
+    def seekable(self):
+        return True
+
+
+class Snapshot:
+    """A memory-mapped checkpoint. Values are decoded when they are read."""
+
+    def __init__(self, buf):
+        magic, seq, published_at, epoch = HEADER.unpack_from(buf)
+        if magic != MAGIC:
+            raise ValueError('Not a shared cache snapshot')
+
+        self._buf = buf
+        self.seq = seq
+        self.published_at = published_at
+        self.epoch = epoch.rstrip(b'\0').decode('ascii')
+
+    def get(self, path='/'):
+        return binary.Decoder(_BufferReader(self._buf, HEADER.size)).get(path)
+
+
+def read_snapshot(path):
+    """Map the checkpoint at {path}. Returns a Snapshot."""
+    with open(path, 'rb') as f:
+        try:
+            # Also raises ValueError if the file is empty
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return Snapshot(buf)
+        except (ValueError, struct.error):
+            raise ValueError('Not a shared cache snapshot: {}'.format(path))
+
+
+def _get_child(value, path_list):
+    for part in path_list:
+        if not isinstance(value, Mapping):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _replace(value, path_list, child):
+    """Set {child} at {path_list} below {value}, and return the new value."""
+    if not path_list:
+        return child
+
+    if not isinstance(value, dict):
+        value = dict(value) if isinstance(value, Mapping) else {}
+    node = value
+    for part in path_list[:-1]:
+        next_node = node.get(part)
+        if not isinstance(next_node, dict):
+            next_node = node[part] = (
+                dict(next_node) if isinstance(next_node, Mapping) else {}
+            )
+        node = next_node
+
+    if child is None:
+        node.pop(path_list[-1], None)
+    else:
+        node[path_list[-1]] = child
+    return value
+
+
+class SharedData:
+    """Data of a shared cache: the latest checkpoint, and the changes made since.
+
+    Changes are absolute values by path, as sent by a `bus.EventPublisher`, so they can
+    be applied on top of a checkpoint that already includes some of them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        # Entries of (seq, path list, value), oldest first
+        self._changes = []
+
+    @property
+    def loaded(self):
+        return self._snapshot is not None or bool(self._changes)
+
+    @property
+    def pending_changes(self):
+        """Number of changes kept in memory, on top of the checkpoint."""
+        return len(self._changes)
+
+    def load(self, snapshot, replace=False):
+        """Use {snapshot}, and drop the changes that it includes.
+
+        Arguments:
+            replace: Drop all changes, when they are not from the epoch of {snapshot}.
+        """
+        with self._lock:
+            self._snapshot = snapshot
+            self._changes = [] if replace else [
+                change for change in self._changes if change[0] > snapshot.seq
+            ]
+
+    def apply(self, seq, path, value):
+        path_list = data.get_path_list(path)
+        with self._lock:
+            if not path_list:
+                # Replaces everything else
+                self._changes = []
+            self._changes.append((seq, path_list, value))
+
+    def get(self, path='/'):
+        path_list = data.get_path_list(path)
+        with self._lock:
+            snapshot = self._snapshot
+            changes = list(self._changes)
+
+        # Start from the latest change at or above {path}, or else the checkpoint
+        start = 0
+        for index in range(len(changes) - 1, -1, -1):
+            change_path = changes[index][1]
+            if change_path == path_list[:len(change_path)]:
+                value = copy.deepcopy(
+                    _get_child(changes[index][2], path_list[len(change_path):])
+                )
+                start = index + 1
+                break
+        else:
+            value = None if snapshot is None else snapshot.get(path)
+
+        depth = len(path_list)
+        for seq, change_path, change_value in changes[start:]:
+            if len(change_path) > depth and change_path[:depth] == path_list:
+                value = _replace(
+                    value, change_path[depth:], copy.deepcopy(change_value)
+                )
+
+        return value
+
+    def __repr__(self):
+        return '{}(seq={}, changes={})'.format(
+            type(self).__name__,
+            None if self._snapshot is None else self._snapshot.seq,
+            len(self._changes)
+        )
+
+
+class SharedCachePublisher:
+    """Share the data of a LiveData instance with the other processes on the host.
+
+    Changes are broadcast as they are applied, on the socket `{path}.sock`. A checkpoint
+    is written to {path} at most once per {interval} seconds, when the data changed.
+
+    Checkpoints include all of the data, so {live_data} may not have a memory budget,
+    which would fetch every evicted subtree for each checkpoint.
+    """
+
+    def __init__(self, live_data, path, interval=CHECKPOINT_INTERVAL, lock_file=None):
+        if getattr(live_data, '_memory_budget', None) is not None:
+            raise ValueError('Cannot share LiveData with a memory budget')
+
+        self._live_data = live_data
+        self._path = path
+        self._interval = interval
+        self._lock_file = lock_file
+        self._dirty = threading.Event()
+        self._stopped = False
+        self._thread = None
+        self.events = bus.EventPublisher(live_data, socket_path(path))
+        # Sequence number of the latest checkpoint
+        self.seq = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+
+        self.events.start()
+        self._live_data.signal('/').connect(self._on_change, weak=False)
+        self._thread = threading.Thread(target=self._worker, daemon=True)
+        self._thread.start()
+        self._dirty.set()
+
+    def stop(self):
+        self._live_data.signal('/').disconnect(self._on_change)
+        self.events.close()
+        self._stopped = True
+        self._dirty.set()
+
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _on_change(self, sender, **kwargs):
+        self._dirty.set()
+
+    def publish(self):
+        """Write a checkpoint of the current data."""
+        cache = self._live_data._cache
+        if cache is None:
+            logger.debug('No data to publish: %s', self._path)
+            return
+
+        # Changes are applied to the cache before their events are numbered, so the
+        # checkpoint includes at least every change up to `seq`. Readers apply the
+        # later ones again, which is harmless since each is the whole value at a path.
+        while True:
+            seq = self.events.seq
+            try:
+                write_snapshot(self._path, cache, seq, self.events.epoch)
+                break
+            except RuntimeError:
+                logger.debug('Cache changed during publish. Retrying.')
+
+        self.seq = seq
+        logger.debug('Published shared cache checkpoint %s: %s', seq, self._path)
+
+    def _worker(self):
+        while True:
+            self._dirty.wait()
+            if self._stopped:
+                return
+
+            self._dirty.clear()
+            try:
+                self.publish()
+            except Exception:
+                logger.exception('Error publishing shared cache: %s', self._path)
+
+            time.sleep(self._interval)
+
+
+class SharedCacheReader(bus.EventSubscriber):
+    """LiveData-compatible, read-only access to data shared by a SharedCachePublisher.
+
+    Changes are received from the owner as they are applied, and fire the same signals
+    as they do on the owner. The checkpoint file is checked for a newer checkpoint at
+    most once per {poll_interval} seconds.
+
+    Data is stale while the reader is not connected to an owner. If the owner exits,
+    and {promote} is given, the reader tries to take the lock over and calls {promote}
+    with the lock file. It must start publishing to {path} in this process (see
+    `connect`), and its result is kept as `owner`. The reader then reads from it.
+
+    Arguments:
+        path: Path of the checkpoint file.
+        poll_interval: Minimum number of seconds between checks for a new checkpoint.
+        promote: Optional function that makes this process the owner.
+        reconnect_interval: Seconds to wait before reconnecting after an error.
+    """
+
+    def __init__(self, path, poll_interval=POLL_INTERVAL, promote=None,
+                 reconnect_interval=bus.RECONNECT_INTERVAL):
+        super().__init__(socket_path(path), reconnect_interval=reconnect_interval)
+        self._path = path
+        self._poll_interval = poll_interval
+        self._promote = promote
+        self._checked_at = None
+        self._file_id = None
+        self._lock = threading.Lock()
+        self._cache = SharedData()
+        self.owner = None
+
+    @property
+    def version(self):
+        """Sequence number of the checkpoint in use, if any."""
+        snapshot = self._cache._snapshot
+        return None if snapshot is None else snapshot.seq
+
+    @property
+    def published_at(self):
+        snapshot = self._cache._snapshot
+        return None if snapshot is None else snapshot.published_at
+
+    def _current_file_id(self):
+        try:
+            stat = os.stat(self._path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def load_checkpoint(self):
+        """Use the latest checkpoint if it changed. Returns True if it did."""
+        self._checked_at = time.monotonic()
+        file_id = self._current_file_id()
+
+        if file_id is None or file_id == self._file_id:
+            return False
+
+        snapshot = read_snapshot(self._path)
+        with self._lock:
+            if snapshot.epoch == self.epoch:
+                if snapshot.seq > self.last_seq:
+                    # Wait until the changes it includes are received
+                    return False
+                self._cache.load(snapshot)
+            elif not self.connected:
+                # From an owner this reader has not received changes from yet
+                self._cache.load(snapshot, replace=True)
+                self.epoch = snapshot.epoch
+                self.last_seq = snapshot.seq
+            else:
+                # From a previous owner
+                return False
+
+            self._file_id = file_id
+
+        logger.debug('Loaded shared cache checkpoint %s: %s', snapshot.seq, self._path)
+        return True
+
+    def _maybe_load_checkpoint(self):
+        if (
+            self._checked_at is None
+            or time.monotonic() - self._checked_at >= self._poll_interval
+        ):
+            try:
+                self.load_checkpoint()
+            except ValueError:
+                logger.exception('Invalid shared cache checkpoint: %s', self._path)
+
+    def get_data(self):
+        self._maybe_load_checkpoint()
+        return self._cache if self._cache.loaded else None
+
+    def is_stale(self):
+        return not self.connected
+
+    def listen(self):
+        # Resume from the checkpoint, instead of receiving all of the data
+        self._maybe_load_checkpoint()
+        super().listen()
+
+    def _subscription(self):
+        with self._lock:
+            return {'prefix': '/', 'since': self.last_seq, 'epoch': self.epoch}
+
+    def _apply_frame(self, frame):
+        if frame.get('type') == 'snapshot':
+            logger.debug('Bus snapshot received: seq=%s', frame['seq'])
+            with self._lock:
+                self._cache.apply(frame['seq'], frame['path'], frame['value'])
+                self.last_seq = frame['seq']
+                self.epoch = frame['epoch']
+            self._recurse_signal(frame['path'])
+        elif frame.get('type') == 'events':
+            for seq, path, value in frame['events']:
+                with self._lock:
+                    self._cache.apply(seq, path, value)
+                    self.last_seq = seq
+                self._recurse_signal(path)
+            # Drop changes that a newer checkpoint includes
+            self._maybe_load_checkpoint()
+        else:
+            logger.warning('Invalid bus frame: %s', frame)
+
+    def _connection_lost(self):
+        super()._connection_lost()
+        if self._closed or self._promote is None or self.owner is not None:
+            return
+
+        lock_file = acquire_owner('{}.lock'.format(self._path))
+        if lock_file is None:
+            return
+
+        logger.warning('Shared cache owner is gone. Taking over: %s', self._path)
+        try:
+            self.owner = self._promote(lock_file)
+        except Exception:
+            logger.exception('Error taking over shared cache: %s', self._path)
+            lock_file.close()
+
+
+def _start_owner(pyrebase_app, root_path, cache_path, lock_file, interval, kwargs):
+    live_data = live.LiveData(pyrebase_app, root_path, **kwargs)
+    publisher = SharedCachePublisher(
+        live_data,
+        cache_path,
+        interval=interval,
+        lock_file=lock_file
+    )
+    publisher.start()
+    # Keep retrying until the initial fetch succeeds
+    live_data.start_metawatcher()
+    live_data.get_data_silent()
+    return live_data
+
+
+def connect(pyrebase_app, root_path, cache_path, checkpoint_interval=CHECKPOINT_INTERVAL,
+            poll_interval=POLL_INTERVAL, **kwargs):
+    """Return a LiveData instance if this process becomes the owner, or a reader if not.
+
+    Readers take over if the owner exits.
+
+    Arguments:
+        pyrebase_app: Pyrebase app, used only by the owner.
+        root_path: Root path to watch.
+        cache_path: Path of the checkpoint file. A lock file and a socket are created
+            next to it.
+        checkpoint_interval: Minimum number of seconds between checkpoints.
+        poll_interval: Minimum number of seconds between reader checks for checkpoints.
+        kwargs: Additional arguments for LiveData, except `memory_budget`.
+    """
+    if kwargs.get('memory_budget') is not None:
+        raise ValueError('Cannot share LiveData with a memory budget')
+
+    lock_file = acquire_owner('{}.lock'.format(cache_path))
+
+    if lock_file is not None:
+        logger.debug('Owning shared cache: %s', cache_path)
+        return _start_owner(
+            pyrebase_app, root_path, cache_path, lock_file, checkpoint_interval, kwargs
+        )
+
+    logger.debug('Reading shared cache: %s', cache_path)
+    reader = SharedCacheReader(
+        cache_path,
+        poll_interval=poll_interval,
+        promote=lambda lock_file: _start_owner(
+            pyrebase_app, root_path, cache_path, lock_file, checkpoint_interval, kwargs
+        )
+    )
+    reader.listen()
+    return reader
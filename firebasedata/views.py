@@ -0,0 +1,226 @@
+"""Derived data that is kept up to date with a LiveData instance.
+
+A view keeps a filtered and mapped copy of the children under a source path. Only the
+children touched by a change are recomputed, so a view stays cheap to maintain even when
+the data under its source is large.
+
+A selector memoizes the result of a function of the data, and recomputes it lazily,
+after a change to one of the paths it depends on.
+"""
+import collections.abc
+import copy
+import logging
+import threading
+
+from blinker import Signal
+
+from . import data
+
+logger = logging.getLogger(__name__)
+
+
+def _keep(value):
+    return True
+
+
+class View(collections.abc.Mapping):
+    """Read-only mapping of the children under {source}, by key.
+
+    Arguments:
+        live_data: LiveData instance to watch.
+        source: Path of the children to include.
+        filter_func: Optional callable, given the value of a child. The child is only
+            included if it returns True.
+        map_func: Optional callable, given the value of an included child. Returns the
+            value stored in the view, which must not share mutable data with the child.
+            Defaults to a deep copy of the child.
+
+    The `changed` signal is sent, with the view as the sender, whenever the view
+    changes. Its `changes` keyword argument is a dictionary of the new values of the
+    changed keys, with None for keys that were removed.
+    """
+
+    def __init__(self, live_data, source, filter_func=None, map_func=None):
+        self._live_data = live_data
+        self._source = data.get_path_list(source)
+        self._filter = _keep if filter_func is None else filter_func
+        # Children are copied, so they are not changed in place by later updates
+        self._map = copy.deepcopy if map_func is None else map_func
+        self._items = None
+        self.changed = Signal()
+        live_data.signal('/').connect(self._on_change, weak=False)
+
+        if live_data._cache is not None:
+            self.refresh()
+
+    @property
+    def source(self):
+        return '/'.join(self._source)
+
+    def close(self):
+        """Stop updating this view."""
+        self._live_data.signal('/').disconnect(self._on_change)
+
+    def _evaluate(self, value):
+        if value is None or not self._filter(value):
+            return None
+        return self._map(value)
+
+    def _compute(self, cache):
+        children = cache.get(self.source)
+        if not isinstance(children, collections.abc.Mapping):
+            return {}
+
+        items = {}
+        for key, value in children.items():
+            result = self._evaluate(value)
+            if result is not None:
+                items[key] = result
+        return items
+
+    def refresh(self):
+        """Recompute the whole view. Returns the changes."""
+        cache = self._live_data._cache
+        new_items = {} if cache is None else self._compute(cache)
+        old_items = self._items or {}
+        self._items = new_items
+
+        changes = {
+            key: value for key, value in new_items.items()
+            if key not in old_items or old_items[key] != value
+        }
+        changes.update(
+            (key, None) for key in old_items if key not in new_items
+        )
+        return changes
+
+    def _refresh_child(self, key):
+        new_value = self._evaluate(
+            self._live_data._cache.get('/'.join(self._source + [key]))
+        )
+        old_value = self._items.get(key)
+
+        if new_value is None:
+            self._items.pop(key, None)
+        else:
+            self._items[key] = new_value
+
+        if new_value == old_value:
+            return {}
+        return {key: new_value}
+
+    def _on_change(self, sender, path=None, **kwargs):
+        path_list = data.get_path_list(path or '')
+        depth = len(self._source)
+
+        if not data.is_related(path_list, self._source):
+            return
+
+        if self._items is None or len(path_list) <= depth:
+            # The source itself, or one of its ancestors, changed
+            changes = self.refresh()
+        else:
+            changes = self._refresh_child(path_list[depth])
+
+        if changes:
+            logger.debug('View of %s changed: %s', self.source, list(changes))
+            self.changed.send(self, changes=changes)
+
+    def _get_items(self):
+        if self._items is None:
+            self.refresh()
+        return self._items
+
+    def __getitem__(self, key):
+        return self._get_items()[key]
+
+    def __iter__(self):
+        return iter(self._get_items())
+
+    def __len__(self):
+        return len(self._get_items())
+
+    def __repr__(self):
+        return '{}(source={!r}, items={})'.format(
+            type(self).__name__,
+            self.source,
+            self._items
+        )
+
+
+class Selector:
+    """Memoized result of {func}, called with the data of a LiveData instance.
+
+    The result is computed when the selector is called, and kept until a change is
+    applied at, above or below one of the paths in {depends_on}.
+
+    Attributes:
+        hits: Calls that returned the memoized result.
+        misses: Calls that found no valid memoized result.
+        recomputes: Calls of {func} that returned a result.
+    """
+
+    def __init__(self, live_data, func, depends_on):
+        self._live_data = live_data
+        self._func = func
+        self._depends_on = [data.get_path_list(path) for path in depends_on]
+        self._lock = threading.Lock()
+        # Incremented by every invalidation
+        self._version = 0
+        self._valid_version = None
+        self._result = None
+        self.hits = 0
+        self.misses = 0
+        self.recomputes = 0
+        live_data.signal('/').connect(self._on_change, weak=False)
+
+    def close(self):
+        """Stop watching for changes."""
+        self._live_data.signal('/').disconnect(self._on_change)
+
+    def invalidate(self):
+        with self._lock:
+            self._version += 1
+
+    @property
+    def valid(self):
+        return self._valid_version == self._version
+
+    def _on_change(self, sender, path=None, **kwargs):
+        path_list = data.get_path_list(path or '')
+
+        if any(data.is_related(path_list, depends_on) for depends_on in self._depends_on):
+            self.invalidate()
+
+    def __call__(self):
+        with self._lock:
+            if self.valid:
+                self.hits += 1
+                return self._result
+            self.misses += 1
+            version = self._version
+
+        result = self._func(self._live_data.get_data())
+
+        with self._lock:
+            self.recomputes += 1
+            # Only keep the result if nothing changed while it was computed
+            if version == self._version:
+                self._result = result
+                self._valid_version = version
+
+        return result
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'recomputes': self.recomputes,
+        }
+
+    def __repr__(self):
+        return '{}(func={!r}, valid={})'.format(
+            type(self).__name__,
+            self._func,
+            self.valid
+        )
@@ -1,20 +1,354 @@
 import datetime
+import heapq
+import itertools
 import logging
-from threading import Timer
+import queue
+import random
+import threading
+import time
 
 DEFAULT_INTERVAL = datetime.timedelta(minutes=30)
+DEFAULT_WORKERS = 4
+# Seconds after which an idle worker beyond the minimum exits
+WORKER_IDLE_TIMEOUT = 60
+JITTER_TYPES = (None, 'full', 'decorrelated')
+# Longest interval between retries, with or without a cap
+MAX_BACKOFF = datetime.timedelta(days=1)
 
 _watchers = {}
 logger = logging.getLogger(__name__)
 
 
+class ScheduledCall:
+    def __init__(self, scheduler, due, func):
+        self._scheduler = scheduler
+        self.due = due
+        self.func = func
+        self.cancelled = False
+        self.done = False
+
+    @property
+    def pending(self):
+        return not (self.cancelled or self.done)
+
+    def cancel(self):
+        self._scheduler.cancel(self)
+
+
+class Scheduler:
+    """Run functions at a later time, from a single scheduling thread.
+
+    Due times are kept in a heap. Cancelled calls are only marked as such, and are
+    discarded when they reach the top of the heap. Due functions are handed to a pool of
+    worker threads, so a slow function cannot delay the others. The pool keeps at least
+    {workers} threads, and grows when they are all busy, so functions that block (such as
+    fetches during a network outage) never hold up the rest. Extra threads exit once
+    they have been idle for WORKER_IDLE_TIMEOUT seconds.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS):
+        self._heap = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._pending = 0
+        self._thread = None
+        self._workers = workers
+        self._tasks = queue.Queue()
+        self._pool_lock = threading.Lock()
+        self._worker_count = 0
+        # Number of waiting workers, less the number of queued functions
+        self._idle = 0
+
+    def schedule(self, delay, func):
+        """Call {func} after {delay} seconds. Returns a cancellable ScheduledCall."""
+        call = ScheduledCall(self, time.monotonic() + delay, func)
+
+        with self._cond:
+            heapq.heappush(self._heap, (call.due, next(self._counter), call))
+            self._pending += 1
+            self._start()
+            self._cond.notify()
+
+        return call
+
+    def cancel(self, call):
+        with self._cond:
+            if call.pending:
+                call.cancelled = True
+                self._pending -= 1
+
+    def reschedule(self, call, delay):
+        """Cancel {call}, and schedule its function again after {delay} seconds."""
+        self.cancel(call)
+        return self.schedule(delay, call.func)
+
+    def pending(self):
+        """Return the number of calls waiting to run."""
+        return self._pending
+
+    def next_due(self):
+        """Return the time.monotonic() time of the next call, or None."""
+        with self._cond:
+            self._discard_cancelled()
+            if not self._heap:
+                return None
+            return self._heap[0][0]
+
+    def _discard_cancelled(self):
+        while self._heap and self._heap[0][2].cancelled:
+            heapq.heappop(self._heap)
+
+    def _start(self):
+        if self._thread is not None:
+            return
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+        with self._pool_lock:
+            for _ in range(self._workers):
+                self._add_worker()
+                self._idle += 1
+
+    def workers(self):
+        """Return the number of worker threads."""
+        return self._worker_count
+
+    def _add_worker(self):
+        self._worker_count += 1
+        threading.Thread(target=self._work, daemon=True).start()
+
+    def _dispatch(self, func):
+        with self._pool_lock:
+            if self._idle > 0:
+                self._idle -= 1
+            else:
+                # Every worker is busy. The new one takes a queued function.
+                self._add_worker()
+        self._tasks.put(func)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._discard_cancelled()
+
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+
+                delay = self._heap[0][0] - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+
+                _, _, call = heapq.heappop(self._heap)
+                call.done = True
+                self._pending -= 1
+
+            self._dispatch(call.func)
+
+    def _work(self):
+        while True:
+            try:
+                func = self._tasks.get(timeout=WORKER_IDLE_TIMEOUT)
+            except queue.Empty:
+                with self._pool_lock:
+                    # Exit only if the other waiting workers can take the queued calls
+                    if self._worker_count > self._workers and self._idle > 0:
+                        self._worker_count -= 1
+                        self._idle -= 1
+                        return
+                continue
+
+            try:
+                func()
+            except Exception:
+                logger.exception('Error in scheduled function: %s', func)
+
+            with self._pool_lock:
+                self._idle += 1
+
+
+_scheduler = Scheduler()
+
+
+class Backoff:
+    """Exponentially growing intervals between retries, with optional jitter.
+
+    Arguments:
+        initial: datetime.timedelta of the first interval.
+        multiplier: Factor by which each interval grows over the previous one.
+        cap: Optional datetime.timedelta that intervals may not exceed. Intervals never
+            exceed MAX_BACKOFF either way.
+        jitter: None for exact intervals, 'full' for a random interval between zero and
+            the exponential interval, or 'decorrelated' for a random interval between
+            {initial} and three times the previous interval.
+    """
+
+    def __init__(self, initial, multiplier=2, cap=None, jitter=None):
+        if jitter not in JITTER_TYPES:
+            raise ValueError('Invalid jitter: {}'.format(jitter))
+
+        self.initial = initial
+        self.multiplier = multiplier
+        self.cap = cap
+        self.jitter = jitter
+        self.attempts = 0
+        self.next_retry_at = None
+        self._previous = None
+        # Interval before jitter, which stops growing at the cap
+        self._exponential = None
+
+    def _cap(self, seconds):
+        cap = MAX_BACKOFF if self.cap is None else min(self.cap, MAX_BACKOFF)
+        return min(seconds, cap.total_seconds())
+
+    def next_interval(self):
+        """Return the interval until the next attempt, as a datetime.timedelta."""
+        initial = self.initial.total_seconds()
+
+        if self.jitter == 'decorrelated':
+            previous = initial if self._previous is None else self._previous
+            seconds = self._cap(random.uniform(initial, previous * 3))
+        else:
+            if self._exponential is None:
+                self._exponential = self._cap(initial)
+            else:
+                # Never computes a power of the multiplier, which would overflow
+                self._exponential = self._cap(self._exponential * self.multiplier)
+            seconds = self._exponential
+            if self.jitter == 'full':
+                seconds = random.uniform(0, seconds)
+
+        self.attempts += 1
+        self._previous = seconds
+        interval = datetime.timedelta(seconds=seconds)
+        self.next_retry_at = datetime.datetime.utcnow() + interval
+        return interval
+
+    def reset(self):
+        self.attempts = 0
+        self.next_retry_at = None
+        self._previous = None
+        self._exponential = None
+
+    def __repr__(self):
+        return '{}(attempts={}, next_retry_at={})'.format(
+            type(self).__name__,
+            self.attempts,
+            self.next_retry_at
+        )
+
+
+class DurationStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.last = None
+        self.max = None
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+
+    @property
+    def avg(self):
+        if not self.count:
+            return None
+        return self.total / self.count
+
+    def as_dict(self):
+        return {
+            'last': self.last,
+            'avg': self.avg,
+            'max': self.max,
+        }
+
+
+class WatcherStats:
+    """Run statistics for a watcher. Durations are in seconds.
+
+    Attributes:
+        runs: Number of times {should_update} was called.
+        triggers: Number of times {should_update} returned True.
+        errors: Number of runs that raised an exception.
+        check: Durations of {should_update}.
+        update: Durations of {update_func}.
+        drift: How late each run started, compared to when it was due.
+        delay: Delays that runs were scheduled with.
+        last_run_at: UTC datetime of the last run.
+    """
+
+    def __init__(self):
+        self.runs = 0
+        self.triggers = 0
+        self.errors = 0
+        self.check = DurationStats()
+        self.update = DurationStats()
+        self.drift = DurationStats()
+        self.delay = DurationStats()
+        self.last_run_at = None
+
+    def start_run(self, drift, delay=None):
+        self.runs += 1
+        self.last_run_at = datetime.datetime.utcnow()
+        self.drift.add(max(0.0, drift))
+        if delay is not None:
+            self.delay.add(delay)
+
+    def as_dict(self):
+        return {
+            'runs': self.runs,
+            'triggers': self.triggers,
+            'errors': self.errors,
+            'last_run_at': self.last_run_at,
+            'check': self.check.as_dict(),
+            'update': self.update.as_dict(),
+            'drift': self.drift.as_dict(),
+            'delay': self.delay.as_dict(),
+        }
+
+
+def describe(watcher, next_due):
+    """Return a dictionary describing a watcher and its statistics.
+
+    The interval is the delay, in seconds, that the next check was scheduled with.
+    """
+    delay = watcher.stats.delay.last
+    drift = watcher.stats.drift.last
+    return {
+        'interval': watcher.delay,
+        'next_due': next_due,
+        # The last run started more than its entire delay late
+        'behind': bool(delay is not None and drift and drift > delay),
+        'stats': watcher.stats.as_dict(),
+    }
+
+
+def get_delay(interval, backoff=None):
+    """Return the datetime.timedelta until the next check of a watcher."""
+    if backoff is not None:
+        return backoff.next_interval()
+    if callable(interval):
+        return interval()
+    return interval
+
+
 class Watcher:
-    def __init__(self, should_update, update_func, interval=None):
+    def __init__(self, should_update, update_func, interval=None, backoff=None):
         self._should_update = should_update
         self._update_func = update_func
         self._interval = DEFAULT_INTERVAL if interval is None else interval
+        self._backoff = backoff
         self._should_cancel = False
+        self._call = None
         self.running = False
+        # Seconds that the current check was scheduled with
+        self.delay = None
+        self.stats = WatcherStats()
 
     def start(self):
         if self._should_cancel:
@@ -25,11 +359,27 @@ class Watcher:
             logger.debug('Watcher already running: %s', id(self))
             return
 
-        self._timer = Timer(self._interval.total_seconds(), self._action)
-        self._timer.daemon = True
-        self._timer.start()
+        self.delay = get_delay(self._interval, self._backoff).total_seconds()
+        self._call = _scheduler.schedule(self.delay, self._action)
         self.running = True
 
+    def reschedule(self, delay=None):
+        """Run the next check after {delay} (a datetime.timedelta) instead."""
+        if self._should_cancel or self._call is None or not self._call.pending:
+            return
+
+        if delay is None:
+            delay = get_delay(self._interval, self._backoff)
+
+        self.delay = delay.total_seconds()
+        self._call = _scheduler.reschedule(self._call, self.delay)
+
+    @property
+    def next_due(self):
+        if self._call is None or not self._call.pending:
+            return None
+        return self._call.due
+
     def _action(self):
         if self._should_cancel:
             logger.debug('Stopping cancelled watcher: %s', id(self))
@@ -42,23 +392,48 @@ class Watcher:
             self._should_update
         )
 
-        if self._should_update():
+        started_at = time.monotonic()
+        due = started_at if self._call is None else self._call.due
+        self.stats.start_run(started_at - due, self.delay)
+
+        try:
+            should_update = self._should_update()
+        except Exception:
+            self.stats.errors += 1
+            raise
+        finally:
+            self.stats.check.add(time.monotonic() - started_at)
+
+        if should_update:
             logger.debug(
                 'Update requested. Watcher (%s) updating: %s',
                 id(self),
                 self._update_func
             )
-            self._update_func()
+            self.stats.triggers += 1
+            started_at = time.monotonic()
+            try:
+                self._update_func()
+            except Exception:
+                self.stats.errors += 1
+                raise
+            finally:
+                self.stats.update.add(time.monotonic() - started_at)
+        elif self._backoff is not None:
+            # Nothing to retry
+            self._backoff.reset()
 
-        # Mark this timer as complete, and start a new timer
+        # Mark this run as complete, and schedule the next one
         self.running = False
         self.start()
 
     def cancel(self):
         self._should_cancel = True
+        if self._call is not None:
+            self._call.cancel()
 
 
-def watch(name, should_update, update_func, interval=None):
+def watch(name, should_update, update_func, interval=None, backoff=None):
     """Watch something and call a function when it should be updated.
 
     Arguments:
@@ -68,7 +443,10 @@ def watch(name, should_update, update_func, interval=None):
         update_func: Callable that updates the thing being watched when {should_update}
             returns True. Watching and updating occurs in a separate thread,
             so ensure this function is threadsafe.
-        interval: datetime.timedelta indicating how often to poll {should_update}.
+        interval: datetime.timedelta indicating how often to poll {should_update}, or a
+            callable returning the datetime.timedelta until the next poll.
+        backoff: Optional Backoff instance. If given, it determines the interval
+            instead. It is reset whenever {should_update} returns False.
     """
     if name in _watchers:
         logger.warning(
@@ -77,12 +455,38 @@ def watch(name, should_update, update_func, interval=None):
         )
         return
 
-    watcher = Watcher(should_update, update_func, interval)
+    watcher = Watcher(should_update, update_func, interval, backoff)
     logger.debug('New watcher started %s: %s', name, id(watcher))
     _watchers[name] = watcher
     watcher.start()
 
 
+def reschedule(name, delay=None):
+    """Run the next check of watcher {name} after {delay}, instead of its interval.
+
+    Returns True if the watcher exists, or None otherwise.
+    """
+    watcher = _watchers.get(name)
+    if not watcher:
+        return None
+    watcher.reschedule(delay)
+    return True
+
+
+def get_watcher(name):
+    """Return the watcher named {name}, or None."""
+    return _watchers.get(name)
+
+
+def list_watchers():
+    """Return a dictionary describing every watcher, and its statistics, by name."""
+    return {
+        name: describe(watcher, watcher.next_due)
+        for name, watcher in list(_watchers.items())
+        if watcher
+    }
+
+
 def cancel(name):
     if name not in _watchers:
         return None
@@ -99,3 +503,13 @@ def cancel_all():
     for watcher in _watchers.values():
         watcher.cancel()
     _watchers.clear()
+
+
+def pending():
+    """Return the number of watcher checks waiting to run."""
+    return _scheduler.pending()
+
+
+def next_due():
+    """Return the time.monotonic() time of the next watcher check, or None."""
+    return _scheduler.next_due()
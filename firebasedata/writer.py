@@ -0,0 +1,167 @@
+"""Write data to Firebase over a pool of keep-alive HTTP connections.
+
+Requests are sent by the Firebase REST API, on a bounded number of worker threads that
+share one `requests` session, so connections are reused between writes.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import json
+import logging
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from . import data
+from .recorder import LatencyStats
+
+logger = logging.getLogger(__name__)
+
+MAX_IN_FLIGHT = 4
+TIMEOUT = 30
+LATENCY_SAMPLES = 10000
+
+
+class WriteStats:
+    def __init__(self, samples=LATENCY_SAMPLES):
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.latency = LatencyStats(samples)
+        self._lock = threading.Lock()
+
+    def summary(self):
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'in_flight': self.in_flight,
+            'latency': self.latency.summary(),
+        }
+
+
+class WriteClient:
+    """Send writes to a Firebase database concurrently.
+
+    Arguments:
+        database_url: URL of the Firebase database.
+        max_in_flight: Maximum number of requests in progress at the same time.
+        pool_size: Maximum number of connections to keep open. Defaults to
+            {max_in_flight}.
+        timeout: Seconds to wait for each request.
+        token: Optional auth token, such as a user's ID token, sent with every request.
+        credentials: Optional service account credentials, like those of a Pyrebase
+            app. Unless {token} is given, an access token from them is sent with every
+            request.
+        session: Optional `requests.Session` to send requests with.
+    """
+
+    def __init__(self, database_url, max_in_flight=MAX_IN_FLIGHT, pool_size=None,
+                 timeout=TIMEOUT, token=None, credentials=None, session=None):
+        self._database_url = database_url.rstrip('/')
+        self._timeout = timeout
+        self._token = token
+        self._credentials = credentials
+
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=pool_size or max_in_flight,
+                pool_block=True
+            )
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+
+        self._session = session
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_in_flight,
+            thread_name_prefix='firebasedata-writer'
+        )
+        self.stats = WriteStats()
+
+    @classmethod
+    def from_app(cls, pyrebase_app, **kwargs):
+        """Return a WriteClient for the database of a Pyrebase app.
+
+        Writes are authenticated with the app's service account credentials, if it has
+        any, like Pyrebase does. Pass `token` to write as a user instead.
+        """
+        kwargs.setdefault('credentials', getattr(pyrebase_app, 'credentials', None))
+        return cls(pyrebase_app.database_url, **kwargs)
+
+    def url(self, path):
+        return '{}/{}.json'.format(
+            self._database_url,
+            '/'.join(data.get_path_list(path))
+        )
+
+    def set(self, path, value):
+        """Set {value} at {path}, and wait for the write to finish."""
+        return self.set_async(path, value).result()
+
+    def set_async(self, path, value):
+        """Set {value} at {path} without waiting.
+
+        Returns a `concurrent.futures.Future`, resolved with the written value.
+        """
+        payload = json.dumps(value).encode('utf-8')
+        return self._executor.submit(self._send, 'PUT', self.url(path), payload)
+
+    def update(self, path, values):
+        """Update the children of {path}, and wait for the write to finish.
+
+        {values} is a dictionary of values by relative path, so several paths may be
+        written at once.
+        """
+        return self.update_async(path, values).result()
+
+    def update_async(self, path, values):
+        """Update the children of {path} without waiting. Returns a Future."""
+        payload = json.dumps(values).encode('utf-8')
+        return self._executor.submit(self._send, 'PATCH', self.url(path), payload)
+
+    def _auth_params(self):
+        if self._token is not None:
+            return {'auth': self._token}
+        if self._credentials is not None:
+            # Cached by the credentials, and refreshed when it expires
+            return {'access_token': self._credentials.get_access_token().access_token}
+        return None
+
+    def _send(self, method, url, payload):
+        stats = self.stats
+
+        with stats._lock:
+            stats.in_flight += 1
+
+        start = time.perf_counter()
+        try:
+            response = self._session.request(
+                method,
+                url,
+                data=payload,
+                params=self._auth_params(),
+                timeout=self._timeout
+            )
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            with stats._lock:
+                stats.errors += 1
+            logger.warning('Error writing %s: %s', url, e)
+            raise
+        finally:
+            stats.latency.add(time.perf_counter() - start)
+            with stats._lock:
+                stats.in_flight -= 1
+                stats.requests += 1
+
+    def close(self, wait=True):
+        self._executor.shutdown(wait=wait)
+        self._session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -12,6 +12,7 @@ setup(
     packages=find_packages(),
     install_requires=[
         'blinker>=1.4',
+        'requests',
     ],
     python_requires='>=3, <4',
     url='https://github.com/heston/firebase-live-data',
@@ -2,6 +2,8 @@ import os.path
 import logging
 import sys
 
+import pytest
+
 # Add the module path
 module_path = os.path.abspath(os.path.join(
     os.path.dirname(__file__),
@@ -19,3 +21,11 @@ def pytest_configure(config):
     config.addinivalue_line(
         "markers", "slow: marks tests as slow (deselect with '-m \"not slow\""
     )
+
+
+@pytest.fixture(autouse=True)
+def cancel_watchers():
+    """Stop watchers started by a test, so they don't run during later tests."""
+    yield
+    from firebasedata import watcher
+    watcher.cancel_all()
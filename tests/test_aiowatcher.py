@@ -0,0 +1,242 @@
+import asyncio
+from datetime import timedelta
+import threading
+
+from firebasedata import aiowatcher, live, watcher
+
+INTERVAL = timedelta(seconds=.001)
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 2))
+
+
+async def wait_for(condition):
+    while not condition():
+        await asyncio.sleep(.001)
+
+
+def test_sync_functions_run_in_executor(mocker):
+    threads = []
+    update = mocker.Mock(side_effect=lambda: threads.append(threading.get_ident()))
+
+    async def main():
+        engine = aiowatcher.Engine(asyncio.get_running_loop())
+        engine.watch('test', lambda: True, update, INTERVAL)
+        await wait_for(lambda: update.called)
+        engine.cancel_all()
+
+    run(main())
+
+    assert threads[0] != threading.get_ident()
+
+
+def test_not_stale(mocker):
+    should_update = mocker.Mock(return_value=False)
+    update = mocker.Mock()
+
+    async def main():
+        engine = aiowatcher.Engine(asyncio.get_running_loop())
+        engine.watch('test', should_update, update, INTERVAL)
+        await wait_for(lambda: should_update.call_count >= 3)
+        engine.cancel('test')
+
+    run(main())
+
+    assert not update.called
+
+
+def test_coroutine_functions(mocker):
+    calls = []
+
+    async def should_update():
+        return True
+
+    async def update():
+        calls.append(asyncio.current_task())
+
+    async def main():
+        engine = aiowatcher.Engine(asyncio.get_running_loop())
+        engine.watch('test', should_update, update, INTERVAL)
+        await wait_for(lambda: calls)
+        engine.cancel('test')
+
+    run(main())
+
+    assert calls[0] is not None
+
+
+def test_errors_are_logged(mocker):
+    logger = mocker.patch('firebasedata.aiowatcher.logger')
+    should_update = mocker.Mock(side_effect=[ValueError('Test error'), False, False])
+
+    async def main():
+        engine = aiowatcher.Engine(asyncio.get_running_loop())
+        engine.watch('test', should_update, mocker.Mock(), INTERVAL)
+        await wait_for(lambda: should_update.call_count == 3)
+        engine.cancel('test')
+
+    run(main())
+
+    assert logger.exception.called
+
+
+def test_stats(mocker):
+    results = iter([ValueError('Test error'), True])
+
+    def should_update():
+        result = next(results, False)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    update = mocker.Mock()
+    mocker.patch('firebasedata.aiowatcher.logger')
+
+    async def main():
+        engine = aiowatcher.Engine(asyncio.get_running_loop())
+        engine.watch('test', should_update, update, INTERVAL)
+        await wait_for(lambda: engine.get_watcher('test').stats.check.count == 3)
+        result = engine.list_watchers()
+        engine.cancel('test')
+        return result
+
+    result = run(main())
+
+    stats = result['test']['stats']
+    assert stats['runs'] >= 3
+    assert stats['triggers'] == 1
+    assert stats['errors'] == 1
+    assert stats['update']['max'] is not None
+    assert stats['drift']['last'] >= 0
+    assert result['test']['interval'] == INTERVAL.total_seconds()
+    assert stats['delay']['last'] == INTERVAL.total_seconds()
+
+
+def test_backoff(mocker):
+    backoff = watcher.Backoff(INTERVAL, multiplier=1)
+    should_update = mocker.Mock(side_effect=[True, True, False, False])
+
+    async def main():
+        engine = aiowatcher.Engine(asyncio.get_running_loop())
+        engine.watch('test', should_update, mocker.Mock(), backoff=backoff)
+        await wait_for(lambda: should_update.call_count == 3)
+        await asyncio.sleep(0)
+        engine.cancel('test')
+
+    run(main())
+
+    # Reset after the third check, then scheduled once more
+    assert backoff.attempts == 1
+
+
+def test_cancel(mocker):
+    should_update = mocker.Mock(return_value=False)
+
+    async def main():
+        engine = aiowatcher.Engine(asyncio.get_running_loop())
+        engine.watch('test', should_update, mocker.Mock(), timedelta(seconds=.05))
+
+        assert engine.cancel('test') is True
+        assert engine.cancel('test') is None
+
+        await asyncio.sleep(.1)
+
+    run(main())
+
+    assert not should_update.called
+
+
+def test_existing_name(mocker):
+    logger = mocker.patch('firebasedata.aiowatcher.logger')
+
+    async def main():
+        engine = aiowatcher.Engine(asyncio.get_running_loop())
+        engine.watch('test', mocker.Mock(), mocker.Mock(), timedelta(hours=1))
+        engine.watch('test', mocker.Mock(), mocker.Mock(), timedelta(hours=1))
+        engine.cancel_all()
+
+    run(main())
+
+    assert logger.warning.called
+
+
+def test_watch_from_other_thread(mocker):
+    update = mocker.Mock()
+
+    async def main():
+        engine = aiowatcher.Engine(asyncio.get_running_loop())
+        thread = threading.Thread(
+            target=engine.watch,
+            args=('test', lambda: True, update, INTERVAL)
+        )
+        thread.start()
+        thread.join()
+        await wait_for(lambda: update.called)
+        engine.cancel('test')
+
+    run(main())
+
+
+def test_cancel_from_other_thread(mocker):
+    should_update = mocker.Mock(return_value=False)
+    results = []
+
+    def watch_and_cancel(engine):
+        engine.watch('test', should_update, mocker.Mock(), INTERVAL)
+        results.append(engine.cancel('test'))
+        results.append(engine.cancel('test'))
+
+    async def main():
+        engine = aiowatcher.Engine(asyncio.get_running_loop())
+        thread = threading.Thread(target=watch_and_cancel, args=(engine,))
+        thread.start()
+        thread.join()
+        await asyncio.sleep(.05)
+        return engine
+
+    engine = run(main())
+
+    assert results == [True, None]
+    assert engine.get_watcher('test') is None
+    assert not should_update.called
+
+
+def test_get_engine():
+    async def main():
+        return aiowatcher.get_engine(), aiowatcher.get_engine()
+
+    engine1, engine2 = run(main())
+
+    assert engine1 is engine2
+    assert isinstance(engine1, aiowatcher.Engine)
+
+
+class Test_LiveData:
+    def test_without_loop(self, mocker):
+        livedata = live.LiveData(mocker.Mock(), '/')
+
+        assert livedata._watcher is watcher
+
+    def test_in_running_loop(self, mocker):
+        async def main():
+            livedata = live.LiveData(mocker.Mock(), '/')
+            return livedata, asyncio.get_running_loop()
+
+        livedata, loop = run(main())
+
+        assert livedata._watcher is aiowatcher.get_engine(loop)
+
+    def test_metawatcher_in_running_loop(self, mocker):
+        async def main():
+            livedata = live.LiveData(
+                mocker.Mock(),
+                '/',
+                retry_interval=INTERVAL
+            )
+            livedata.connect_silent = mocker.Mock()
+            livedata.start_metawatcher()
+            await wait_for(lambda: livedata.connect_silent.called)
+            livedata.cancel_metawatcher()
+
+        run(main())
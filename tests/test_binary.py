@@ -0,0 +1,129 @@
+import io
+
+import pytest
+
+from firebasedata import binary, data
+
+TREE = {
+    'users': {
+        'alice': {'name': 'Alice', 'age': 30, 'admin': True, 'score': 1.5},
+        'bob': {'name': 'Bob', 'age': 25, 'admin': False, 'score': None},
+    },
+    'big': 2 ** 70,
+    'negative': -42,
+    'list': [1, 'two', {'three': 3}],
+    'unicode': 'héllo ☃',
+    'empty': {},
+}
+
+
+class NonSeekable(io.BytesIO):
+    def seekable(self):
+        return False
+
+
+def test_round_trip():
+    result = binary.loads(binary.dumps(TREE))
+
+    assert isinstance(result, data.FirebaseData)
+    assert result.get() == TREE
+
+
+def test_firebase_data():
+    fb = data.FirebaseData(TREE)
+
+    assert binary.loads(binary.dumps(fb)).get() == TREE
+
+
+@pytest.mark.parametrize('value', ['scalar', 1, None, [1, 2]])
+def test_root_value(value):
+    assert binary.Decoder(io.BytesIO(binary.dumps(value))).value() == value
+
+
+def test_keys_interned():
+    tree = {'k{}'.format(i): {'a_long_key_name': i} for i in range(100)}
+    encoded = binary.dumps(tree)
+
+    assert encoded.count(b'a_long_key_name') == 1
+    assert binary.loads(encoded).get() == tree
+
+
+def test_smaller_than_json():
+    import json
+    tree = {'k{}'.format(i): {'name': 'n', 'enabled': True} for i in range(100)}
+
+    assert len(binary.dumps(tree)) < len(json.dumps(tree))
+
+
+def test_invalid_magic():
+    with pytest.raises(ValueError):
+        binary.loads(b'nope')
+
+
+def test_truncated():
+    with pytest.raises(ValueError):
+        binary.loads(binary.dumps(TREE)[:-10])
+
+
+def test_unsupported_type():
+    with pytest.raises(TypeError):
+        binary.dumps({'a': object()})
+
+
+def test_items_streaming():
+    fp = io.BytesIO(binary.dumps(TREE))
+
+    assert list(binary.Decoder(fp).items()) == list(TREE.items())
+
+
+@pytest.mark.parametrize('fp_class', [io.BytesIO, NonSeekable])
+def test_exclude(fp_class):
+    fp = fp_class(binary.dumps(TREE))
+
+    result = binary.load(fp, exclude=['users/bob', 'list', 'users/alice/age'])
+
+    assert result.get('users') == {
+        'alice': {'name': 'Alice', 'admin': True, 'score': 1.5}
+    }
+    assert result.get('list') is None
+    assert result.get('big') == 2 ** 70
+
+
+def test_exclude_overlapping():
+    result = binary.loads(binary.dumps(TREE), exclude=['users/bob/age', 'users'])
+
+    assert result.get('users') is None
+
+
+def test_items_exclude():
+    fp = io.BytesIO(binary.dumps(TREE))
+
+    keys = [key for key, value in binary.Decoder(fp).items(exclude=['users'])]
+
+    assert 'users' not in keys
+    assert 'big' in keys
+
+
+@pytest.mark.parametrize('path, expected', [
+    ('users/bob/name', 'Bob'),
+    ('users/alice', TREE['users']['alice']),
+    ('/unicode', TREE['unicode']),
+    ('users/carol', None),
+    ('big/nested', None),
+    ('missing', None),
+    ('/', TREE),
+])
+def test_get(path, expected):
+    fp = io.BytesIO(binary.dumps(TREE))
+
+    assert binary.Decoder(fp).get(path) == expected
+
+
+def test_get_skips_records(mocker):
+    fp = io.BytesIO(binary.dumps(TREE))
+    decoder = binary.Decoder(fp)
+    decode = mocker.spy(decoder, '_decode')
+
+    decoder.get('unicode')
+
+    assert decode.call_count == 1
@@ -0,0 +1,193 @@
+import json
+
+import pytest
+
+from firebasedata import binary, budget
+
+
+def record(size):
+    return {'payload': 'x' * size}
+
+
+@pytest.fixture
+def server():
+    return {
+        'a': record(1000),
+        'b': record(1000),
+        'c': record(1000),
+    }
+
+
+@pytest.fixture
+def loader(mocker, server):
+    return mocker.Mock(side_effect=lambda path: server.get(path))
+
+
+@pytest.fixture
+def cache(server, loader):
+    unit_size = budget.estimate_size(record(1000))
+    return budget.BoundedData(dict(server), unit_size * 2.5, loader)
+
+
+def test_estimate_size():
+    assert budget.estimate_size(record(2000)) > budget.estimate_size(record(1000)) > 1000
+
+
+def test_invalid_depth(loader):
+    with pytest.raises(ValueError):
+        budget.BoundedData({}, 100, loader, depth=0)
+
+
+def test_evicts_past_budget(cache):
+    assert cache.size <= cache.budget
+    assert cache.stats.evictions == 1
+    assert isinstance(dict.__getitem__(cache, 'a'), budget.Evicted)
+
+
+def test_refetch_on_get(cache, loader, server):
+    assert cache.get('a/payload') == server['a']['payload']
+
+    loader.assert_called_once_with('a')
+    assert cache.stats.misses == 1
+    # Fetching `a` evicts `b`, the least recently read
+    assert isinstance(dict.__getitem__(cache, 'b'), budget.Evicted)
+    assert cache.size <= cache.budget
+
+
+def test_hits(cache, loader):
+    cache.get('b')
+    cache.get('b/payload')
+
+    assert cache.stats.hits == 2
+    assert not loader.called
+
+
+def test_least_recently_read_evicted(cache, server):
+    cache.get('b')
+    cache.set('d', record(1000))
+
+    assert isinstance(dict.__getitem__(cache, 'c'), budget.Evicted)
+    assert dict.__getitem__(cache, 'b') == server['b']
+
+
+def test_update_to_evicted_unit_dropped(cache, loader, server):
+    cache.set('a/payload', 'new')
+
+    assert cache.stats.dropped_updates == 1
+    assert isinstance(dict.__getitem__(cache, 'a'), budget.Evicted)
+
+    server['a'] = {'payload': 'new'}
+    assert cache.get('a/payload') == 'new'
+
+
+def test_replace_evicted_unit(cache, loader):
+    cache.set('a', {'payload': 'small'})
+
+    assert cache.get('a/payload') == 'small'
+    assert not loader.called
+
+
+def test_update_resident_unit_resizes(cache):
+    size = cache.size
+    cache.set('c/payload', 'x' * 10)
+
+    assert cache.size < size
+
+
+def test_delete_unit(cache):
+    size = cache.size
+    cache.set('c', None)
+
+    assert cache.size < size
+    assert cache.get('c') is None
+
+
+def test_root_set_keeps_evicted_placeholders(cache):
+    cache.set('/', {'d': {'payload': 'small'}})
+
+    assert isinstance(dict.__getitem__(cache, 'a'), budget.Evicted)
+    assert cache.get('d/payload') == 'small'
+
+
+def test_changes_during_refetch(cache, loader, server):
+    def load(path):
+        if loader.call_count == 1:
+            # A change arrives, and is dropped, while fetching
+            cache.set('a/payload', 'new')
+        return server[path]
+
+    loader.side_effect = load
+    server['a'] = {'payload': 'new'}
+
+    assert cache.get('a/payload') == 'new'
+    assert loader.call_count == 2
+
+
+def test_deeper_units(loader):
+    value = {
+        'users': {'u1': record(1000), 'u2': record(1000)},
+        'config': {'x': 1},
+    }
+    cache = budget.BoundedData(
+        value, budget.estimate_size(record(1000)) * 1.5, loader, depth=2
+    )
+
+    assert isinstance(dict.__getitem__(cache, 'users')['u1'], budget.Evicted)
+    assert cache.get('config/x') == 1
+
+
+def test_read_above_units(cache, loader, server):
+    result = cache.get()
+
+    assert isinstance(result, budget.LoadingTree)
+    assert sorted(result) == sorted(server)
+    assert not loader.called
+
+    assert result == server
+    loader.assert_called_once_with('a')
+    # Loaded for the read only
+    assert isinstance(dict.__getitem__(cache, 'a'), budget.Evicted)
+    assert cache.stats.evictions == 1
+
+
+def test_read_above_units_without_evictions(server, loader):
+    cache = budget.BoundedData(dict(server), 10 ** 6, loader)
+
+    assert cache.get() is cache
+    assert not loader.called
+
+
+def test_serialize_with_evicted_units(cache, server):
+    assert json.loads(cache.get_json()) == server
+    assert binary.loads(binary.dumps(cache)) == server
+
+
+def test_get_json_after_dropped_update(cache, server):
+    cache.get_json()
+    cache.set('a/payload', 'new')
+    server['a'] = {'payload': 'new'}
+
+    assert json.loads(cache.get_json())['a'] == {'payload': 'new'}
+
+
+def test_deeper_units_read_above(loader, server):
+    server['users'] = {'u1': record(1000), 'u2': record(1000)}
+    loader.side_effect = lambda path: server['users'][path.split('/')[1]]
+    cache = budget.BoundedData(
+        {'users': dict(server['users'])},
+        budget.estimate_size(record(1000)) * 1.5,
+        loader,
+        depth=2
+    )
+
+    assert cache.get('users') == server['users']
+    loader.assert_called_once_with('users/u1')
+
+
+def test_read_above_units_loads_only_what_is_read(cache, loader, server):
+    result = cache.get()
+
+    assert result['b'] == server['b']
+    assert not loader.called
+    assert result['a'] == server['a']
+    loader.assert_called_once_with('a')
@@ -0,0 +1,222 @@
+import datetime
+import socket
+import time
+
+import pytest
+
+from firebasedata import bus, data, live, schema
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return str(tmp_path / 'bus.sock')
+
+
+@pytest.fixture
+def livedata(mocker):
+    live_data = live.LiveData(mocker.Mock(), '/')
+    live_data._cache = data.FirebaseData({'foo': {'bar': 1}, 'baz': 2})
+    return live_data
+
+
+@pytest.fixture
+def publisher(livedata, socket_path):
+    pub = bus.EventPublisher(livedata, socket_path, history=3)
+    pub.start()
+    yield pub
+    pub.close()
+
+
+@pytest.fixture
+def make_subscriber(socket_path):
+    subscribers = []
+
+    def make(**kwargs):
+        sub = bus.EventSubscriber(socket_path, reconnect_interval=.01, **kwargs)
+        subscribers.append(sub)
+        sub.listen()
+        return sub
+
+    yield make
+
+    for sub in subscribers:
+        sub.hangup()
+
+
+def wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('Timed out waiting for condition')
+        time.sleep(.01)
+
+
+class Test_is_related_path:
+    @pytest.mark.parametrize('path, prefix', [
+        ('foo', '/'),
+        ('/', 'foo'),
+        ('foo', 'foo'),
+        ('foo/bar', 'foo'),
+        ('foo', 'foo/bar'),
+    ])
+    def test_related(self, path, prefix):
+        assert bus.is_related_path(path, prefix) is True
+
+    @pytest.mark.parametrize('path, prefix', [
+        ('foobar', 'foo'),
+        ('foo', 'foobar'),
+        ('baz/bar', 'foo/bar'),
+    ])
+    def test_unrelated(self, path, prefix):
+        assert bus.is_related_path(path, prefix) is False
+
+
+def test_bus_path():
+    assert bus.bus_path('/') == '/'
+    assert bus.bus_path('/foo//bar/') == 'foo/bar'
+
+
+def test_frames():
+    left, right = socket.socketpair()
+    bus.send_frame(left, b'{"foo":[1,2]}')
+
+    assert bus.recv_frame(right) == {'foo': [1, 2]}
+
+    left.close()
+    with pytest.raises(ConnectionError):
+        bus.recv_frame(right)
+
+
+class Test_EventSubscriber:
+    def test_initial_snapshot(self, publisher, make_subscriber):
+        sub = make_subscriber()
+
+        wait_for(lambda: sub.last_seq == 0)
+
+        assert sub.get_data() == {'foo': {'bar': 1}, 'baz': 2}
+
+    def test_events_fire_signals(self, livedata, publisher, make_subscriber, mocker):
+        mock_handler = mocker.Mock()
+
+        def handler(*args, **kwargs):
+            mock_handler(*args, **kwargs)
+
+        sub = make_subscriber()
+        sub.signal('/foo').connect(handler)
+        wait_for(lambda: sub.last_seq == 0)
+
+        livedata._put_handler('/foo/bar', 3)
+        wait_for(lambda: sub.last_seq == 1)
+
+        assert sub.get_data().get('foo/bar') == 3
+        mock_handler.assert_called_with(
+            sub.get_data(),
+            value={'bar': 3},
+            path='foo/bar'
+        )
+
+    def test_prefix_filtering(self, livedata, publisher, make_subscriber):
+        sub = make_subscriber(prefix='/foo')
+        wait_for(lambda: sub.last_seq == 0)
+
+        livedata._put_handler('/baz', 4)
+        livedata._put_handler('/foo/qux', 5)
+        wait_for(lambda: sub.last_seq == 2)
+
+        assert sub.get_data() == {'foo': {'bar': 1, 'qux': 5}}
+
+    def test_resume(self, livedata, publisher, make_subscriber):
+        livedata._put_handler('/foo/bar', 3)
+        livedata._put_handler('/baz', 4)
+
+        sub = make_subscriber(since=1, epoch=publisher.epoch)
+        wait_for(lambda: sub.last_seq == 2)
+
+        assert sub.get_data() == {'baz': 4}
+
+    def test_resume_other_epoch(self, livedata, publisher, make_subscriber):
+        livedata._put_handler('/baz', 3)
+
+        sub = make_subscriber(since=1, epoch='other')
+        wait_for(lambda: sub.epoch == publisher.epoch)
+
+        assert sub.last_seq == 1
+        assert sub.get_data() == {'foo': {'bar': 1}, 'baz': 3}
+
+    def test_resume_after_eviction(self, livedata, publisher, make_subscriber):
+        for i in range(5):
+            livedata._put_handler('/baz', i)
+
+        sub = make_subscriber(since=1, epoch=publisher.epoch)
+        wait_for(lambda: sub.last_seq == 5)
+
+        assert sub.get_data() == {'foo': {'bar': 1}, 'baz': 4}
+
+    def test_reconnect(self, livedata, socket_path, make_subscriber):
+        pub = bus.EventPublisher(livedata, socket_path)
+        pub.start()
+        sub = make_subscriber()
+        wait_for(lambda: sub.last_seq == 0)
+        pub.close()
+
+        pub = bus.EventPublisher(livedata, socket_path)
+        pub.start()
+        livedata._put_handler('/baz', 3)
+        wait_for(lambda: sub.get_data().get('baz') == 3)
+        pub.close()
+
+    def test_snapshot_replaces_data(self, livedata, socket_path, make_subscriber):
+        pub = bus.EventPublisher(livedata, socket_path)
+        pub.start()
+        sub = make_subscriber()
+        wait_for(lambda: sub.last_seq == 0)
+        pub.close()
+
+        # Removed while the subscriber was disconnected
+        livedata.get_data().set('/foo', None)
+        pub = bus.EventPublisher(livedata, socket_path)
+        pub.start()
+        wait_for(lambda: sub.epoch == pub.epoch)
+        pub.close()
+
+        assert sub.get_data() == {'baz': 2}
+
+    def test_prefix_snapshot_replaces_data(self, livedata, socket_path,
+                                           make_subscriber):
+        sub = make_subscriber(prefix='/foo', since=3, epoch='other')
+        sub.get_data().set('/foo/old', 1)
+        pub = bus.EventPublisher(livedata, socket_path)
+        pub.start()
+        wait_for(lambda: sub.epoch == pub.epoch)
+        pub.close()
+
+        assert sub.get_data() == {'foo': {'bar': 1}}
+
+    def test_schema_records(self, livedata, publisher, make_subscriber):
+        livedata.register_schema(schema.Schema('devices/*', ['name']))
+        sub = make_subscriber()
+        wait_for(lambda: sub.last_seq == 0)
+
+        livedata._put_handler('/devices/d2', {'name': 'two'})
+        wait_for(lambda: sub.last_seq == 1)
+
+        assert isinstance(livedata.get_data().get('devices/d2'), schema.Record)
+        assert sub.get_data().get('devices/d2') == {'name': 'two'}
+
+    def test_read_only(self, socket_path):
+        sub = bus.EventSubscriber(socket_path)
+
+        with pytest.raises(TypeError):
+            sub.set_data('/foo', 1)
+        with pytest.raises(TypeError):
+            sub.set_data_diff('/foo', {'bar': 1})
+
+    def test_does_not_fetch(self, socket_path):
+        sub = bus.EventSubscriber(socket_path)
+
+        with pytest.raises(TypeError):
+            sub.refresh('/foo')
+        with pytest.raises(TypeError):
+            sub.set_subtree_ttl('/foo', datetime.timedelta(seconds=1))
+        with pytest.raises(TypeError):
+            sub.start_metawatcher()
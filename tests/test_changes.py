@@ -0,0 +1,68 @@
+import pytest
+
+from firebasedata import changes
+
+
+@pytest.fixture
+def log():
+    log = changes.ChangeLog(3)
+    log.append('/a', 1)
+    log.append('/b/c/', {'d': 2})
+    return log
+
+
+def test_append(log):
+    change = log.append('e', None)
+
+    assert change == changes.Change(3, 'e', None)
+    assert change.deleted
+    assert log.seq == 3
+
+
+def test_value_copied():
+    log = changes.ChangeLog(3)
+    value = {'a': 1}
+    log.append('/', value)
+    value['a'] = 2
+
+    assert log.since(0)[0].value == {'a': 1}
+
+
+def test_since(log):
+    assert log.since(0) == [
+        changes.Change(1, 'a', 1),
+        changes.Change(2, 'b/c', {'d': 2}),
+    ]
+    assert log.since(1) == [changes.Change(2, 'b/c', {'d': 2})]
+    assert log.since(2) == []
+
+
+def test_since_prefix(log):
+    assert [change.seq for change in log.since(0, prefix='b/c/d')] == [2]
+    assert [change.seq for change in log.since(0, prefix='b')] == [2]
+    assert [change.seq for change in log.since(0, prefix='/')] == [1, 2]
+    assert log.since(0, prefix='x') == []
+
+
+def test_evicted(log):
+    log.append('x', 1)
+    log.append('y', 1)
+
+    assert [change.seq for change in log.since(1)] == [2, 3, 4]
+
+    with pytest.raises(changes.HistoryEvicted) as exc_info:
+        log.since(0)
+
+    assert exc_info.value.seq == 0
+    assert exc_info.value.oldest == 2
+
+
+def test_future_seq(log):
+    with pytest.raises(changes.HistoryEvicted):
+        log.since(3)
+
+
+def test_empty():
+    log = changes.ChangeLog(3)
+
+    assert log.since(0) == []
@@ -0,0 +1,113 @@
+import threading
+import time
+
+import pytest
+
+from firebasedata import closer
+
+
+@pytest.fixture
+def logger(mocker):
+    return mocker.patch('firebasedata.closer.logger')
+
+
+@pytest.fixture
+def stream_closer():
+    return closer.StreamCloser(workers=1, timeout=.2)
+
+
+@pytest.fixture
+def hung_stream(mocker):
+    release = threading.Event()
+    stream = mocker.Mock()
+    stream.close.side_effect = lambda: release.wait(2)
+    yield stream
+    release.set()
+
+
+def test_close(stream_closer, mocker, logger):
+    stream = mocker.Mock()
+
+    request = stream_closer.close(stream)
+
+    assert stream_closer.wait([request]) == []
+    assert stream.close.called
+    assert request.closed
+    logger.debug.assert_any_call('Closing stream: %s', stream)
+    logger.debug.assert_any_call('Stream closed: %s', stream)
+
+
+def test_close_error(stream_closer, mocker, logger):
+    stream = mocker.Mock()
+    error = ValueError('Test error')
+    stream.close.side_effect = error
+
+    request = stream_closer.close(stream)
+
+    assert stream_closer.wait([request]) == [stream]
+    assert request.error is error
+    assert not request.abandoned
+    logger.warning.assert_called_with('Error closing stream %s: %s', stream, error)
+
+
+def test_hung_close_abandoned(stream_closer, hung_stream, logger):
+    request = stream_closer.close(hung_stream)
+
+    start = time.monotonic()
+    assert stream_closer.wait([request]) == [hung_stream]
+
+    assert time.monotonic() - start < 1
+    assert request.abandoned
+    logger.warning.assert_called_with('Abandoned closing stream: %s', hung_stream)
+
+
+def test_hung_close_does_not_block_others(stream_closer, hung_stream, mocker):
+    hung = stream_closer.close(hung_stream)
+    stream_closer.wait([hung])
+
+    stream = mocker.Mock()
+    request = stream_closer.close(stream)
+
+    assert stream_closer.wait([request]) == []
+    assert stream.close.called
+
+
+def test_wait_timeout(hung_stream):
+    stream_closer = closer.StreamCloser(workers=1, timeout=10)
+    request = stream_closer.close(hung_stream)
+
+    start = time.monotonic()
+    assert stream_closer.wait([request], timeout=.05) == [hung_stream]
+
+    assert time.monotonic() - start < 1
+    assert request.abandoned
+
+
+def test_parallel_close(mocker):
+    stream_closer = closer.StreamCloser(workers=3, timeout=1)
+    barrier = threading.Barrier(3, timeout=1)
+    streams = [mocker.Mock() for _ in range(3)]
+    for stream in streams:
+        stream.close.side_effect = barrier.wait
+
+    requests = [stream_closer.close(stream) for stream in streams]
+
+    assert stream_closer.wait(requests) == []
+
+
+def test_replaced_worker_exits(stream_closer, mocker):
+    release = threading.Event()
+    stream = mocker.Mock()
+    stream.close.side_effect = lambda: release.wait(2)
+    stream_closer.wait([stream_closer.close(stream)])
+
+    stream_closer.wait([stream_closer.close(mocker.Mock())])
+    assert len(stream_closer._threads) == 2
+
+    release.set()
+    for _ in range(100):
+        if len(stream_closer._threads) == 1:
+            break
+        time.sleep(.01)
+
+    assert len(stream_closer._threads) == 1
@@ -1,8 +1,10 @@
 import datetime
+import json
 
 import pytest
 
 from firebasedata import data as firebase_data
+from firebasedata import schema
 
 
 class Test_get_path_list:
@@ -55,6 +57,18 @@ class Test_normalize_path:
         assert result == expected
 
 
+@pytest.mark.parametrize('path, other, expected', [
+    ([], ['a'], True),
+    (['a'], ['a'], True),
+    (['a', 'b'], ['a'], True),
+    (['a'], ['a', 'b'], True),
+    (['a', 'b'], ['a', 'c'], False),
+    (['b'], ['a'], False),
+])
+def test_is_related(path, other, expected):
+    assert firebase_data.is_related(path, other) is expected
+
+
 class TestFirebaseData_init:
     def test_empty(self):
         data = firebase_data.FirebaseData()
@@ -237,3 +251,168 @@ class TestFirebaseData_single_value:
         result = data.get()
 
         assert result is None
+
+
+class TestFirebaseData_get_json:
+    @pytest.fixture
+    def data(self):
+        return firebase_data.FirebaseData({
+            'a': {'b': {'c': 1, 'd': 'two'}, 'e': [1, 2]},
+            'f': None,
+        })
+
+    def test_root(self, data):
+        assert json.loads(data.get_json()) == data.get()
+
+    def test_subtree(self, data):
+        assert data.get_json('a/b') == b'{"c":1,"d":"two"}'
+
+    def test_leaf(self, data):
+        assert data.get_json('a/b/d') == b'"two"'
+        assert data.get_json('missing') == b'null'
+
+    def test_single_value(self):
+        data = firebase_data.FirebaseData('hello')
+
+        assert data.get_json() == b'"hello"'
+
+    def test_cached(self, data, mocker):
+        first = data.get_json('a')
+        encode = mocker.spy(firebase_data, '_encode_json')
+
+        assert data.get_json('a') is first
+        assert not encode.called
+
+    def test_set_invalidates_ancestors(self, data):
+        data.get_json()
+        data.set('a/b/c', 5)
+
+        assert json.loads(data.get_json())['a']['b']['c'] == 5
+        assert json.loads(data.get_json('a'))['b']['c'] == 5
+
+    def test_set_invalidates_descendants(self, data):
+        data.get_json('a/b')
+        data.set('a', {'b': {'c': 2}})
+
+        assert data.get_json('a/b') == b'{"c":2}'
+
+    def test_set_root(self, data):
+        data.get_json('a')
+        data.set('/', None)
+
+        assert data.get_json('a') == b'null'
+        assert data.get_json() == b'null'
+
+    def test_siblings_reused(self, data, mocker):
+        data.get_json()
+        sibling = data._fragments.find(['a', 'b']).json
+        data.set('a/e', [3])
+        encode = mocker.spy(firebase_data, '_encode_json')
+
+        assert json.loads(data.get_json())['a']['e'] == [3]
+        assert data._fragments.find(['a', 'b']).json is sibling
+        # The `a` and `e` keys, and the changed list
+        assert encode.call_count == 3
+
+    def test_records_in_lists(self):
+        record_class = schema.Schema('*', ['x']).record_class
+        data = firebase_data.FirebaseData({'a': [record_class({'x': 1})]})
+
+        assert data.get_json() == b'{"a":[{"x":1}]}'
+
+    def test_stale_encoding_not_stored(self, data):
+        data.get_json('a')
+        version = data._fragments.version
+        data.set('a/b/c', 3)
+
+        data._fragments.store(version, [(['a'], b'stale')])
+
+        assert data.get_json('a') != b'stale'
+
+
+class Test_diff:
+    def test_equal(self):
+        assert list(firebase_data.diff({'a': {'b': 1}}, {'a': {'b': 1}})) == []
+
+    def test_scalar(self):
+        assert list(firebase_data.diff(1, 2, ['x'])) == [(['x'], 2)]
+
+    def test_nested(self):
+        old = {'a': {'b': 1, 'c': 2}, 'd': 3, 'e': {'f': 1}}
+        new = {'a': {'b': 1, 'c': 5}, 'e': 4, 'g': {'h': 1}}
+
+        result = list(firebase_data.diff(old, new))
+
+        assert sorted(result) == sorted([
+            (['a', 'c'], 5),
+            (['d'], None),
+            (['e'], 4),
+            (['g'], {'h': 1}),
+        ])
+
+    def test_removed(self):
+        assert list(firebase_data.diff({'a': 1}, None)) == [([], None)]
+
+    def test_bool_not_number(self):
+        assert list(firebase_data.diff({'a': 1}, {'a': True})) == [(['a'], True)]
+        assert list(firebase_data.diff({'a': 1}, {'a': 1.0})) == []
+
+
+class TestFirebaseData_get_view:
+    @pytest.fixture
+    def data(self):
+        return firebase_data.FirebaseData({
+            'a': {'b': {'c': 1}, 'l': [{'x': 1}, 2]},
+            'd': 'leaf',
+        })
+
+    def test_read(self, data):
+        result = data.get_view('a')
+
+        assert isinstance(result, firebase_data.MappingView)
+        assert result['b']['c'] == 1
+        assert result['l'][0]['x'] == 1
+        assert result['l'][-1] == 2
+        assert list(result) == ['b', 'l']
+        assert len(result) == 2
+        assert 'b' in result
+
+    def test_leaf(self, data):
+        assert data.get_view('d') == 'leaf'
+        assert data.get_view('missing') is None
+
+    def test_nested_views(self, data):
+        result = data.get_view('a')
+
+        assert isinstance(result['b'], firebase_data.MappingView)
+        assert isinstance(result['l'], firebase_data.SequenceView)
+        assert isinstance(result['l'][0], firebase_data.MappingView)
+        assert isinstance(result['l'][:1], firebase_data.SequenceView)
+
+    def test_equality(self, data):
+        assert data.get_view('a') == data.get('a')
+        assert data.get_view('a/l') == [{'x': 1}, 2]
+
+    def test_read_only(self, data):
+        result = data.get_view('a')
+
+        with pytest.raises(TypeError):
+            result['b'] = 1
+        with pytest.raises(TypeError):
+            result['l'][0] = 1
+        with pytest.raises(AttributeError):
+            result.update({})
+
+    def test_no_copy(self, data):
+        result = data.get_view('a/b')
+        data.set('a/b/c', 2)
+
+        assert result['c'] == 2
+
+    def test_materialize(self, data):
+        result = data.get_view('a').materialize()
+        result['b']['c'] = 5
+
+        assert result == {'b': {'c': 5}, 'l': [{'x': 1}, 2]}
+        assert data.get('a/b/c') == 1
+        assert data.get_view('a/l').materialize() == [{'x': 1}, 2]
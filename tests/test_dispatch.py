@@ -0,0 +1,211 @@
+import threading
+
+import pytest
+
+from firebasedata import data, dispatch, live
+
+
+@pytest.fixture
+def signal():
+    return dispatch.Namespace().signal('path')
+
+
+@pytest.fixture
+def monotonic(mocker):
+    return mocker.patch('firebasedata.dispatch.time.monotonic', return_value=100.0)
+
+
+def make_receiver(calls, name):
+    def receiver(sender, **kwargs):
+        calls.append(name)
+    return receiver
+
+
+class Test_TokenBucket:
+    def test_burst(self, monotonic):
+        bucket = dispatch.TokenBucket(rate=2, burst=2)
+
+        assert bucket.take() == 0
+        assert bucket.take() == 0
+        assert bucket.take() == pytest.approx(.5)
+
+    def test_refill(self, monotonic):
+        bucket = dispatch.TokenBucket(rate=2)
+        bucket.take()
+
+        monotonic.return_value = 100.25
+        assert bucket.delay() == pytest.approx(.25)
+
+        monotonic.return_value = 110
+        assert bucket.take() == 0
+        assert bucket.delay() == pytest.approx(.5)
+
+    @pytest.mark.parametrize('rate, burst', [(0, 1), (1, 0)])
+    def test_invalid(self, rate, burst):
+        with pytest.raises(ValueError):
+            dispatch.TokenBucket(rate, burst)
+
+
+class Test_PrioritySignal:
+    def test_namespace(self):
+        namespace = dispatch.Namespace()
+
+        assert isinstance(namespace.signal('path'), dispatch.PrioritySignal)
+        assert namespace.signal('path') is namespace.signal('path')
+
+    def test_priority_order(self, signal):
+        calls = []
+        receivers = [
+            make_receiver(calls, 'low'),
+            make_receiver(calls, 'high'),
+            make_receiver(calls, 'default'),
+        ]
+        signal.connect(receivers[0], priority=-1)
+        signal.connect(receivers[1], priority=10)
+        signal.connect(receivers[2])
+
+        signal.send(None)
+
+        assert calls == ['high', 'default', 'low']
+
+    def test_bound_method_priority(self, signal):
+        calls = []
+
+        class Handler:
+            def receive(self, sender, **kwargs):
+                calls.append('method')
+
+        handler = Handler()
+        signal.connect(make_receiver(calls, 'default'), weak=False)
+        signal.connect(handler.receive, priority=10)
+
+        signal.send(None)
+
+        assert calls == ['method', 'default']
+        assert signal.priority_of(handler.receive) == 10
+
+        del handler
+        assert not signal.prioritized
+
+    def test_disconnect(self, signal):
+        calls = []
+        receiver = make_receiver(calls, 'high')
+        signal.connect(receiver, priority=10)
+        signal.disconnect(receiver)
+        signal.send(None)
+
+        assert calls == []
+        assert not signal.prioritized
+
+    def test_weak_receiver_collected(self, signal):
+        signal.connect(make_receiver([], 'high'), priority=10)
+
+        signal.send(None)
+
+        assert not signal.receivers
+        assert not signal.prioritized
+
+
+class Test_send:
+    def test_without_priorities(self, signal, mocker):
+        send = mocker.spy(signal, 'send')
+        receiver = mocker.Mock()
+        signal.connect(receiver, weak=False)
+
+        dispatch.send('sender', [(signal, {'value': 1})])
+
+        send.assert_called_once_with('sender', value=1)
+        receiver.assert_called_once_with('sender', value=1)
+
+    def test_across_signals(self):
+        namespace = dispatch.Namespace()
+        calls = []
+        receivers = [
+            make_receiver(calls, 'root'),
+            make_receiver(calls, 'child'),
+            make_receiver(calls, 'child_alert'),
+        ]
+        namespace.signal('.').connect(receivers[0])
+        namespace.signal('a').connect(receivers[1])
+        namespace.signal('a').connect(receivers[2], priority=1)
+
+        dispatch.send(None, [(namespace.signal('.'), {}), (namespace.signal('a'), {})])
+
+        assert calls == ['child_alert', 'root', 'child']
+
+
+class Test_Throttle:
+    def test_off_thread(self, signal):
+        delivered = threading.Event()
+        threads = []
+
+        def receiver(sender, **kwargs):
+            threads.append(threading.current_thread())
+            delivered.set()
+
+        signal.connect(receiver, rate=100)
+        signal.send(None, value=1)
+
+        assert delivered.wait(1)
+        assert threads != [threading.current_thread()]
+
+    def test_coalesced(self, signal):
+        values = []
+        done = threading.Event()
+
+        def receiver(sender, value=None):
+            values.append(value)
+            if value == 4:
+                done.set()
+
+        signal.connect(receiver, rate=20)
+        for value in range(5):
+            signal.send(None, value=value)
+
+        assert done.wait(1)
+        # The first send is delivered at once, and the rest only once more
+        assert values[-1] == 4
+        assert len(values) <= 2
+        throttle = signal.throttle(receiver)
+        assert throttle.delivered == len(values)
+        assert throttle.coalesced == 5 - len(values)
+
+    def test_receiver_error(self, signal):
+        failed = threading.Event()
+        done = threading.Event()
+
+        def receiver(sender, value=None):
+            if value == 1:
+                failed.set()
+                raise ValueError('Test error')
+            done.set()
+
+        signal.connect(receiver, rate=100)
+        signal.send(None, value=1)
+        assert failed.wait(1)
+        signal.send(None, value=2)
+
+        assert done.wait(1)
+
+    def test_disconnect(self, signal, mocker):
+        receiver = mocker.Mock()
+        signal.connect(receiver, rate=100)
+        signal.disconnect(receiver)
+
+        signal.send(None)
+
+        assert not signal.receivers
+        assert signal.throttle(receiver) is None
+
+
+def test_live_data_priority():
+    livedata = live.LiveData(None, '/')
+    livedata._cache = data.FirebaseData({})
+    calls = []
+    receivers = [make_receiver(calls, 'root'), make_receiver(calls, 'alert')]
+    livedata.signal('/').connect(receivers[0])
+    livedata.signal('/alarms/door').connect(receivers[1], priority=10)
+
+    livedata._put_handler('/alarms/door', 'open')
+
+    assert calls == ['alert', 'root']
@@ -190,8 +190,9 @@ def test_connection_recovery(livedata, mocker):
     watch_mock.assert_any_call(
         livedata.get_metawatcher_name(),
         callee.functions.Callable(),
-        livedata.get_data_silent,
-        interval=livedata._retry_interval
+        livedata.connect_silent,
+        interval=livedata._retry_interval,
+        backoff=callee.types.InstanceOf(live.watcher.Backoff)
     )
 
     livedata._db.child = mocker.Mock()
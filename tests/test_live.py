@@ -1,11 +1,13 @@
+import concurrent.futures
 import datetime
+import time
 
 import blinker.base
 import callee
 import pytest
 from urllib3.exceptions import HTTPError
 
-from firebasedata import data, live
+from firebasedata import budget, changes, data, live, watcher
 
 
 @pytest.fixture
@@ -42,6 +44,11 @@ class Test_init:
 
         assert livedata._ttl is ttl
 
+    def test_no_app(self):
+        livedata = live.LiveData(None, '/')
+
+        assert livedata._db is None
+
 
 class Test_get_data:
     def test_cold_cache(self, livedata, mocker):
@@ -106,63 +113,366 @@ class Test_set_data:
         child_mock.child.return_value.child.assert_called_with('bar')
         child_mock.child.return_value.child.return_value.set.assert_called_with(value)
 
+    def test_set_with_write_client(self, livedata, mocker):
+        livedata._write_client = mocker.Mock()
+        value = object()
+        livedata.set_data('/foo/bar', value)
 
-class Test_is_stale:
-    def test_missing_ttl(self, livedata):
-        livedata._ttl = None
+        livedata._write_client.set.assert_called_with('foo/bar', value)
+        assert not livedata._db.child.called
 
-        result = livedata.is_stale()
 
-        assert result is False
+class Test_set_data_async:
+    def test_uses_write_client(self, livedata, mocker):
+        livedata._write_client = mocker.Mock()
+        value = object()
 
-    def test_missing_data(self, livedata, mocker):
-        livedata.get_data = mocker.Mock(return_value=None)
+        result = livedata.set_data_async('/foo', value)
 
-        result = livedata.is_stale()
+        livedata._write_client.set_async.assert_called_with('foo', value)
+        assert result is livedata._write_client.set_async.return_value
+
+    def test_creates_write_client(self, livedata, mocker):
+        from_app = mocker.patch('firebasedata.writer.WriteClient.from_app')
+
+        livedata.set_data_async('/', 1)
+
+        from_app.assert_called_with(livedata._app)
+        from_app.return_value.set_async.assert_called_with('', 1)
+
+    def test_created_write_client_only_used_async(self, livedata, mocker):
+        from_app = mocker.patch('firebasedata.writer.WriteClient.from_app')
+        livedata.set_data_async('/foo', 1)
+        livedata.set_data_async('/foo', 2)
+
+        livedata.set_data('/foo', 3)
+
+        assert from_app.call_count == 1
+        assert livedata._write_client is None
+        livedata._db.child.return_value.child.return_value.set.assert_called_with(3)
+        assert not from_app.return_value.set.called
+
+
+@pytest.fixture
+def listening(livedata, mocker):
+    livedata._write_client = mocker.Mock()
+    livedata._cache = data.FirebaseData({
+        'config': {'mode': 'auto', 'limits': {'low': 1, 'high': 9}},
+    })
+    livedata._streams = {1: mocker.Mock()}
+    livedata._touch()
+    return livedata
+
+
+class Test_skip_unchanged:
+    @pytest.fixture
+    def livedata(self, livedata):
+        livedata._skip_unchanged = True
+        return livedata
+
+    def test_unchanged(self, listening):
+        result = listening.set_data('config', {
+            'mode': 'auto', 'limits': {'low': 1, 'high': 9}
+        })
+
+        assert result is False
+        assert not listening._write_client.set.called
+
+    def test_changed(self, listening):
+        result = listening.set_data('config/limits/high', 10)
 
         assert result is True
+        listening._write_client.set.assert_called_with('config/limits/high', 10)
+
+    def test_bool_is_not_number(self, listening):
+        assert listening.set_data('config/limits/low', True) is True
+
+    def test_stale(self, listening):
+        listening._stale_deadline = time.monotonic() - 1
+
+        assert listening.set_data('config/mode', 'auto') is True
+
+    def test_not_listening(self, listening):
+        listening._streams = {}
+
+        assert listening.set_data('config/mode', 'auto') is True
+
+    def test_async(self, listening):
+        future = listening.set_data_async('config/mode', 'auto')
+
+        assert future.done()
+        assert not listening._write_client.set_async.called
+
+    def test_disabled_by_default(self, listening):
+        listening._skip_unchanged = False
+
+        assert listening.set_data('config/mode', 'auto') is True
+
+    def test_writes_not_tracked_when_disabled(self, listening):
+        listening._skip_unchanged = False
+
+        listening.set_data('config/mode', 'manual')
+        listening.set_data_async('config/mode', 'manual')
+
+        assert not listening._pending_writes
+
+    def test_pending_write(self, listening):
+        assert listening.set_data('config/mode', 'manual') is True
+
+        # The stream has not echoed the first write yet
+        assert listening.set_data('config/mode', 'auto') is True
+
+    def test_echoed_write(self, listening):
+        listening.set_data('config/mode', 'manual')
+        listening._put_handler('/config/mode', 'manual')
+
+        assert listening.set_data('config/mode', 'manual') is False
+        assert not listening._pending_writes
+
+    def test_pending_related_writes(self, listening):
+        listening.set_data('config', {'mode': 'manual'})
+
+        assert listening.set_data('config/limits/low', 1) is True
+        assert listening.set_data('/', listening.get_data().get()) is True
+
+    def test_pending_unrelated_write(self, listening):
+        listening.set_data('other', 1)
+
+        assert listening.set_data('config/mode', 'auto') is False
+
+    def test_failed_write(self, listening):
+        listening._write_client.set.side_effect = ValueError('Test error')
+
+        with pytest.raises(ValueError):
+            listening.set_data('config/mode', 'manual')
+        listening._write_client.set.side_effect = None
+
+        assert listening.set_data('config/mode', 'auto') is False
+
+    def test_pending_write_expires(self, listening, mocker):
+        mocker.patch.object(live, 'PENDING_WRITE_TIMEOUT', 0)
+        listening.set_data('config/mode', 'manual')
+
+        assert listening.set_data('config/mode', 'auto') is False
+
+    def test_echo_below_write(self, listening):
+        listening.set_data('config', {'mode': 'manual'})
+        listening._put_handler('/config/mode', 'manual')
+
+        # Only changes at or above a write echo it
+        assert listening._has_pending_write('config')
+
+    def test_echo_above_write(self, listening):
+        listening.set_data('config/mode', 'manual')
+        listening._put_handler('/', {'config': {'mode': 'manual'}})
+
+        assert not listening._pending_writes
+
+    def test_echo_does_not_read_cache(self, listening, mocker):
+        listening.set_data('config/mode', 'manual')
+        mocker.spy(listening._cache, 'get')
+
+        listening._apply_change('config/mode', 'manual')
+
+        assert not listening._cache.get.called
+        assert not listening._pending_writes
+
+    def test_failed_async_write(self, listening):
+        future = concurrent.futures.Future()
+        listening._write_client.set_async.return_value = future
+        listening.set_data_async('config/mode', 'manual')
+
+        assert listening._has_pending_write('config/mode')
+        future.set_exception(ValueError('Test error'))
+
+        assert listening.set_data('config/mode', 'auto') is False
+
+
+class Test_set_data_diff:
+    def test_changed_leaves(self, listening):
+        result = listening.set_data_diff('config', {
+            'mode': 'manual', 'limits': {'low': 1, 'high': 9, 'max': 20}
+        })
+
+        assert result == {'mode': 'manual', 'limits/max': 20}
+        listening._write_client.update.assert_called_with('config', result)
+        assert not listening._write_client.set.called
+
+    def test_removed(self, listening):
+        result = listening.set_data_diff('config', {'mode': 'auto'})
+
+        assert result == {'limits': None}
+
+    def test_unchanged(self, listening):
+        result = listening.set_data_diff('config', {
+            'mode': 'auto', 'limits': {'low': 1, 'high': 9}
+        })
+
+        assert result == {}
+        assert not listening._write_client.update.called
+
+    def test_replaced(self, listening):
+        result = listening.set_data_diff('config/mode', {'name': 'auto'})
+
+        assert result is None
+        listening._write_client.set.assert_called_with('config/mode', {'name': 'auto'})
+
+    def test_without_cache(self, livedata, mocker):
+        livedata._write_client = mocker.Mock()
+
+        result = livedata.set_data_diff('config', {'mode': 'auto'})
+
+        assert result is None
+        livedata._write_client.set.assert_called_with('config', {'mode': 'auto'})
+
+    def test_pending_write(self, listening):
+        listening._skip_unchanged = True
+        listening.set_data('config/mode', 'manual')
+
+        result = listening.set_data_diff('config', {'mode': 'auto'})
+
+        assert result is None
+        listening._write_client.set.assert_called_with('config', {'mode': 'auto'})
 
-    def test_empty_data(self, livedata, mocker):
-        livedata.get_data = mocker.Mock(return_value=data.FirebaseData())
+    def test_pending_update(self, listening):
+        listening.set_data_diff('config', {'mode': 'manual', 'limits': {'low': 1}})
+        listening._put_handler('/config/mode', 'manual')
+
+        # The change to `limits` has not been echoed yet
+        assert listening.set_data_diff('config/limits', {'low': 2}) is None
+        result = listening.set_data_diff('config', {'mode': 'auto', 'limits': {'low': 1}})
+        assert result is None
+
+    def test_echoed_update(self, listening):
+        listening.set_data_diff('config', {'mode': 'manual', 'limits': {'low': 1}})
+        listening._patch_handler('/config', {'mode': 'manual', 'limits/high': None})
+
+        result = listening.set_data_diff('config', {'mode': 'auto', 'limits': {'low': 1}})
+
+        assert result == {'mode': 'auto'}
+
+    def test_pyrebase(self, listening):
+        listening._write_client = None
+
+        listening.set_data_diff('config', {'mode': 'manual'})
+
+        update = listening._db.child.return_value.child.return_value.update
+        update.assert_called_with({'mode': 'manual', 'limits': None})
+
+
+class Test_is_stale:
+    def test_missing_ttl(self, livedata):
+        livedata._ttl = None
 
         result = livedata.is_stale()
 
         assert result is False
 
-    def test_no_default_data(self, livedata, mocker):
-        livedata.get_data = mocker.Mock(return_value=data.FirebaseData(None))
+    def test_missing_data(self, livedata):
+        livedata._stale_deadline = time.monotonic() + 60
 
         result = livedata.is_stale()
 
-        assert result is False
+        assert result is True
 
-    def test_missing_data_last_updated_at(self, livedata, mocker):
-        livedata.get_data = mocker.Mock(**{'return_value.last_updated_at': None})
+    def test_missing_deadline(self, livedata):
+        livedata._cache = data.FirebaseData()
 
         result = livedata.is_stale()
 
         assert result is True
 
-    def test_expired_ttl(self, livedata, mocker):
-        last_updated_at = datetime.datetime.utcnow() - datetime.timedelta(hours=2)
-        livedata.get_data = mocker.Mock(**{
-            'return_value.last_updated_at': last_updated_at
-        })
+    def test_expired_deadline(self, livedata):
+        livedata._cache = data.FirebaseData()
+        livedata._stale_deadline = time.monotonic() - 1
 
         result = livedata.is_stale()
 
         assert result is True
 
-    def test_valid_ttl(self, livedata, mocker):
-        last_updated_at = datetime.datetime.utcnow() - datetime.timedelta(minutes=30)
-        livedata.get_data = mocker.Mock(**{
-            'return_value.last_updated_at': last_updated_at
-        })
+    def test_valid_deadline(self, livedata):
+        livedata._cache = data.FirebaseData()
+        livedata._stale_deadline = time.monotonic() + 60
 
         result = livedata.is_stale()
 
         assert result is False
 
+    def test_does_not_fetch_data(self, livedata, mocker):
+        livedata.get_data = mocker.Mock()
+
+        livedata.is_stale()
+
+        assert not livedata.get_data.called
+
+
+class Test_stale_deadline:
+    def test_fetch_sets_deadline(self, livedata, mocker):
+        livedata.listen = mocker.Mock()
+        livedata._db.child.return_value.get.return_value.val.return_value = {}
+
+        livedata.get_data()
+
+        assert livedata._stale_deadline == pytest.approx(
+            time.monotonic() + livedata._ttl.total_seconds(), abs=1
+        )
+
+    def test_message_pushes_deadline(self, livedata, mocker):
+        livedata._handlers['put'] = mocker.Mock()
+        livedata._stale_deadline = time.monotonic()
+
+        livedata._stream_handler({'event': 'put', 'path': '/', 'data': 'foo'})
+
+        assert livedata._stale_deadline > time.monotonic() + 60
+
+    def test_invalid_message_does_not_push_deadline(self, livedata):
+        deadline = livedata._stale_deadline = time.monotonic()
+
+        livedata._stream_handler({'event': 'post', 'path': '/', 'data': 'foo'})
+
+        assert livedata._stale_deadline == deadline
+
+    def test_no_ttl(self, livedata, mocker):
+        livedata._ttl = None
+        livedata._handlers['put'] = mocker.Mock()
+
+        livedata._stream_handler({'event': 'put', 'path': '/', 'data': 'foo'})
+
+        assert livedata._stale_deadline is None
+
+    def test_time_until_stale(self, livedata):
+        livedata._stale_deadline = time.monotonic() + 30
+
+        result = livedata._time_until_stale()
+
+        assert result.total_seconds() == pytest.approx(30, abs=1)
+
+    def test_time_until_stale_expired(self, livedata):
+        livedata._stale_deadline = time.monotonic() - 30
+
+        result = livedata._time_until_stale()
+
+        assert result == datetime.timedelta(0)
+
+    def test_time_until_stale_without_deadline(self, livedata):
+        result = livedata._time_until_stale()
+
+        assert result == livedata._ttl
+
+    def test_time_until_stale_without_ttl(self, livedata):
+        livedata._ttl = None
+
+        result = livedata._time_until_stale()
+
+        assert result == watcher.DEFAULT_INTERVAL
+
+    def test_get_data_without_ttl(self, mocker):
+        livedata = live.LiveData(mocker.Mock(), '/')
+        livedata._db.child.return_value.get.return_value.val.return_value = {'a': 1}
+
+        assert livedata.get_data().get('a') == 1
+        assert livedata.is_stale() is False
+
 
 class Test_signal:
     def test_signal_proxy(self, livedata, mocker):
@@ -217,16 +527,9 @@ class Test_listen:
             id(livedata),
             livedata.is_stale,
             livedata.restart,
-            interval=livedata._ttl
+            interval=livedata._time_until_stale
         )
 
-    def test_stream_gc_is_started(self, livedata, mocker):
-        livedata._start_stream_gc = mocker.Mock()
-
-        livedata.listen()
-
-        assert livedata._start_stream_gc.called
-
     def test_metawatcher_is_canceled(self, livedata, mocker):
         livedata.cancel_metawatcher = mocker.Mock()
 
@@ -290,10 +593,74 @@ class Test_metawatcher:
         watcher_mock.assert_called_with(
             livedata.get_metawatcher_name(),
             callee.functions.Callable(),
-            livedata.get_data_silent,
-            interval=callee.types.InstanceOf(datetime.timedelta)
+            livedata.connect_silent,
+            interval=callee.types.InstanceOf(datetime.timedelta),
+            backoff=callee.types.InstanceOf(watcher.Backoff)
         )
 
+    def test_default_backoff_is_fixed(self, livedata, mocker):
+        mocker.patch('firebasedata.live.watcher.watch')
+        livedata.start_metawatcher()
+
+        backoff = livedata._retry_backoff
+        intervals = [backoff.next_interval() for _ in range(3)]
+
+        assert intervals == [livedata._retry_interval] * 3
+
+    def test_custom_backoff(self, mocker):
+        watcher_mock = mocker.patch('firebasedata.live.watcher.watch')
+        backoff = watcher.Backoff(datetime.timedelta(seconds=1), jitter='full')
+        livedata = live.LiveData(mocker.Mock(), '/', retry_backoff=backoff)
+
+        livedata.start_metawatcher()
+
+        assert watcher_mock.call_args[1]['backoff'] is backoff
+
+    def test_retry_state(self, livedata, mocker):
+        assert livedata.retry_attempts == 0
+        assert livedata.next_retry_at is None
+
+        livedata._retry_backoff = watcher.Backoff(datetime.timedelta(seconds=1))
+        livedata._retry_backoff.next_interval()
+
+        assert livedata.retry_attempts == 1
+        assert livedata.next_retry_at is not None
+
+    def test_first_message_resets_backoff(self, livedata, mocker):
+        mocker.patch('firebasedata.live.watcher')
+        livedata._retry_backoff = mocker.Mock()
+
+        livedata.listen()
+        assert not livedata._retry_backoff.reset.called
+        livedata._stream_handler({'event': 'put', 'path': '/', 'data': {}})
+        livedata._stream_handler({'event': 'put', 'path': '/a', 'data': 1})
+
+        livedata._retry_backoff.reset.assert_called_once_with()
+
+    def test_connect_without_data(self, livedata, mocker):
+        livedata.get_data = mocker.Mock()
+
+        livedata.connect_silent()
+
+        assert livedata.get_data.called
+
+    def test_connect_keeps_data(self, livedata, mocker):
+        cache = livedata._cache = data.FirebaseData({'a': 1})
+        livedata.listen = mocker.Mock()
+
+        livedata.connect_silent()
+
+        assert livedata.listen.called
+        assert livedata._cache is cache
+
+    def test_connect_error(self, livedata, mocker, logger):
+        livedata._cache = data.FirebaseData({'a': 1})
+        livedata.listen = mocker.Mock(side_effect=HTTPError('Test error'))
+
+        livedata.connect_silent()
+
+        assert logger.exception.called
+
     def test_cancel_metawatcher(self, livedata, mocker):
         name = 'metawatcher'
         watcher_mock = mocker.patch('firebasedata.live.watcher.cancel')
@@ -311,16 +678,15 @@ class Test_hangup:
 
         watcher_mock.cancel.assert_called_with(id(livedata))
 
-    def test_no_streams_gc(self, livedata, mocker):
-        gc_streams = mocker.Mock()
-        livedata._gc_streams = gc_streams
-        livedata.hangup()
+    def test_no_streams(self, livedata, mocker):
+        close = mocker.patch('firebasedata.live.closer.close')
 
-        assert not gc_streams.put.called
+        assert livedata.hangup() == []
+        assert not close.called
 
-    def test_all_streams_gc(self, livedata, mocker):
-        gc_streams = mocker.Mock()
-        livedata._gc_streams = gc_streams
+    def test_all_streams_closed(self, livedata, mocker):
+        close = mocker.patch('firebasedata.live.closer.close')
+        wait = mocker.patch('firebasedata.live.closer.wait', return_value=[])
 
         stream1 = object()
         stream2 = object()
@@ -329,28 +695,32 @@ class Test_hangup:
             id(stream1): stream1,
             id(stream2): stream2,
         }
-        livedata.hangup()
+        result = livedata.hangup(timeout=3)
 
-        gc_streams.put.assert_has_calls([
+        close.assert_has_calls([
             mocker.call(stream1),
             mocker.call(stream2)
         ])
+        wait.assert_called_with([close.return_value, close.return_value], 3)
+        assert livedata._streams == {}
+        assert result == []
 
-    def test_queue_joined_with_block(self, livedata, mocker):
-        gc_streams = mocker.Mock()
-        livedata._gc_streams = gc_streams
-
-        livedata.hangup()
+    def test_not_blocking(self, livedata, mocker):
+        mocker.patch('firebasedata.live.closer.close')
+        wait = mocker.patch('firebasedata.live.closer.wait')
+        stream = object()
+        livedata._streams = {id(stream): stream}
 
-        assert gc_streams.join.called
+        assert livedata.hangup(block=False) is None
+        assert not wait.called
 
-    def test_queue_not_joined_without_block(self, livedata, mocker):
-        gc_streams = mocker.Mock()
-        livedata._gc_streams = gc_streams
-
-        livedata.hangup(block=False)
+    def test_reports_failed_streams(self, livedata, mocker, logger):
+        stream = mocker.Mock()
+        stream.close.side_effect = ValueError('Test error')
+        livedata._streams = {id(stream): stream}
 
-        assert not gc_streams.join.called
+        assert livedata.hangup() == [stream]
+        logger.warning.assert_called_with('Failed to close %s streams: %s', 1, [stream])
 
 
 class Test_set_path_value:
@@ -569,34 +939,466 @@ class Test_stream_handler:
         patch_handler.assert_called_with(message['path'], message['data'])
 
 
-class Test_stream_gc:
-    def test_close_normal_stream(self, livedata, mocker, logger):
-        stream = mocker.Mock()
+class Test_changes_since:
+    @pytest.fixture
+    def livedata(self):
+        livedata = live.LiveData(None, '/', history=10)
+        livedata._cache = data.FirebaseData({})
+        return livedata
+
+    def test_disabled(self, mocker):
+        livedata = live.LiveData(None, '/')
+
+        assert livedata.seq is None
+        with pytest.raises(ValueError):
+            livedata.changes_since(0)
+
+    def test_put_and_patch(self, livedata):
+        livedata._put_handler('/foo', {'bar': 1})
+        livedata._patch_handler('/foo', {'bar': None, 'baz': 2})
+
+        assert livedata.seq == 3
+        assert livedata.changes_since(0) == [
+            changes.Change(1, 'foo', {'bar': 1}),
+            changes.Change(2, 'foo/bar', None),
+            changes.Change(3, 'foo/baz', 2),
+        ]
+        assert livedata.changes_since(1, prefix='foo/baz') == [
+            changes.Change(3, 'foo/baz', 2),
+        ]
+
+    def test_seq_visible_to_receivers(self, livedata):
+        seen = []
+        livedata.signal('/foo').connect(
+            lambda sender, **kwargs: seen.append(livedata.seq),
+            weak=False
+        )
+
+        livedata._put_handler('/foo', 1)
+
+        assert seen == [1]
+
+    def test_evicted(self, livedata):
+        for i in range(11):
+            livedata._put_handler('/foo', i)
+
+        with pytest.raises(changes.HistoryEvicted):
+            livedata.changes_since(0)
+
+
+class Test_refresh:
+    @pytest.fixture
+    def livedata(self, mocker):
+        livedata = live.LiveData(mocker.Mock(), '/', history=100)
+        livedata._cache = data.FirebaseData({
+            'a': {'b': 1, 'c': 2},
+            'd': 'unchanged',
+        })
+        livedata._fetch_path = mocker.Mock()
+        return livedata
+
+    def test_without_data(self, livedata, mocker):
+        livedata._cache = None
+        livedata.get_data = mocker.Mock()
+
+        assert livedata.refresh('a') == []
+        assert livedata.get_data.called
+        assert not livedata._fetch_path.called
+
+    def test_applies_differences(self, livedata):
+        livedata._fetch_path.return_value = {'b': 1, 'x': 3}
+
+        result = livedata.refresh('/a/')
+
+        livedata._fetch_path.assert_called_with('a')
+        assert sorted(result) == ['a/c', 'a/x']
+        assert livedata.get_data().get() == {
+            'a': {'b': 1, 'x': 3},
+            'd': 'unchanged',
+        }
+
+    def test_signals_only_changes(self, livedata):
+        livedata._fetch_path.return_value = {'b': 5, 'c': 2}
+        received = []
+        for path in ('a/b', 'a/c'):
+            livedata.signal(path).connect(
+                lambda sender, path=None, **kwargs: received.append(path),
+                weak=False
+            )
+
+        livedata.refresh('a')
+
+        assert received == ['a/b']
+        assert [change.path for change in livedata.changes_since(0)] == ['a/b']
+
+    def test_no_changes(self, livedata):
+        livedata._fetch_path.return_value = {'b': 1, 'c': 2}
+
+        assert livedata.refresh('a') == []
+        assert livedata.seq == 0
+
+    def test_subtree_removed(self, livedata):
+        livedata._fetch_path.return_value = None
+
+        assert livedata.refresh('a') == ['a']
+        assert livedata.get_data().get('a') is None
+
+    def test_stream_change_during_fetch(self, livedata):
+        def fetch(path):
+            if livedata._fetch_path.call_count == 1:
+                # Arrives while the first fetch is in progress
+                livedata._put_handler('/a/b', 7)
+                return {'b': 1, 'c': 2}
+            return {'b': 7, 'c': 3}
+
+        livedata._fetch_path.side_effect = fetch
+
+        assert livedata.refresh('a') == ['a/c']
+        assert livedata._fetch_path.call_count == 2
+        assert livedata.get_data().get('a') == {'b': 7, 'c': 3}
+
+    def test_stream_keeps_changing(self, livedata):
+        def fetch(path):
+            livedata._put_handler('/a/b', livedata._fetch_path.call_count)
+            return {'b': 0}
+
+        livedata._fetch_path.side_effect = fetch
+
+        assert livedata.refresh('a') == []
+        assert livedata._fetch_path.call_count == live.MAX_REFRESH_ATTEMPTS
+        assert livedata.get_data().get('a/b') == live.MAX_REFRESH_ATTEMPTS
+
+    def test_unrelated_change_during_fetch(self, livedata):
+        def fetch(path):
+            livedata._put_handler('/d', 'changed')
+            return {'b': 1, 'c': 5}
+
+        livedata._fetch_path.side_effect = fetch
+
+        assert livedata.refresh('a') == ['a/c']
+        assert livedata._fetch_path.call_count == 1
+
+
+class Test_subtree_ttl:
+    def test_set_subtree_ttl(self, livedata, mocker):
+        watcher_mock = mocker.patch('firebasedata.live.watcher')
+        livedata._streams = {1: object()}
+
+        livedata.set_subtree_ttl('/a/', datetime.timedelta(seconds=30))
+
+        assert livedata._subtree_ttls == {'a': datetime.timedelta(seconds=30)}
+        assert livedata._time_until_subtree_stale('a').total_seconds() == (
+            pytest.approx(30, abs=1)
+        )
+        watcher_mock.watch.assert_called_with(
+            livedata._get_subtree_watcher_name('a'),
+            callee.Callable(),
+            callee.Callable(),
+            interval=callee.Callable()
+        )
+
+    def test_not_watched_before_listening(self, livedata, mocker):
+        watcher_mock = mocker.patch('firebasedata.live.watcher')
+
+        livedata.set_subtree_ttl('a', datetime.timedelta(seconds=30))
+
+        assert not watcher_mock.watch.called
+
+    def test_remove_subtree_ttl(self, livedata, mocker):
+        watcher_mock = mocker.patch('firebasedata.live.watcher')
+        livedata.set_subtree_ttl('a', datetime.timedelta(seconds=30))
+
+        livedata.set_subtree_ttl('a', None)
+
+        assert livedata._subtree_ttls == {}
+        watcher_mock.cancel.assert_called_with(livedata._get_subtree_watcher_name('a'))
+
+    def test_watched_while_listening(self, livedata, mocker):
+        watcher_mock = mocker.patch('firebasedata.live.watcher')
+        livedata.set_subtree_ttl('a', datetime.timedelta(seconds=30))
+
+        livedata.listen()
+        livedata.hangup(block=False)
+
+        name = livedata._get_subtree_watcher_name('a')
+        watcher_mock.watch.assert_any_call(
+            name, mocker.ANY, mocker.ANY, interval=mocker.ANY
+        )
+        watcher_mock.cancel.assert_any_call(name)
+
+    def test_changes_push_deadline(self, livedata):
+        livedata._cache = data.FirebaseData({})
+        livedata.set_subtree_ttl('a', datetime.timedelta(seconds=30))
+        livedata._subtree_deadlines['a'] = time.monotonic()
+
+        livedata._put_handler('/a/b', 1)
+
+        assert livedata._time_until_subtree_stale('a').total_seconds() > 20
+
+    def test_unrelated_changes_do_not_push_deadline(self, livedata):
+        livedata._cache = data.FirebaseData({})
+        livedata.set_subtree_ttl('a', datetime.timedelta(seconds=30))
+        livedata._subtree_deadlines['a'] = time.monotonic()
+
+        livedata._put_handler('/b', 1)
+
+        assert livedata._time_until_subtree_stale('a').total_seconds() == 0
+
+    def test_refreshed_when_stale(self, livedata, mocker):
+        livedata.refresh = mocker.Mock()
+        livedata._streams = {1: object()}
+        livedata.set_subtree_ttl('a', datetime.timedelta(seconds=.01))
+
+        for _ in range(100):
+            if livedata.refresh.called:
+                break
+            time.sleep(.01)
 
-        livedata._start_stream_gc()
-        livedata._streams[id(stream)] = stream
-        livedata._gc_streams.put(stream)
-        livedata._gc_streams.join()
+        livedata.refresh.assert_called_with('a')
 
-        assert stream.close.called
-        logger.debug.assert_any_call('Closing stream: %s', stream)
-        logger.debug.assert_any_call('Stream closed: %s', stream)
+    def test_failed_refresh_pushes_deadline(self, livedata, mocker):
+        mocker.patch('firebasedata.live.logger')
+        livedata._cache = data.FirebaseData({})
+        livedata._fetch_path = mocker.Mock(side_effect=Exception('Offline'))
+        livedata.set_subtree_ttl('a', datetime.timedelta(seconds=.01))
 
-    def test_close_orphan_stream(self, livedata, mocker, logger):
+        livedata._refresh_silent('a')
+
+        assert livedata._time_until_subtree_stale('a').total_seconds() == (
+            pytest.approx(live.RETRY_INTERVAL.total_seconds(), abs=1)
+        )
+
+    def test_failing_refresh_is_not_retried_immediately(self, livedata, mocker):
+        mocker.patch('firebasedata.live.logger')
+        livedata._cache = data.FirebaseData({})
+        livedata._retry_interval = datetime.timedelta(seconds=.1)
+        livedata._fetch_path = mocker.Mock(side_effect=Exception('Offline'))
+        livedata._streams = {1: object()}
+        livedata.set_subtree_ttl('a', datetime.timedelta(seconds=.01))
+
+        time.sleep(.25)
+        livedata.set_subtree_ttl('a', None)
+
+        assert 1 <= livedata._fetch_path.call_count <= 3
+
+
+class Test_memory_budget:
+    def test_unbounded(self, livedata):
+        livedata._db.child.return_value.get.return_value.val.return_value = {'a': 1}
+
+        assert type(livedata.get_data()) is data.FirebaseData
+        assert livedata.cache_stats() is None
+
+    def test_bounded(self, mocker):
+        app = mocker.Mock()
+        livedata = live.LiveData(app, '/root', memory_budget=10 ** 6)
+        db = app.database.return_value
+        db.child.return_value.get.return_value.val.return_value = {'a': {'b': 1}}
+
+        cache = livedata.get_data()
+
+        assert isinstance(cache, budget.BoundedData)
+        assert livedata.cache_stats() == {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'dropped_updates': 0,
+            'size': cache.size,
+            'budget': 10 ** 6,
+        }
+
+    def test_root_signal_without_placeholders(self, mocker):
+        app = mocker.Mock()
+        livedata = live.LiveData(app, '/root', memory_budget=1, eviction_depth=1)
+        db = app.database.return_value
+        db.child.return_value.get.return_value.val.return_value = {'a': {'b': 1}}
+        server = {'a': {'b': 1}, 'c': 2}
+        livedata._fetch_path = mocker.Mock(side_effect=server.get)
+        handler = mocker.Mock()
+        livedata.signal('/').connect(handler, weak=False)
+
+        livedata._put_handler('/c', 2)
+
+        assert handler.call_args[1]['value'] == {'a': {'b': 1}, 'c': 2}
+
+    def test_root_signal_does_not_fetch(self, mocker):
+        app = mocker.Mock()
+        server = {'u{}'.format(i): {'x': 'x' * 1000} for i in range(50)}
+        livedata = live.LiveData(
+            app,
+            '/root',
+            memory_budget=budget.estimate_size(server['u0']) * 5.5
+        )
+        db = app.database.return_value
+        db.child.return_value.get.return_value.val.return_value = dict(server)
+        livedata._fetch_path = mocker.Mock(side_effect=server.get)
+        livedata.get_data()
+        assert livedata.cache_stats()['evictions'] == 45
+        handler = mocker.Mock()
+        livedata.signal('/').connect(handler, weak=False)
+
+        livedata._put_handler('/u49/x', 'y')
+        livedata._put_handler('/u0/x', 'y')
+
+        assert handler.call_count == 2
+        assert not livedata._fetch_path.called
+
+    def test_fetch_path(self, livedata):
+        livedata._fetch_path('foo/bar')
+
+        child = livedata._db.child
+        child.assert_called_with(livedata._root_path)
+        child.return_value.child.assert_called_with('foo')
+        child.return_value.child.return_value.child.assert_called_with('bar')
+        assert child.return_value.child.return_value.child.return_value.get.called
+
+    def test_signal_values_only_read_when_received(self, livedata, mocker):
+        livedata.get_data = mocker.Mock()
+        livedata._recurse_signal('/foo/bar')
+
+        assert not livedata.get_data.return_value.get.called
+
+        livedata.signal('/foo').connect(mocker.Mock(), weak=False)
+        livedata._recurse_signal('/foo/bar')
+
+        livedata.get_data.return_value.get.assert_called_once_with('/foo')
+
+
+class Test_recording:
+    def test_stream_handler_records(self, livedata, mocker):
+        rec = mocker.Mock()
+        livedata._handlers['put'] = mocker.Mock()
+        message = {
+            'event': 'put',
+            'path': '/',
+            'data': 'foo',
+        }
+
+        livedata.start_recording(rec)
+        livedata._stream_handler(message)
+
+        rec.record.assert_called_with(message)
+
+    def test_invalid_messages_are_recorded(self, livedata, mocker):
+        rec = mocker.Mock()
+        message = {'event': 'keep-alive', 'data': None}
+
+        livedata.start_recording(rec)
+        livedata._stream_handler(message)
+
+        rec.record.assert_called_with(message)
+
+    def test_recorder_error(self, livedata, logger, mocker):
+        rec = mocker.Mock(**{'record.side_effect': OSError('Disk full')})
+        put_handler = mocker.Mock()
+        livedata._handlers['put'] = put_handler
+
+        livedata.start_recording(rec)
+        livedata._stream_handler({'event': 'put', 'path': '/', 'data': 'foo'})
+
+        assert logger.exception.called
+        assert put_handler.called
+
+    def test_stop_recording(self, livedata, mocker):
+        rec = mocker.Mock()
+        livedata.start_recording(rec)
+
+        assert livedata.stop_recording() is rec
+
+        livedata._handlers['put'] = mocker.Mock()
+        livedata._stream_handler({'event': 'put', 'path': '/', 'data': 'foo'})
+        assert not rec.record.called
+
+
+class Test_control_events:
+    @pytest.mark.parametrize('event', ['keep-alive', 'cancel', 'auth_revoked'])
+    def test_valid_without_path(self, livedata, event):
+        result = livedata._valid_message({'event': event, 'data': None})
+
+        assert result is True
+
+    def test_keep_alive_pushes_deadline(self, livedata):
+        livedata._stale_deadline = time.monotonic()
+
+        livedata._stream_handler({'event': 'keep-alive', 'data': None})
+
+        assert livedata._stale_deadline > time.monotonic() + 60
+
+    def test_keep_alive_health(self, livedata):
+        livedata._health = live.StreamHealth()
+
+        livedata._stream_handler({'event': 'keep-alive', 'data': None})
+
+        assert livedata._health.keep_alives == 1
+        assert livedata._health.last_keep_alive_at is not None
+        assert livedata._health.state == 'connecting'
+
+    @pytest.mark.parametrize('event', ['cancel', 'auth_revoked'])
+    def test_revoked_reconnects(self, livedata, mocker, event):
+        livedata.reconnect = mocker.Mock()
+        livedata._health = live.StreamHealth()
+
+        livedata._stream_handler({'event': event, 'data': 'permission denied'})
+
+        assert livedata.reconnect.called
+        assert livedata._health.state == event
+        assert livedata._health.error == 'permission denied'
+
+    def test_reconnect_keeps_cache(self, livedata, mocker):
+        watcher_mock = mocker.patch('firebasedata.live.watcher')
+        close = mocker.patch('firebasedata.live.closer.close')
+        cache = livedata._cache = data.FirebaseData({'a': 1})
         stream = mocker.Mock()
+        livedata._streams = {id(stream): stream}
+
+        livedata.reconnect()
+
+        close.assert_called_with(stream)
+        assert livedata._cache is cache
+        assert not livedata._db.child.return_value.get.called
+        assert watcher_mock.watch.call_args[0][0] == livedata.get_metawatcher_name()
+        assert watcher_mock.watch.call_args[1]['backoff'] is livedata._retry_backoff
 
-        livedata._start_stream_gc()
-        livedata._gc_streams.put(stream)
-        livedata._gc_streams.join()
+    def test_revoked_does_not_push_deadline(self, livedata, mocker):
+        livedata.reconnect = mocker.Mock()
+        deadline = livedata._stale_deadline = time.monotonic()
 
-        assert stream.close.called
-        logger.debug.assert_any_call('Closing stream: %s', stream)
-        logger.warning.assert_any_call('Error closing stream %s: %s', stream, mocker.ANY)
+        livedata._stream_handler({'event': 'cancel', 'data': None})
+
+        assert livedata._stale_deadline == deadline
+
+
+class Test_stream_health:
+    def test_not_listening(self, livedata):
+        assert livedata.stream_health() is None
+
+    def test_connecting(self, livedata):
+        livedata.listen()
 
-    def test_start_stream_gc_idempotent(self, livedata, mocker, logger):
-        thread = mocker.Mock()
+        assert livedata.stream_health()['state'] == 'connecting'
 
-        livedata._gc_thread = thread
-        livedata._start_stream_gc()
+    def test_live(self, livedata, mocker):
+        livedata.listen()
+        livedata._handlers['put'] = mocker.Mock()
+        livedata._cache = data.FirebaseData()
+
+        livedata._stream_handler({'event': 'put', 'path': '/', 'data': 'foo'})
+        health = livedata.stream_health()
+
+        assert health['state'] == 'live'
+        assert health['messages'] == 1
+        assert health['last_message_at'] is not None
+
+    def test_stale(self, livedata, mocker):
+        livedata.listen()
+        livedata._health.state = 'live'
+        livedata._cache = data.FirebaseData()
+        livedata._stale_deadline = time.monotonic() - 1
+
+        assert livedata.stream_health()['state'] == 'stale'
+
+    def test_closed(self, livedata):
+        livedata.listen()
+        livedata.hangup(block=False)
 
-        assert livedata._gc_thread is thread
+        assert livedata.stream_health()['state'] == 'closed'
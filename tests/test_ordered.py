@@ -0,0 +1,136 @@
+import datetime
+import json
+
+import pytest
+
+from firebasedata import data, live, ordered
+
+T0 = datetime.datetime(2024, 5, 1, 12, 0, tzinfo=datetime.timezone.utc)
+
+
+def push_id(time, suffix='abcdefghijkl'):
+    return ordered.push_id_bound(time)[:8] + suffix
+
+
+@pytest.fixture
+def children():
+    return ordered.SortedChildren({
+        'c': 3, 'a': 1, 'e': 5, 'b': 2, 'd': 4,
+    })
+
+
+def test_sorted(children):
+    assert list(children) == ['a', 'b', 'c', 'd', 'e']
+    assert children == {'a': 1, 'b': 2, 'c': 3, 'd': 4, 'e': 5}
+
+
+def test_insert_and_delete(children):
+    children['f'] = 6
+    children['bb'] = 2.5
+    children['c'] = 30
+    del children['d']
+
+    assert children.items() == [
+        ('a', 1), ('b', 2), ('bb', 2.5), ('c', 30), ('e', 5), ('f', 6)
+    ]
+    with pytest.raises(KeyError):
+        del children['d']
+    with pytest.raises(KeyError):
+        children['d']
+
+
+def test_first_last(children):
+    assert children.first() == [('a', 1)]
+    assert children.first(2) == [('a', 1), ('b', 2)]
+    assert children.last(2) == [('d', 4), ('e', 5)]
+    assert children.last(10) == children.items()
+    assert children.last(0) == []
+
+
+@pytest.mark.parametrize('start, end, expected', [
+    ('b', 'd', ['b', 'c', 'd']),
+    ('bb', None, ['c', 'd', 'e']),
+    (None, 'b', ['a', 'b']),
+    ('x', None, []),
+])
+def test_range(children, start, end, expected):
+    assert [key for key, value in children.range(start, end)] == expected
+
+
+def test_after(children):
+    assert children.after('b') == [('c', 3), ('d', 4), ('e', 5)]
+    assert children.after('b', 1) == [('c', 3)]
+    assert children.after('e') == []
+
+
+def test_push_id_time():
+    time = T0 + datetime.timedelta(milliseconds=123)
+
+    assert ordered.push_id_time(push_id(time)) == time
+
+
+@pytest.mark.parametrize('value', ['short', '!' * 20])
+def test_push_id_time_invalid(value):
+    with pytest.raises(ValueError):
+        ordered.push_id_time(value)
+
+
+def test_push_ids_sort_by_time():
+    times = [T0 + datetime.timedelta(seconds=seconds) for seconds in (0, 1, 64, 4096)]
+    push_ids = [push_id(time) for time in times]
+
+    assert sorted(push_ids) == push_ids
+
+
+def test_time_range():
+    first = push_id(T0)
+    second = push_id(T0 + datetime.timedelta(minutes=1))
+    third = push_id(T0 + datetime.timedelta(minutes=2))
+    children = ordered.SortedChildren({third: 3, first: 1, second: 2})
+
+    result = children.time_range(
+        T0 + datetime.timedelta(seconds=1),
+        T0 + datetime.timedelta(minutes=2)
+    )
+
+    assert result == [(second, 2), (third, 3)]
+
+
+class Test_FirebaseData:
+    @pytest.fixture
+    def fb(self):
+        fb = data.FirebaseData({
+            'chats': {'general': {'messages': {'b': {'text': 'B'}, 'a': {'text': 'A'}}}},
+        })
+        fb.register_schema(ordered.SortedSchema('chats/*/messages'))
+        return fb
+
+    def test_converted(self, fb):
+        messages = fb.get('chats/general/messages')
+
+        assert isinstance(messages, ordered.SortedChildren)
+        assert messages.first() == [('a', {'text': 'A'})]
+
+    def test_push(self, fb):
+        fb.set('chats/general/messages/c', {'text': 'C'})
+        fb.set('chats/general/messages/a/text', 'AA')
+
+        assert fb.get('chats/general/messages').last(2) == [
+            ('b', {'text': 'B'}), ('c', {'text': 'C'})
+        ]
+        assert fb.get('chats/general/messages/a/text') == 'AA'
+
+    def test_get_json(self, fb):
+        assert json.loads(fb.get_json('chats/general/messages')) == {
+            'a': {'text': 'A'}, 'b': {'text': 'B'}
+        }
+
+
+def test_live_data_push():
+    livedata = live.LiveData(None, '/')
+    livedata.register_schema(ordered.SortedSchema('messages'))
+    livedata._cache = livedata._make_cache({'messages': {'b': 2}})
+
+    livedata._put_handler('/messages/a', 1)
+
+    assert livedata.get_data().get('messages').first() == [('a', 1)]
@@ -0,0 +1,128 @@
+import json
+
+import pytest
+
+from firebasedata import data, live, recorder
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    return str(tmp_path / 'events.log')
+
+
+@pytest.fixture
+def livedata(mocker):
+    live_data = live.LiveData(mocker.Mock(), '/')
+    live_data._cache = data.FirebaseData({})
+    return live_data
+
+
+def write_log(path, entries):
+    with recorder.Recorder(path) as rec:
+        for timestamp, message in entries:
+            rec.record(message, timestamp=timestamp)
+
+
+class Test_Recorder:
+    def test_record(self, log_path):
+        message = {'event': 'put', 'path': '/foo', 'data': {'bar': 1}}
+
+        with recorder.Recorder(log_path) as rec:
+            rec.record(message, timestamp=12.5)
+
+        with open(log_path) as f:
+            lines = f.read().splitlines()
+
+        assert rec.count == 1
+        assert lines == ['[12.5,"put","/foo",{"bar":1}]']
+
+    def test_append_only(self, log_path):
+        message = {'event': 'put', 'path': '/', 'data': 1}
+        write_log(log_path, [(1, message)])
+        write_log(log_path, [(2, message)])
+
+        with open(log_path) as f:
+            assert [json.loads(line)[0] for line in f] == [1, 2]
+
+    def test_read_log(self, log_path):
+        message = {'event': 'patch', 'path': '/foo', 'data': {'bar': None}}
+        write_log(log_path, [(1.5, message)])
+
+        assert list(recorder.read_log(log_path)) == [(1.5, message)]
+
+    def test_read_log_skips_malformed_lines(self, log_path):
+        with open(log_path, 'w') as f:
+            f.write('not json\n\n[1,"put","/",2]\n')
+
+        assert list(recorder.read_log(log_path)) == [
+            (1, {'event': 'put', 'path': '/', 'data': 2}),
+        ]
+
+
+class Test_replay:
+    def test_as_fast_as_possible(self, livedata, log_path, mocker):
+        sleep = mocker.patch('firebasedata.recorder.time.sleep')
+        write_log(log_path, [
+            (100, {'event': 'put', 'path': '/', 'data': {'foo': 'bar'}}),
+            (200, {'event': 'patch', 'path': '/', 'data': {'baz': 1}}),
+        ])
+
+        stats = recorder.replay(livedata, log_path, speed=None)
+
+        assert not sleep.called
+        assert livedata.get_data() == {'foo': 'bar', 'baz': 1}
+        assert stats.messages == 2
+        assert stats.throughput > 0
+        summary = stats.summary()
+        assert summary['stages']['apply']['count'] == 2
+        assert summary['stages']['signal']['count'] == 2
+
+    def test_scaled_speed(self, livedata, log_path, mocker):
+        sleep = mocker.patch('firebasedata.recorder.time.sleep')
+        write_log(log_path, [
+            (100, {'event': 'put', 'path': '/foo', 'data': 1}),
+            (110, {'event': 'put', 'path': '/foo', 'data': 2}),
+        ])
+
+        recorder.replay(livedata, log_path, speed=10)
+
+        assert sleep.call_count == 1
+        assert sleep.call_args[0][0] == pytest.approx(1, abs=.1)
+
+    def test_seeds_empty_cache(self, livedata, log_path):
+        livedata._cache = None
+        write_log(log_path, [(1, {'event': 'put', 'path': '/foo', 'data': 1})])
+
+        recorder.replay(livedata, log_path, speed=None)
+
+        assert livedata._cache == {'foo': 1}
+        assert not livedata._db.child.called
+
+    def test_signals_are_sent(self, livedata, log_path, mocker):
+        mock_handler = mocker.Mock()
+
+        def handler(*args, **kwargs):
+            mock_handler(*args, **kwargs)
+
+        livedata.signal('/foo').connect(handler)
+        write_log(log_path, [(1, {'event': 'put', 'path': '/foo', 'data': 1})])
+
+        recorder.replay(livedata, log_path, speed=None)
+
+        mock_handler.assert_called_with(livedata._cache, value=1, path='/foo')
+        assert '_recurse_signal' not in vars(livedata)
+
+    @pytest.mark.parametrize('event', ['cancel', 'auth_revoked'])
+    def test_revoked_does_not_reconnect(self, livedata, log_path, mocker, event):
+        watch = mocker.patch('firebasedata.live.watcher.watch')
+        write_log(log_path, [
+            (1, {'event': 'put', 'path': '/foo', 'data': 1}),
+            (2, {'event': event, 'data': 'permission denied'}),
+        ])
+
+        recorder.replay(livedata, log_path, speed=None)
+
+        assert not livedata._db.child.called
+        assert not watch.called
+        assert livedata._cache == {'foo': 1}
+        assert 'reconnect' not in vars(livedata)
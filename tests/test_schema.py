@@ -0,0 +1,190 @@
+import copy
+import io
+import json
+import sys
+
+import pytest
+
+from firebasedata import binary, budget, data, live, schema
+
+
+@pytest.fixture
+def devices():
+    return schema.Schema('devices/*', ['name', 'battery'])
+
+
+@pytest.fixture
+def fb(devices):
+    fb = data.FirebaseData({
+        'devices': {
+            'a': {'name': 'A', 'battery': 10},
+            'b': {'name': 'B', 'battery': 90, 'color': 'red'},
+        },
+        'other': {'name': 'O'},
+    })
+    fb.register_schema(devices)
+    return fb
+
+
+def test_record_class(devices):
+    assert devices.record_class.__name__ == 'DevicesRecord'
+    assert devices.fields == ('name', 'battery')
+    assert issubclass(devices.record_class, schema.Record)
+
+
+def test_record_smaller_than_dict(devices):
+    value = {'name': 'A', 'battery': 10}
+
+    assert sys.getsizeof(devices.record_class(value)) < sys.getsizeof(value)
+
+
+@pytest.mark.parametrize('fields', [
+    ['not valid'], ['_private'], ['items'], ['class'], ['name', 'name'],
+])
+def test_invalid_fields(fields):
+    with pytest.raises(ValueError):
+        schema.Schema('devices/*', fields)
+
+
+def test_root_pattern():
+    with pytest.raises(ValueError):
+        schema.Schema('/', ['name'])
+
+
+@pytest.mark.parametrize('path_list, expected', [
+    (['devices', 'a'], True),
+    (['devices'], False),
+    (['devices', 'a', 'name'], False),
+    (['other', 'a'], False),
+])
+def test_matches(devices, path_list, expected):
+    assert devices.matches(path_list) is expected
+
+
+def test_existing_data_converted(fb, devices):
+    record = fb.get('devices/a')
+
+    assert isinstance(record, devices.record_class)
+    assert record.battery == 10
+    assert record == {'name': 'A', 'battery': 10}
+    assert not isinstance(fb.get('other'), schema.Record)
+
+
+def test_extra_keys(fb):
+    record = fb.get('devices/b')
+
+    assert record['color'] == 'red'
+    assert dict(record) == {'name': 'B', 'battery': 90, 'color': 'red'}
+    assert len(record) == 3
+
+
+def test_get_field(fb):
+    assert fb.get('devices/a/name') == 'A'
+    assert fb.get('devices/a/missing') is None
+
+
+def test_set_field(fb):
+    record = fb.get('devices/a')
+    fb.set('devices/a/battery', 5)
+
+    assert fb.get('devices/a') is record
+    assert record.battery == 5
+
+
+def test_delete_field(fb):
+    fb.set('devices/a/battery', None)
+
+    assert fb.get('devices/a') == {'name': 'A'}
+    assert 'battery' not in fb.get('devices/a')
+
+
+def test_set_nested_field(fb):
+    fb.set('devices/a/location/lat', 1.5)
+
+    assert fb.get('devices/a/location') == {'lat': 1.5}
+
+
+def test_new_child_converted(fb, devices):
+    fb.set('devices/c', {'name': 'C'})
+
+    assert isinstance(fb.get('devices/c'), devices.record_class)
+
+
+def test_new_child_by_field_converted(fb, devices):
+    fb.set('devices/d/name', 'D')
+
+    assert isinstance(fb.get('devices/d'), devices.record_class)
+    assert fb.get('devices/d') == {'name': 'D'}
+
+
+def test_ancestor_replaced(fb, devices):
+    fb.set('devices', {'e': {'battery': 1}})
+
+    assert isinstance(fb.get('devices/e'), devices.record_class)
+
+
+def test_root_replaced(fb, devices):
+    fb.set('/', {'devices': {'f': {'battery': 1}}})
+
+    assert isinstance(fb.get('devices/f'), devices.record_class)
+
+
+def test_nested_schemas(fb, devices):
+    readings = schema.Schema('devices/*/readings/*', ['value'])
+    fb.register_schema(readings)
+    fb.set('devices/a/readings', {'r1': {'value': 1}})
+
+    assert isinstance(fb.get('devices/a'), devices.record_class)
+    assert isinstance(fb.get('devices/a/readings/r1'), readings.record_class)
+
+
+def test_get_json(fb):
+    assert json.loads(fb.get_json('devices')) == {
+        'a': {'name': 'A', 'battery': 10},
+        'b': {'name': 'B', 'battery': 90, 'color': 'red'},
+    }
+    fb.set('devices/a/battery', 5)
+
+    assert json.loads(fb.get_json('devices/a')) == {'name': 'A', 'battery': 5}
+
+
+def test_binary(fb):
+    result = binary.load(io.BytesIO(binary.dumps(fb)))
+
+    assert result.get('devices/b') == {'name': 'B', 'battery': 90, 'color': 'red'}
+
+
+def test_diff(fb):
+    new = {'name': 'A', 'battery': 20}
+
+    assert list(data.diff(fb.get('devices/a'), new)) == [(['battery'], 20)]
+
+
+def test_deepcopy(fb):
+    record = fb.get('devices/b')
+    result = copy.deepcopy(record)
+    result['battery'] = 1
+
+    assert result == {'name': 'B', 'battery': 1, 'color': 'red'}
+    assert record.battery == 90
+
+
+def test_bounded_data(devices):
+    fb = budget.BoundedData(
+        {'devices': {'a': {'name': 'A'}}},
+        budget=10 ** 6,
+        loader=None
+    )
+    fb.register_schema(devices)
+
+    assert isinstance(fb.get('devices/a'), devices.record_class)
+
+
+def test_live_data(devices):
+    livedata = live.LiveData(None, '/')
+    livedata.register_schema(devices)
+    livedata._cache = livedata._make_cache({'devices': {'a': {'name': 'A'}}})
+    livedata._put_handler('/devices/b', {'name': 'B'})
+
+    assert isinstance(livedata.get_data().get('devices/a'), devices.record_class)
+    assert isinstance(livedata.get_data().get('devices/b'), devices.record_class)
@@ -0,0 +1,168 @@
+import array
+import json
+
+import pytest
+
+from firebasedata import data, live, series
+
+
+@pytest.fixture
+def points():
+    return series.Series('d', {'-c': 3.0, '-a': 1.0, '-b': 2.5})
+
+
+def test_sorted(points):
+    assert list(points) == ['-a', '-b', '-c']
+    assert points == {'-a': 1.0, '-b': 2.5, '-c': 3.0}
+    assert len(points) == 3
+
+
+def test_append(points):
+    points['-d'] = 4
+
+    assert list(points) == ['-a', '-b', '-c', '-d']
+    assert points['-d'] == 4.0
+
+
+def test_insert(points):
+    points['-bb'] = 2.75
+
+    assert list(points) == ['-a', '-b', '-bb', '-c']
+
+
+def test_replace(points):
+    points['-b'] = 5
+
+    assert points['-b'] == 5.0
+    assert len(points) == 3
+
+
+def test_delete(points):
+    del points['-b']
+
+    assert list(points) == ['-a', '-c']
+    with pytest.raises(KeyError):
+        del points['-b']
+
+
+def test_missing(points):
+    with pytest.raises(KeyError):
+        points['-z']
+    assert '-z' not in points
+
+
+@pytest.mark.parametrize('value', [{'nested': 1}, 'text', True])
+def test_other_values(points, value):
+    points['-b'] = value
+
+    assert points['-b'] == value
+    assert len(points) == 3
+    assert points.sum() == 4.0
+
+    points['-b'] = 2
+    assert points['-b'] == 2.0
+    assert points.sum() == 6.0
+
+
+def test_integer_typecode():
+    points = series.Series('q', {'-a': 1, '-b': 2.5, '-c': 2 ** 70})
+
+    assert points.to_array() == array.array('q', [1])
+    assert points['-b'] == 2.5
+    assert points['-c'] == 2 ** 70
+    assert isinstance(points.sum(), int)
+
+
+def test_integers_preserved():
+    fb = data.FirebaseData({'counts': {'visits': {'-a': 5, '-b': 7}}})
+    fb.register_schema(series.SeriesSchema('counts/*', 'q'))
+
+    assert fb.get('counts/visits/-a') == 5
+    assert isinstance(fb.get('counts/visits/-a'), int)
+    assert fb.get_json('counts') == b'{"visits":{"-a":5,"-b":7}}'
+
+
+def test_typecode_required():
+    with pytest.raises(TypeError):
+        series.SeriesSchema('metrics/*')
+
+
+@pytest.mark.parametrize('start, end, expected', [
+    (None, None, [1.0, 2.5, 3.0]),
+    ('-b', None, [2.5, 3.0]),
+    (None, '-b', [1.0, 2.5]),
+    ('-aa', '-bb', [2.5]),
+    ('-x', None, []),
+])
+def test_to_array(points, start, end, expected):
+    assert points.to_array(start, end).tolist() == expected
+
+
+def test_slice(points):
+    result = points.slice('-b')
+
+    assert isinstance(result, series.Series)
+    assert result == {'-b': 2.5, '-c': 3.0}
+    result['-b'] = 0
+    assert points['-b'] == 2.5
+
+
+def test_aggregates(points):
+    assert points.sum() == 6.5
+    assert points.sum('-b', '-c') == 5.5
+    assert points.min() == 1.0
+    assert points.max('-a', '-b') == 2.5
+    assert points.min('-x') is None
+    assert points.max('-x') is None
+
+
+def test_invalid_typecode():
+    with pytest.raises(ValueError):
+        series.SeriesSchema('metrics/*', 'z')
+
+
+class Test_FirebaseData:
+    @pytest.fixture
+    def fb(self):
+        fb = data.FirebaseData({
+            'metrics': {
+                'cpu': {'-a': 0.5, '-b': 0.75},
+            },
+        })
+        fb.register_schema(series.SeriesSchema('metrics/*', 'd'))
+        return fb
+
+    def test_converted(self, fb):
+        assert isinstance(fb.get('metrics/cpu'), series.Series)
+        assert fb.get('metrics/cpu/-b') == 0.75
+
+    def test_push(self, fb):
+        points = fb.get('metrics/cpu')
+        fb.set('metrics/cpu/-c', 1)
+
+        assert fb.get('metrics/cpu') is points
+        assert points.to_array().tolist() == [0.5, 0.75, 1.0]
+
+    def test_new_series(self, fb):
+        fb.set('metrics/memory/-a', 10)
+
+        assert isinstance(fb.get('metrics/memory'), series.Series)
+        assert fb.get('metrics/memory').sum() == 10
+
+    def test_remove_point(self, fb):
+        fb.set('metrics/cpu/-a', None)
+
+        assert fb.get('metrics/cpu') == {'-b': 0.75}
+
+    def test_get_json(self, fb):
+        assert json.loads(fb.get_json('metrics')) == {'cpu': {'-a': 0.5, '-b': 0.75}}
+
+
+def test_live_data_push():
+    livedata = live.LiveData(None, '/')
+    livedata.register_schema(series.SeriesSchema('metrics/*', 'd'))
+    livedata._cache = livedata._make_cache({'metrics': {'cpu': {'-a': 0.5}}})
+
+    livedata._put_handler('/metrics/cpu/-b', 0.25)
+
+    assert livedata.get_data().get('metrics/cpu').sum() == 0.75
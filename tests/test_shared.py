@@ -0,0 +1,382 @@
+import time
+
+import pytest
+
+from firebasedata import binary, data, live, schema, shared
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / 'cache.bin')
+
+
+@pytest.fixture
+def livedata(mocker):
+    live_data = live.LiveData(mocker.Mock(), '/')
+    live_data._cache = data.FirebaseData({'foo': {'bar': 1}})
+    return live_data
+
+
+def wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('Timed out waiting for condition')
+        time.sleep(.01)
+
+
+class Test_snapshot:
+    def test_roundtrip(self, cache_path):
+        shared.write_snapshot(cache_path, {'foo': [1, 'two'], 'bar': 3}, 3, 'abc')
+
+        snapshot = shared.read_snapshot(cache_path)
+
+        assert snapshot.seq == 3
+        assert snapshot.epoch == 'abc'
+        assert snapshot.published_at <= time.time()
+        assert snapshot.get() == {'foo': [1, 'two'], 'bar': 3}
+        assert snapshot.get('foo') == [1, 'two']
+
+    def test_lazy_get(self, cache_path, mocker):
+        shared.write_snapshot(cache_path, {'foo': {'a': 1}, 'bar': {'b': 2}}, 1, 'abc')
+        snapshot = shared.read_snapshot(cache_path)
+        decode = mocker.spy(binary.Decoder, '_decode')
+
+        assert snapshot.get('bar/b') == 2
+        # Only the value that was read
+        assert decode.call_count == 1
+
+    @pytest.mark.parametrize('content', [b'', b'x' * shared.HEADER.size])
+    def test_invalid_file(self, cache_path, content):
+        with open(cache_path, 'wb') as f:
+            f.write(content)
+
+        with pytest.raises(ValueError):
+            shared.read_snapshot(cache_path)
+
+
+class Test_acquire_owner:
+    def test_single_owner(self, tmp_path):
+        lock_path = str(tmp_path / 'cache.lock')
+
+        owner = shared.acquire_owner(lock_path)
+        other = shared.acquire_owner(lock_path)
+
+        assert owner is not None
+        assert other is None
+
+        owner.close()
+        assert shared.acquire_owner(lock_path) is not None
+
+
+class Test_SharedData:
+    @pytest.fixture
+    def shared_data(self, cache_path):
+        shared.write_snapshot(cache_path, {'foo': {'bar': 1, 'baz': 2}, 'qux': 3}, 2, 'e')
+        result = shared.SharedData()
+        result.load(shared.read_snapshot(cache_path))
+        return result
+
+    def test_snapshot(self, shared_data):
+        assert shared_data.get() == {'foo': {'bar': 1, 'baz': 2}, 'qux': 3}
+        assert shared_data.get('foo/bar') == 1
+        assert shared_data.get('missing') is None
+
+    def test_changes(self, shared_data):
+        shared_data.apply(3, 'foo/bar', 5)
+        shared_data.apply(4, 'foo/baz', None)
+        shared_data.apply(5, 'new/key', 'value')
+
+        assert shared_data.get() == {
+            'foo': {'bar': 5}, 'qux': 3, 'new': {'key': 'value'}
+        }
+        assert shared_data.get('foo') == {'bar': 5}
+        assert shared_data.get('foo/bar') == 5
+        assert shared_data.get('new') == {'key': 'value'}
+
+    def test_change_above_path(self, shared_data):
+        shared_data.apply(3, 'foo/bar', 5)
+        shared_data.apply(4, 'foo', {'baz': 6})
+        shared_data.apply(5, 'foo/qux', 7)
+
+        assert shared_data.get('foo') == {'baz': 6, 'qux': 7}
+        assert shared_data.get('foo/baz') == 6
+        assert shared_data.get('foo/bar') is None
+
+    def test_root_change(self, shared_data):
+        shared_data.apply(3, 'foo', 1)
+        shared_data.apply(4, '/', {'a': 1})
+
+        assert shared_data.pending_changes == 1
+        assert shared_data.get() == {'a': 1}
+        assert shared_data.get('foo') is None
+
+    def test_values_not_shared(self, shared_data):
+        shared_data.apply(3, 'foo', {'bar': {'a': 1}})
+
+        shared_data.get('foo')['bar']['a'] = 2
+
+        assert shared_data.get('foo/bar/a') == 1
+
+    def test_load_drops_included_changes(self, shared_data, cache_path):
+        shared_data.apply(3, 'foo/bar', 5)
+        shared_data.apply(4, 'qux', 4)
+        shared.write_snapshot(cache_path, {'foo': {'bar': 5}, 'qux': 4}, 3, 'e')
+
+        shared_data.load(shared.read_snapshot(cache_path))
+
+        assert shared_data.pending_changes == 1
+        assert shared_data.get() == {'foo': {'bar': 5}, 'qux': 4}
+
+
+class Test_SharedCachePublisher:
+    def test_publish(self, livedata, cache_path):
+        publisher = shared.SharedCachePublisher(livedata, cache_path)
+
+        publisher.publish()
+
+        snapshot = shared.read_snapshot(cache_path)
+        assert snapshot.get() == {'foo': {'bar': 1}}
+        assert snapshot.epoch == publisher.events.epoch
+        assert publisher.seq == 0
+
+    def test_publish_schema_records(self, livedata, cache_path):
+        livedata.register_schema(schema.Schema('devices/*', ['name']))
+        livedata._put_handler('/devices/d2', {'name': 'two'})
+        publisher = shared.SharedCachePublisher(livedata, cache_path)
+
+        publisher.publish()
+
+        snapshot = shared.read_snapshot(cache_path)
+        assert snapshot.get('devices') == {'d2': {'name': 'two'}}
+
+    def test_memory_budget(self, mocker, cache_path):
+        live_data = live.LiveData(mocker.Mock(), '/', memory_budget=10 ** 6)
+
+        with pytest.raises(ValueError):
+            shared.SharedCachePublisher(live_data, cache_path)
+
+    def test_publish_without_data(self, livedata, cache_path):
+        livedata._cache = None
+        publisher = shared.SharedCachePublisher(livedata, cache_path)
+
+        publisher.publish()
+
+        assert publisher.seq is None
+
+    def test_publishes_changes(self, livedata, cache_path):
+        publisher = shared.SharedCachePublisher(livedata, cache_path, interval=0)
+        publisher.start()
+        wait_for(lambda: publisher.seq == 0)
+
+        livedata._put_handler('/foo/bar', 2)
+        wait_for(lambda: publisher.seq == 1)
+        publisher.stop()
+
+        assert shared.read_snapshot(cache_path).get() == {'foo': {'bar': 2}}
+
+
+class Test_SharedCacheReader:
+    @pytest.fixture
+    def publisher(self, livedata, cache_path):
+        publisher = shared.SharedCachePublisher(livedata, cache_path, interval=60)
+        publisher.start()
+        wait_for(lambda: publisher.seq == 0)
+        yield publisher
+        publisher.stop()
+
+    @pytest.fixture
+    def make_reader(self, cache_path):
+        readers = []
+
+        def make(**kwargs):
+            reader = shared.SharedCacheReader(
+                cache_path, reconnect_interval=.01, **kwargs
+            )
+            readers.append(reader)
+            reader.listen()
+            return reader
+
+        yield make
+
+        for reader in readers:
+            reader.hangup()
+
+    def test_missing_snapshot(self, cache_path):
+        reader = shared.SharedCacheReader(cache_path)
+
+        assert reader.get_data() is None
+        assert reader.version is None
+
+    def test_get_data(self, cache_path):
+        shared.write_snapshot(cache_path, {'foo': 'bar'}, 1, 'e')
+        reader = shared.SharedCacheReader(cache_path)
+
+        result = reader.get_data()
+
+        assert isinstance(result, shared.SharedData)
+        assert result.get('foo') == 'bar'
+        assert reader.version == 1
+        assert reader.is_stale() is True
+
+    def test_read_only(self, cache_path):
+        reader = shared.SharedCacheReader(cache_path)
+
+        with pytest.raises(TypeError):
+            reader.set_data('foo', 1)
+        with pytest.raises(TypeError):
+            reader.refresh('foo')
+
+    def test_resumes_from_snapshot(self, livedata, publisher, make_reader, mocker):
+        reader = make_reader()
+        apply = mocker.spy(reader._cache, 'apply')
+
+        wait_for(lambda: reader.connected)
+        livedata._put_handler('/foo/baz', 2)
+        wait_for(lambda: reader.last_seq == 1)
+
+        assert reader.version == 0
+        assert reader.is_stale() is False
+        assert reader.get_data().get() == {'foo': {'bar': 1, 'baz': 2}}
+        # Only the change, not the whole data
+        apply.assert_called_once_with(1, 'foo/baz', 2)
+
+    def test_signals(self, livedata, publisher, make_reader, mocker):
+        mock_handler = mocker.Mock()
+
+        def handler(*args, **kwargs):
+            mock_handler(*args, **kwargs)
+
+        reader = make_reader()
+        reader.signal('/foo').connect(handler)
+        wait_for(lambda: reader.connected)
+
+        livedata._put_handler('/foo/bar', 3)
+        wait_for(lambda: mock_handler.called)
+
+        mock_handler.assert_called_once_with(
+            reader.get_data(), value={'bar': 3}, path='foo/bar'
+        )
+
+    def test_load_checkpoint(self, livedata, publisher, make_reader):
+        reader = make_reader(poll_interval=60)
+        wait_for(lambda: reader.connected)
+        livedata._put_handler('/foo/bar', 3)
+        wait_for(lambda: reader.last_seq == 1)
+        assert reader.get_data()._changes
+
+        publisher.publish()
+
+        assert reader.load_checkpoint() is True
+        assert reader.load_checkpoint() is False
+        assert reader.version == 1
+        assert reader.get_data().pending_changes == 0
+        assert reader.get_data().get('foo/bar') == 3
+
+    def test_load_checkpoint_waits_for_changes(self, livedata, publisher, cache_path):
+        reader = shared.SharedCacheReader(cache_path)
+        reader.load_checkpoint()
+        livedata._put_handler('/foo/bar', 3)
+        publisher.publish()
+
+        # Connected, but the change has not been received yet
+        reader.connected = True
+
+        assert reader.load_checkpoint() is False
+        assert reader.version == 0
+
+    def test_poll_interval(self, cache_path, mocker):
+        shared.write_snapshot(cache_path, {'foo': 'bar'}, 1, 'e')
+        reader = shared.SharedCacheReader(cache_path, poll_interval=60)
+        reader.get_data()
+        reader.load_checkpoint = mocker.Mock()
+
+        reader.get_data()
+
+        assert not reader.load_checkpoint.called
+
+    def test_owner_restarted(self, livedata, publisher, make_reader):
+        reader = make_reader()
+        wait_for(lambda: reader.connected)
+        publisher.stop()
+        wait_for(lambda: not reader.connected)
+
+        livedata.get_data().set('/foo', None)
+        livedata.get_data().set('/qux', 1)
+        other = shared.SharedCachePublisher(livedata, publisher._path, interval=60)
+        other.start()
+        wait_for(lambda: reader.epoch == other.events.epoch)
+        other.stop()
+
+        assert reader.get_data().get() == {'qux': 1}
+
+    def test_takes_over(self, livedata, publisher, make_reader, cache_path, mocker):
+        promoted = []
+
+        def promote(lock_file):
+            other = shared.SharedCachePublisher(
+                livedata, cache_path, interval=60, lock_file=lock_file
+            )
+            other.start()
+            promoted.append(other)
+            return livedata
+
+        lock_file = shared.acquire_owner('{}.lock'.format(cache_path))
+        reader = make_reader(promote=promote)
+        wait_for(lambda: reader.connected)
+
+        publisher.stop()
+        wait_for(lambda: not reader.connected)
+        time.sleep(.05)
+        # The owner still holds the lock
+        assert not promoted
+
+        lock_file.close()
+        wait_for(lambda: promoted and reader.connected)
+        livedata._put_handler('/foo/bar', 4)
+        wait_for(lambda: reader.get_data().get('foo/bar') == 4)
+        promoted[0].stop()
+
+        assert reader.owner is livedata
+
+
+class Test_connect:
+    def test_owner(self, cache_path, mocker):
+        mocker.patch('firebasedata.live.watcher')
+        app = mocker.Mock()
+        app.database.return_value.child.return_value.get.return_value.val.return_value = {
+            'foo': 'bar'
+        }
+
+        result = shared.connect(app, '/root', cache_path)
+
+        assert isinstance(result, live.LiveData)
+        assert result.get_data() == {'foo': 'bar'}
+
+    def test_reader(self, cache_path, mocker):
+        lock_file = shared.acquire_owner('{}.lock'.format(cache_path))
+        app = mocker.Mock()
+
+        result = shared.connect(app, '/root', cache_path)
+
+        assert isinstance(result, shared.SharedCacheReader)
+        assert not app.database.called
+        result.hangup()
+        lock_file.close()
+
+    def test_reader_takes_over(self, cache_path, mocker):
+        mocker.patch('firebasedata.live.watcher')
+        lock_file = shared.acquire_owner('{}.lock'.format(cache_path))
+        app = mocker.Mock()
+        app.database.return_value.child.return_value.get.return_value.val.return_value = {
+            'foo': 'bar'
+        }
+        result = shared.connect(app, '/root', cache_path)
+        result._reconnect_interval = .01
+
+        lock_file.close()
+        wait_for(lambda: result.owner is not None, timeout=5)
+        wait_for(lambda: result.get_data() is not None)
+
+        assert result.get_data().get('foo') == 'bar'
+        result.hangup()
@@ -0,0 +1,214 @@
+import pytest
+
+from firebasedata import data, live, views
+
+
+@pytest.fixture
+def livedata():
+    livedata = live.LiveData(None, '/')
+    livedata._cache = data.FirebaseData({
+        'devices': {
+            'a': {'battery': 10, 'name': 'A'},
+            'b': {'battery': 90, 'name': 'B'},
+        },
+        'other': 1,
+    })
+    return livedata
+
+
+@pytest.fixture
+def view(livedata):
+    view = livedata.view(
+        'devices',
+        filter_func=lambda device: device.get('battery', 100) < 20,
+        map_func=lambda device: device['name']
+    )
+    yield view
+    view.close()
+
+
+def collect_changes(view):
+    result = []
+    view.changed.connect(
+        lambda sender, changes=None: result.append(changes),
+        weak=False
+    )
+    return result
+
+
+@pytest.fixture
+def changes(view):
+    return collect_changes(view)
+
+
+def test_initial_items(view):
+    assert dict(view) == {'a': 'A'}
+    assert len(view) == 1
+    assert view['a'] == 'A'
+
+
+def test_read_only(view):
+    with pytest.raises(TypeError):
+        view['c'] = 'C'
+
+
+def test_child_added(livedata, view, changes):
+    livedata._put_handler('/devices/c', {'battery': 5, 'name': 'C'})
+
+    assert dict(view) == {'a': 'A', 'c': 'C'}
+    assert changes == [{'c': 'C'}]
+
+
+def test_child_leaves_filter(livedata, view, changes):
+    livedata._put_handler('/devices/a/battery', 50)
+
+    assert dict(view) == {}
+    assert changes == [{'a': None}]
+
+
+def test_child_removed(livedata, view, changes):
+    livedata._put_handler('/devices/a', None)
+
+    assert dict(view) == {}
+    assert changes == [{'a': None}]
+
+
+def test_unchanged_child(livedata, view, changes):
+    livedata._put_handler('/devices/b/battery', 80)
+    livedata._put_handler('/devices/a/battery', 15)
+
+    assert dict(view) == {'a': 'A'}
+    assert changes == []
+
+
+def test_unrelated_path(livedata, view, changes, mocker):
+    compute = mocker.spy(view, '_compute')
+    livedata._put_handler('/other', 2)
+
+    assert changes == []
+    assert not compute.called
+
+
+def test_only_touched_children_evaluated(livedata, mocker):
+    filter_func = mocker.Mock(return_value=True)
+    view = livedata.view('devices', filter_func=filter_func)
+    len(view)
+    filter_func.reset_mock()
+
+    livedata._patch_handler('/devices', {'a/battery': 5, 'c': {'battery': 1}})
+
+    assert filter_func.call_count == 2
+    view.close()
+
+
+def test_source_replaced(livedata, view, changes):
+    livedata._put_handler('/', {'devices': {'d': {'battery': 1, 'name': 'D'}}})
+
+    assert dict(view) == {'d': 'D'}
+    assert changes == [{'d': 'D', 'a': None}]
+
+
+def test_default_map_copies(livedata):
+    view = livedata.view('devices')
+    assert view['a'] == {'battery': 10, 'name': 'A'}
+
+    changes = collect_changes(view)
+    livedata._put_handler('/devices/a/battery', 5)
+
+    assert view['a'] == {'battery': 5, 'name': 'A'}
+    assert changes == [{'a': {'battery': 5, 'name': 'A'}}]
+    view.close()
+
+
+def test_close(livedata, view, changes):
+    view.close()
+    livedata._put_handler('/devices/c', {'battery': 5, 'name': 'C'})
+
+    assert changes == []
+    assert 'c' not in view
+
+
+def test_no_data_yet():
+    livedata = live.LiveData(None, '/')
+    view = views.View(livedata, 'devices')
+
+    assert dict(view) == {}
+    view.close()
+
+
+class Test_Selector:
+    @pytest.fixture
+    def func(self, mocker):
+        return mocker.Mock(
+            side_effect=lambda cache: sum(
+                device['battery'] for device in cache.get('devices').values()
+            )
+        )
+
+    @pytest.fixture
+    def selector(self, livedata, func):
+        selector = livedata.selector(func, depends_on=['/devices'])
+        yield selector
+        selector.close()
+
+    def test_lazy(self, selector, func):
+        assert not func.called
+
+    def test_memoized(self, selector, func):
+        assert selector() == 100
+        assert selector() == 100
+
+        assert func.call_count == 1
+        assert selector.stats() == {'hits': 1, 'misses': 1, 'recomputes': 1}
+
+    def test_invalidated_by_descendant(self, livedata, selector, func):
+        selector()
+        livedata._put_handler('/devices/a/battery', 20)
+
+        assert not selector.valid
+        assert selector() == 110
+        assert func.call_count == 2
+
+    def test_invalidated_by_ancestor(self, livedata, selector, func):
+        selector()
+        livedata._put_handler('/', {'devices': {'c': {'battery': 1}}})
+
+        assert selector() == 1
+
+    def test_not_invalidated_by_unrelated_path(self, livedata, selector, func):
+        selector()
+        livedata._put_handler('/other', 2)
+
+        assert selector.valid
+        assert selector() == 100
+        assert func.call_count == 1
+
+    def test_change_during_compute(self, livedata, mocker):
+        def func(cache):
+            # Applied while computing, so the result must not be kept
+            selector.invalidate()
+            return 1
+
+        selector = livedata.selector(func, depends_on=['devices'])
+
+        assert selector() == 1
+        assert not selector.valid
+        selector.close()
+
+    def test_error_not_memoized(self, livedata, mocker):
+        func = mocker.Mock(side_effect=[ValueError('Test error'), 1])
+        selector = livedata.selector(func, depends_on=['devices'])
+
+        with pytest.raises(ValueError):
+            selector()
+
+        assert selector() == 1
+        assert selector.stats() == {'hits': 0, 'misses': 2, 'recomputes': 1}
+        selector.close()
+
+    def test_close(self, livedata, selector):
+        selector()
+        selector.close()
+        livedata._put_handler('/devices/a/battery', 20)
+
+        assert selector.valid
@@ -1,4 +1,5 @@
 from datetime import timedelta
+import threading
 import time
 
 import pytest
@@ -12,30 +13,34 @@ def log_mock(mocker):
 
 
 @pytest.fixture
-def timer_fake(mocker):
-    return mocker.patch('firebasedata.watcher.Timer')
+def scheduler_fake(mocker):
+    return mocker.patch('firebasedata.watcher._scheduler')
 
 
 @pytest.fixture
-def watcher_stub(mocker, timer_fake):
+def scheduler():
+    return watcher.Scheduler(workers=1)
+
+
+@pytest.fixture
+def watcher_stub(mocker, scheduler_fake):
     is_stale = mocker.Mock()
     update = mocker.Mock()
     interval = timedelta(seconds=.001)
     return watcher.Watcher(is_stale, update, interval)
 
 
-def test_Watcher_init(watcher_stub, timer_fake):
+def test_Watcher_init(watcher_stub, scheduler_fake):
     assert watcher_stub.running is False
-    assert not timer_fake.called
+    assert not scheduler_fake.schedule.called
 
 
-def test_Watcher_start(watcher_stub, timer_fake):
+def test_Watcher_start(watcher_stub, scheduler_fake):
     watcher_stub.start()
 
     assert watcher_stub._should_cancel is False
     assert watcher_stub.running is True
-    assert timer_fake.called
-    assert timer_fake.return_value.start.called
+    scheduler_fake.schedule.assert_called_with(.001, watcher_stub._action)
 
 
 def test_Watcher_cannot_start_while_running(watcher_stub, log_mock):
@@ -48,12 +53,84 @@ def test_Watcher_cannot_start_while_running(watcher_stub, log_mock):
     )
 
 
+def test_Watcher_start_with_backoff(mocker, scheduler_fake):
+    backoff = watcher.Backoff(timedelta(seconds=2), multiplier=3)
+    watcher_stub = watcher.Watcher(mocker.Mock(), mocker.Mock(), backoff=backoff)
+
+    watcher_stub.start()
+
+    scheduler_fake.schedule.assert_called_with(2, watcher_stub._action)
+    assert backoff.attempts == 1
+
+
+def test_Watcher_start_with_callable_interval(mocker, scheduler_fake):
+    interval = mocker.Mock(return_value=timedelta(seconds=7))
+    watcher_stub = watcher.Watcher(mocker.Mock(), mocker.Mock(), interval)
+
+    watcher_stub.start()
+
+    scheduler_fake.schedule.assert_called_with(7, watcher_stub._action)
+
+
+def test_Watcher_action__backoff_reset(mocker, watcher_stub):
+    watcher_stub._backoff = mocker.Mock()
+    watcher_stub._should_update.return_value = False
+    watcher_stub.start = mocker.Mock()
+    watcher_stub._action()
+
+    assert watcher_stub._backoff.reset.called
+
+
+def test_Watcher_action__backoff_not_reset(mocker, watcher_stub):
+    watcher_stub._backoff = mocker.Mock()
+    watcher_stub._should_update.return_value = True
+    watcher_stub.start = mocker.Mock()
+    watcher_stub._action()
+
+    assert not watcher_stub._backoff.reset.called
+
+
 def test_Watcher_cancel(watcher_stub):
     watcher_stub.cancel()
 
     assert watcher_stub._should_cancel is True
 
 
+def test_Watcher_cancel_scheduled_call(watcher_stub, scheduler_fake):
+    watcher_stub.start()
+    watcher_stub.cancel()
+
+    assert scheduler_fake.schedule.return_value.cancel.called
+
+
+def test_Watcher_reschedule(watcher_stub, scheduler_fake):
+    watcher_stub.start()
+    call = scheduler_fake.schedule.return_value
+    watcher_stub.reschedule(timedelta(seconds=5))
+
+    scheduler_fake.reschedule.assert_called_with(call, 5)
+    assert watcher_stub._call is scheduler_fake.reschedule.return_value
+
+
+def test_Watcher_reschedule_callable_interval(mocker, scheduler_fake):
+    interval = mocker.Mock(return_value=timedelta(seconds=7))
+    watcher_stub = watcher.Watcher(mocker.Mock(), mocker.Mock(), interval)
+    watcher_stub.start()
+    interval.return_value = timedelta(seconds=3)
+
+    watcher_stub.reschedule()
+
+    scheduler_fake.reschedule.assert_called_with(
+        scheduler_fake.schedule.return_value, 3
+    )
+
+
+def test_Watcher_reschedule_not_started(watcher_stub, scheduler_fake):
+    watcher_stub.reschedule(timedelta(seconds=5))
+
+    assert not scheduler_fake.reschedule.called
+
+
 def test_Watcher_cannot_start_after_cancel(watcher_stub, log_mock):
     watcher_stub.cancel()
     watcher_stub.start()
@@ -99,6 +176,130 @@ def test_Watcher_action__should_cancel(mocker, watcher_stub):
     assert not watcher_stub.start.called
 
 
+def test_Watcher_action__stats(mocker, watcher_stub):
+    watcher_stub._should_update.side_effect = [False, True]
+    watcher_stub.start = mocker.Mock()
+    watcher_stub._action()
+    watcher_stub._action()
+
+    stats = watcher_stub.stats
+    assert stats.runs == 2
+    assert stats.triggers == 1
+    assert stats.errors == 0
+    assert stats.check.count == 2
+    assert stats.update.count == 1
+    assert stats.update.max >= stats.update.avg >= 0
+    assert stats.last_run_at is not None
+
+
+def test_Watcher_action__stats_error(mocker, watcher_stub):
+    watcher_stub._should_update.return_value = True
+    watcher_stub._update_func.side_effect = ValueError('Test error')
+
+    with pytest.raises(ValueError):
+        watcher_stub._action()
+
+    assert watcher_stub.stats.runs == 1
+    assert watcher_stub.stats.errors == 1
+    assert watcher_stub.stats.update.count == 1
+
+
+def test_Watcher_action__drift(mocker, watcher_stub):
+    mocker.patch('firebasedata.watcher.time.monotonic', return_value=102.5)
+    watcher_stub._call = mocker.Mock(due=100.0)
+    watcher_stub._should_update.return_value = False
+    watcher_stub.start = mocker.Mock()
+    watcher_stub._action()
+
+    assert watcher_stub.stats.drift.last == 2.5
+
+
+def test_describe(watcher_stub):
+    watcher_stub._interval = timedelta(seconds=1)
+    watcher_stub.start()
+    watcher_stub.stats.start_run(1.5, watcher_stub.delay)
+
+    result = watcher.describe(watcher_stub, 42)
+
+    assert result['interval'] == 1
+    assert result['next_due'] == 42
+    assert result['behind'] is True
+    assert result['stats']['runs'] == 1
+    assert result['stats']['drift'] == {'last': 1.5, 'avg': 1.5, 'max': 1.5}
+    assert result['stats']['delay'] == {'last': 1, 'avg': 1, 'max': 1}
+
+
+def test_describe__callable_interval(mocker, watcher_stub):
+    watcher_stub._interval = mocker.Mock(return_value=timedelta(seconds=1))
+    watcher_stub.start()
+    watcher_stub.stats.start_run(1.5, watcher_stub.delay)
+    watcher_stub._interval.return_value = timedelta(seconds=10)
+    watcher_stub.running = False
+    watcher_stub.start()
+
+    result = watcher.describe(watcher_stub, None)
+
+    assert result['interval'] == 10
+    # Judged against the delay of the run that was late
+    assert result['behind'] is True
+
+
+def test_describe__backoff(watcher_stub):
+    watcher_stub._backoff = watcher.Backoff(timedelta(seconds=1))
+    watcher_stub.start()
+    watcher_stub.stats.start_run(1.5, watcher_stub.delay)
+    watcher_stub.running = False
+    watcher_stub.start()
+
+    result = watcher.describe(watcher_stub, None)
+
+    assert result['interval'] == 2
+    assert result['behind'] is True
+
+
+def test_describe__not_run(watcher_stub):
+    watcher_stub.start()
+
+    result = watcher.describe(watcher_stub, None)
+
+    assert result['interval'] == .001
+    assert result['behind'] is False
+
+
+def test_Watcher_action__records_delay(mocker, watcher_stub):
+    watcher_stub._should_update.return_value = False
+    watcher_stub.start()
+    watcher_stub._call = mocker.Mock(due=time.monotonic())
+    watcher_stub._action()
+
+    assert watcher_stub.stats.delay.last == .001
+
+
+def test_Watcher_reschedule_records_delay(watcher_stub):
+    watcher_stub.start()
+    watcher_stub.reschedule(timedelta(seconds=5))
+
+    assert watcher_stub.delay == 5
+
+
+def test_get_watcher(mocker):
+    watcher.watch('test_watcher', mocker.Mock(), mocker.Mock(), timedelta(hours=1))
+
+    assert isinstance(watcher.get_watcher('test_watcher'), watcher.Watcher)
+    assert watcher.get_watcher('whatever') is None
+
+
+def test_list_watchers(mocker):
+    watcher.watch('test_watcher', mocker.Mock(), mocker.Mock(), timedelta(hours=1))
+
+    result = watcher.list_watchers()
+
+    assert list(result) == ['test_watcher']
+    assert result['test_watcher']['interval'] == 3600
+    assert result['test_watcher']['next_due'] is not None
+    assert result['test_watcher']['stats']['runs'] == 0
+
+
 def test_watch__unknown_name(mocker):
     watcher_stub = mocker.patch('firebasedata.watcher.Watcher')
     is_stale = mocker.Mock()
@@ -109,7 +310,7 @@ def test_watch__unknown_name(mocker):
     watcher.cancel_all()
     watcher.watch('test_watcher', is_stale, update, interval)
 
-    watcher_stub.assert_called_with(is_stale, update, interval)
+    watcher_stub.assert_called_with(is_stale, update, interval, None)
     assert watcher_stub.return_value.start.called
     assert 'test_watcher' in watcher._watchers
 
@@ -202,3 +403,242 @@ def test_watch__stale(mocker):
 
     assert is_stale.call_count == 4
     assert update.called is True
+
+
+class Test_Scheduler:
+    def test_schedule(self, scheduler):
+        called = threading.Event()
+
+        scheduler.schedule(.001, called.set)
+
+        assert called.wait(1)
+        assert scheduler.pending() == 0
+
+    def test_order(self, scheduler):
+        calls = []
+        done = threading.Event()
+
+        scheduler.schedule(.02, lambda: (calls.append(2), done.set()))
+        scheduler.schedule(.01, lambda: calls.append(1))
+
+        assert done.wait(1)
+        assert calls == [1, 2]
+
+    def test_cancel(self, scheduler, mocker):
+        func = mocker.Mock()
+
+        call = scheduler.schedule(.01, func)
+        call.cancel()
+        time.sleep(.05)
+
+        assert not func.called
+        assert call.cancelled is True
+        assert scheduler.pending() == 0
+
+    def test_pending_and_next_due(self, scheduler, mocker):
+        assert scheduler.next_due() is None
+
+        first = scheduler.schedule(10, mocker.Mock())
+        second = scheduler.schedule(20, mocker.Mock())
+
+        assert scheduler.pending() == 2
+        assert scheduler.next_due() == first.due
+
+        first.cancel()
+
+        assert scheduler.pending() == 1
+        assert scheduler.next_due() == second.due
+
+    def test_reschedule(self, scheduler):
+        called = threading.Event()
+
+        call = scheduler.schedule(10, called.set)
+        new_call = scheduler.reschedule(call, .001)
+
+        assert called.wait(1)
+        assert call.cancelled is True
+        assert new_call.done is True
+
+    def test_error(self, scheduler, mocker, log_mock):
+        called = threading.Event()
+        func = mocker.Mock(side_effect=ValueError('Test error'))
+
+        scheduler.schedule(.001, func)
+        scheduler.schedule(.002, called.set)
+
+        assert called.wait(1)
+        log_mock.exception.assert_called_with('Error in scheduled function: %s', func)
+
+    def test_single_thread(self, scheduler, mocker):
+        threads = threading.active_count()
+
+        for _ in range(50):
+            scheduler.schedule(10, mocker.Mock())
+
+        # One scheduling thread, plus its worker
+        assert threading.active_count() == threads + 2
+
+    def test_blocked_workers(self, scheduler):
+        release = threading.Event()
+        called = threading.Event()
+
+        scheduler.schedule(.001, lambda: release.wait(5))
+        scheduler.schedule(.002, lambda: release.wait(5))
+        scheduler.schedule(.01, called.set)
+
+        try:
+            assert called.wait(1)
+            assert scheduler.workers() == 3
+        finally:
+            release.set()
+
+    def test_idle_workers_exit(self, scheduler, mocker):
+        mocker.patch.object(watcher, 'WORKER_IDLE_TIMEOUT', .01)
+        release = threading.Event()
+        called = threading.Event()
+
+        scheduler.schedule(.001, release.wait)
+        scheduler.schedule(.002, called.set)
+        assert called.wait(1)
+        assert scheduler.workers() == 2
+        release.set()
+        deadline = time.monotonic() + 1
+        while scheduler.workers() > 1 and time.monotonic() < deadline:
+            time.sleep(.01)
+
+        assert scheduler.workers() == 1
+
+    def test_hung_update(self, mocker):
+        release = threading.Event()
+        check = mocker.Mock(return_value=False)
+        interval = timedelta(seconds=.001)
+
+        for index in range(watcher.DEFAULT_WORKERS):
+            watcher.watch(
+                'hung_{}'.format(index),
+                lambda: True,
+                lambda: release.wait(5),
+                interval=interval
+            )
+        watcher.watch('test_watcher', check, mocker.Mock(), interval=interval)
+
+        try:
+            deadline = time.monotonic() + 1
+            while check.call_count < 3 and time.monotonic() < deadline:
+                time.sleep(.01)
+            assert check.call_count >= 3
+        finally:
+            watcher.cancel_all()
+            release.set()
+
+
+def test_pending_watchers(mocker):
+    watcher.cancel_all()
+    interval = timedelta(hours=1)
+    pending = watcher.pending()
+
+    watcher.watch('test_watcher', mocker.Mock(), mocker.Mock(), interval)
+
+    assert watcher.pending() == pending + 1
+    assert watcher.next_due() is not None
+
+    watcher.cancel('test_watcher')
+
+    assert watcher.pending() == pending
+
+
+def test_reschedule__unknown_name():
+    assert watcher.reschedule('whatever') is None
+
+
+def test_reschedule__known_name(mocker):
+    watcher_stub = mocker.Mock()
+    watcher._watchers['something'] = watcher_stub
+    delay = timedelta(seconds=1)
+
+    result = watcher.reschedule('something', delay)
+
+    assert result is True
+    watcher_stub.reschedule.assert_called_with(delay)
+    watcher.cancel_all()
+
+
+class Test_Backoff:
+    def test_exponential(self):
+        backoff = watcher.Backoff(timedelta(seconds=1), multiplier=2)
+
+        intervals = [backoff.next_interval().total_seconds() for _ in range(4)]
+
+        assert intervals == [1, 2, 4, 8]
+        assert backoff.attempts == 4
+
+    def test_cap(self):
+        backoff = watcher.Backoff(
+            timedelta(seconds=1),
+            multiplier=10,
+            cap=timedelta(seconds=30)
+        )
+
+        intervals = [backoff.next_interval().total_seconds() for _ in range(3)]
+
+        assert intervals == [1, 10, 30]
+
+    def test_many_attempts(self):
+        backoff = watcher.Backoff(timedelta(seconds=1), cap=timedelta(minutes=5))
+
+        for _ in range(5000):
+            interval = backoff.next_interval()
+
+        assert interval == timedelta(minutes=5)
+
+    def test_many_attempts_without_cap(self):
+        backoff = watcher.Backoff(timedelta(seconds=1), jitter='decorrelated')
+
+        for _ in range(5000):
+            interval = backoff.next_interval()
+
+        assert interval <= watcher.MAX_BACKOFF
+
+    def test_full_jitter(self, mocker):
+        uniform = mocker.patch('firebasedata.watcher.random.uniform', return_value=3)
+        backoff = watcher.Backoff(timedelta(seconds=2), jitter='full')
+
+        backoff.next_interval()
+        backoff.next_interval()
+
+        uniform.assert_called_with(0, 4)
+        assert backoff.next_interval() == timedelta(seconds=3)
+
+    def test_decorrelated_jitter(self, mocker):
+        uniform = mocker.patch('firebasedata.watcher.random.uniform', return_value=5)
+        backoff = watcher.Backoff(
+            timedelta(seconds=2),
+            cap=timedelta(seconds=12),
+            jitter='decorrelated'
+        )
+
+        backoff.next_interval()
+        uniform.assert_called_with(2, 6)
+
+        backoff.next_interval()
+        uniform.assert_called_with(2, 15)
+
+        uniform.return_value = 100
+        assert backoff.next_interval() == timedelta(seconds=12)
+
+    def test_invalid_jitter(self):
+        with pytest.raises(ValueError):
+            watcher.Backoff(timedelta(seconds=1), jitter='random')
+
+    def test_reset(self):
+        backoff = watcher.Backoff(timedelta(seconds=1))
+        backoff.next_interval()
+        backoff.next_interval()
+
+        assert backoff.next_retry_at is not None
+
+        backoff.reset()
+
+        assert backoff.attempts == 0
+        assert backoff.next_retry_at is None
+        assert backoff.next_interval() == timedelta(seconds=1)
@@ -0,0 +1,171 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+
+import pytest
+import requests
+
+from firebasedata import writer
+
+
+class FirebaseStandIn(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_PUT(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+
+        with server.lock:
+            server.writes.append((self.path, body))
+            server.methods.append(self.command)
+            server.connections.add(self.client_address)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+
+        time.sleep(server.delay)
+
+        with server.lock:
+            server.in_flight -= 1
+
+        if self.path.startswith('/error'):
+            self.send_response(401)
+            payload = b'{"error":"Permission denied"}'
+        else:
+            self.send_response(200)
+            payload = json.dumps(body).encode('utf-8')
+
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_PATCH = do_PUT
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FirebaseStandIn)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.writes = []
+    server.methods = []
+    server.connections = set()
+    server.in_flight = 0
+    server.max_in_flight = 0
+    server.delay = 0
+    threading.Thread(
+        target=server.serve_forever,
+        kwargs={'poll_interval': .01},
+        daemon=True
+    ).start()
+    server.url = 'http://127.0.0.1:{}/'.format(server.server_address[1])
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(server):
+    client = writer.WriteClient(server.url, max_in_flight=2)
+    yield client
+    client.close()
+
+
+def test_url(client, server):
+    assert client.url('/foo/bar/') == server.url + 'foo/bar.json'
+    assert client.url('/') == server.url + '.json'
+
+
+def test_update(client, server):
+    result = client.update('/foo', {'bar/baz': 1, 'qux': None})
+
+    assert result == {'bar/baz': 1, 'qux': None}
+    assert server.writes == [('/foo.json', {'bar/baz': 1, 'qux': None})]
+    assert server.methods == ['PATCH']
+
+
+def test_set(client, server):
+    result = client.set('/foo/bar', {'baz': 1})
+
+    assert result == {'baz': 1}
+    assert server.writes == [('/foo/bar.json', {'baz': 1})]
+
+
+def test_set_with_token(server):
+    with writer.WriteClient(server.url, token='secret') as client:
+        client.set('foo', 1)
+
+    assert server.writes == [('/foo.json?auth=secret', 1)]
+
+
+def test_set_with_credentials(server, mocker):
+    credentials = mocker.Mock()
+    credentials.get_access_token.return_value.access_token = 'access'
+
+    with writer.WriteClient(server.url, credentials=credentials) as client:
+        client.set('foo', 1)
+
+    assert server.writes == [('/foo.json?access_token=access', 1)]
+
+
+def test_connections_reused(client, server):
+    for i in range(10):
+        client.set('foo', i)
+
+    assert len(server.writes) == 10
+    assert len(server.connections) <= 2
+
+
+def test_set_async_in_flight_limit(client, server):
+    server.delay = .05
+
+    futures = [client.set_async('foo/{}'.format(i), i) for i in range(6)]
+
+    assert [future.result(2) for future in futures] == list(range(6))
+    assert server.max_in_flight == 2
+
+
+def test_error(client, server):
+    future = client.set_async('error', 1)
+
+    with pytest.raises(requests.HTTPError):
+        future.result(2)
+
+    assert client.stats.errors == 1
+
+
+def test_stats(client, server):
+    server.delay = .01
+
+    for i in range(3):
+        client.set('foo', i)
+
+    summary = client.stats.summary()
+    assert summary['requests'] == 3
+    assert summary['errors'] == 0
+    assert summary['in_flight'] == 0
+    assert summary['latency']['count'] == 3
+    assert summary['latency']['p50'] >= 10
+
+
+def test_from_app(mocker):
+    app = mocker.Mock(database_url='https://example.firebaseio.com')
+
+    client = writer.WriteClient.from_app(app, max_in_flight=1)
+
+    assert client.url('foo') == 'https://example.firebaseio.com/foo.json'
+    assert client._credentials is app.credentials
+    client.close()
+
+
+def test_from_app_with_token(mocker):
+    app = mocker.Mock(database_url='https://example.firebaseio.com')
+
+    client = writer.WriteClient.from_app(app, token='secret')
+
+    assert client._auth_params() == {'auth': 'secret'}
+    client.close()